@@ -0,0 +1,106 @@
+"""Общее для эндпоинтов API: JSON-ответ, ошибки, ETag, заголовки кэширования, выбор полей.
+
+Представление API возвращает обычный словарь, а api_endpoint превращает его
+в ответ: сериализует, считает ETag по телу (повторный запрос с If-None-Match
+получает 304 без тела), ставит Cache-Control для эндпоинта и сжимает gzip.
+"""
+import hashlib
+import json
+from functools import wraps
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.views.decorators.gzip import gzip_page
+
+
+class ApiError(Exception):
+    """Ошибка запроса к API; превращается в JSON {"error": ...} с указанным статусом"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def json_response(payload, status=200):
+    body = json.dumps(payload, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':'))
+    return HttpResponse(body, status=status, content_type='application/json')
+
+
+def _error(message, status):
+    response = json_response({'error': message}, status=status)
+    patch_cache_control(response, no_store=True)
+    return response
+
+
+def api_endpoint(max_age=0):
+    """Декоратор представления API: только GET/HEAD, вход обязателен (401 вместо редиректа).
+
+    max_age - сколько секунд клиент может не переспрашивать; ответы зависят от
+    пользователя, поэтому кэш всегда private.
+    """
+    def decorator(view):
+        @gzip_page
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                response = _error('Метод не поддерживается', 405)
+                response['Allow'] = 'GET, HEAD'
+                return response
+            if not request.user.is_authenticated:
+                return _error('Требуется вход', 401)
+            try:
+                payload = view(request, *args, **kwargs)
+            except ApiError as exc:
+                return _error(exc.message, exc.status)
+
+            response = json_response(payload)
+            etag = f'"{hashlib.md5(response.content, usedforsecurity=False).hexdigest()}"'
+            response = get_conditional_response(request, etag=etag, response=response)
+            response['ETag'] = etag
+            patch_cache_control(response, private=True, max_age=max_age)
+            patch_vary_headers(response, ['Cookie'])
+            return response
+        return wrapper
+    return decorator
+
+
+def selected_fields(request, fields, default=None):
+    """Имена полей из ?fields=a,b в порядке FIELDS эндпоинта; неизвестное поле - ApiError"""
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(default or fields)
+    names = {name.strip() for name in raw.split(',') if name.strip()}
+    unknown = names - set(fields)
+    if unknown:
+        raise ApiError(f'Неизвестные поля: {", ".join(sorted(unknown))}')
+    return [name for name in fields if name in names]
+
+
+def serialize(rows, fields, names):
+    """Строки values() -> словари с полями names.
+
+    В fields поле - либо имя столбца values(), либо (столбцы, функция от них).
+    """
+    result = []
+    for row in rows:
+        item = {}
+        for name in names:
+            spec = fields[name]
+            if isinstance(spec, str):
+                item[name] = row[spec]
+            else:
+                columns, build = spec
+                item[name] = build(*(row[column] for column in columns))
+        result.append(item)
+    return result
+
+
+def columns(fields, names, *required):
+    """Столбцы для values(): нужные выбранным полям и обязательные (например, для курсора)"""
+    needed = set(required)
+    for name in names:
+        spec = fields[name]
+        needed.update([spec] if isinstance(spec, str) else spec[0])
+    return sorted(needed)
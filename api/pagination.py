@@ -0,0 +1,66 @@
+"""Курсорная пагинация по строкам values(): курсор - (значение поля сортировки, id) последней строки.
+
+Так же, как лента новостей (main/feed.py) и список материалов
+(materials/listing.py), страница - "следующие N после курсора" без COUNT(*)
+и OFFSET; здесь только вперёд, как листают мобильные клиенты.
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+from .http import ApiError
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+def page_limit(request):
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise ApiError('limit должен быть числом') from None
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ApiError(f'limit должен быть от 1 до {MAX_LIMIT}')
+    return limit
+
+
+def encode_cursor(value, pk):
+    # Не DjangoJSONEncoder: он обрезает микросекунды, и курсор по дате перескакивал бы строки
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    raw = json.dumps([value, pk], ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, field):
+    """(значение, id) из курсора; значение приводится к типу поля модели field"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        value, pk = json.loads(raw)
+        value = field.to_python(value)
+        pk = int(pk)
+    except (ValueError, TypeError, UnicodeDecodeError, ValidationError):
+        raise ApiError('Некорректный курсор') from None
+    if value is None:
+        raise ApiError('Некорректный курсор')
+    return value, pk
+
+
+def cursor_page(queryset, field_name, descending, cursor, limit):
+    """(строки страницы, курсор следующей или None); queryset - уже с values(), где есть field_name и id"""
+    if cursor:
+        value, pk = decode_cursor(cursor, queryset.model._meta.get_field(field_name))
+        # (field, id) дальше (v, i) в порядке сортировки; первое условие даёт диапазон по индексу
+        if descending:
+            beyond = Q(**{f'{field_name}__lte': value}) & (Q(**{f'{field_name}__lt': value}) | Q(pk__lt=pk))
+        else:
+            beyond = Q(**{f'{field_name}__gte': value}) & (Q(**{f'{field_name}__gt': value}) | Q(pk__gt=pk))
+        queryset = queryset.filter(beyond)
+    ordering = (f'-{field_name}', '-id') if descending else (field_name, 'id')
+    rows = list(queryset.order_by(*ordering)[:limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1][field_name], rows[-1]['id'])
@@ -0,0 +1,163 @@
+import gzip
+import json
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+
+from django.test import TestCase
+from django.urls import reverse
+
+from main.models import CustomUser, Group, News
+from main.testing import QueryBudgetMixin
+from materials.models import Material
+from schedule.models import Homework, Schedule, Subject
+
+
+class ApiTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.group = Group.objects.create(name='ВМК-101', faculty='ВМК', course=1)
+        self.teacher = CustomUser.objects.create_user(
+            username='teacher1', password='pass', student_id='t0001',
+            first_name='Сергей', last_name='Преподавателев', faculty='ВМК', course=0, role='teacher',
+        )
+        self.student = CustomUser.objects.create_user(
+            username='student1', password='pass', student_id='s0001',
+            faculty='ВМК', course=1, role='student', group=self.group,
+        )
+        self.subject = Subject.objects.create(name='Программирование', teacher=self.teacher)
+        self.lessons = [
+            Schedule.objects.create(
+                faculty='ВМК', group=self.group, day=day, lesson_number=number, teacher_id='t0001',
+                subject=self.subject, classroom='505', start_time=time(9, 0), end_time=time(10, 30),
+            )
+            for day, number in [(0, 1), (0, 2), (3, 1)]
+        ]
+        self.monday = date(2025, 9, 1)
+        for offset in range(5):
+            Homework.objects.create(
+                schedule=self.lessons[0], content=f'Задание {offset}', created_by=self.teacher,
+                group=self.group, subject=self.subject, due_date=self.monday + timedelta(days=offset),
+            )
+        self.client.force_login(self.student)
+
+    def get(self, name, **params):
+        return self.client.get(reverse(name), params)
+
+    def test_login_required(self):
+        self.client.logout()
+        response = self.get('api_news')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {'error': 'Требуется вход'})
+        self.client.force_login(self.student)
+        self.assertEqual(self.client.post(reverse('api_news')).status_code, 405)
+
+    def test_timetable_week(self):
+        with self.assertQueryBudget(3):
+            data = self.get('api_timetable', week='2025-09-04').json()
+        self.assertEqual(data['group'], self.group.pk)
+        self.assertEqual(data['week_start'], '2025-09-01')
+        self.assertEqual([len(day['lessons']) for day in data['days']], [2, 0, 0, 1, 0, 0])
+        self.assertEqual(data['days'][3]['date'], '2025-09-04')
+        self.assertEqual(data['days'][0]['lessons'][0], {
+            'id': self.lessons[0].pk, 'day': 0, 'lesson_number': 1, 'start_time': '09:00:00',
+            'end_time': '10:30:00', 'time': '9:00-10:30', 'subject': 'Программирование',
+            'teacher': 'Сергей Преподавателев', 'teacher_id': 't0001', 'group_id': self.group.pk,
+            'group': 'ВМК-101', 'classroom': '505',
+        })
+
+        self.client.force_login(self.teacher)
+        data = self.get('api_timetable', fields='subject,lesson_number').json()
+        self.assertEqual(data['teacher'], 't0001')
+        self.assertEqual(data['days'][0]['lessons'], [
+            {'lesson_number': 1, 'subject': 'Программирование'},
+            {'lesson_number': 2, 'subject': 'Программирование'},
+        ])
+        self.assertEqual(self.get('api_timetable', fields='salary').status_code, 400)
+        self.assertEqual(self.get('api_timetable', week='вчера').status_code, 400)
+
+    def test_students_see_only_own_group(self):
+        other = Group.objects.create(name='ВМК-102', faculty='ВМК', course=1)
+        self.assertEqual(self.get('api_timetable', group=self.group.pk).status_code, 200)
+        self.assertEqual(self.get('api_timetable', group=other.pk).status_code, 403)
+        self.assertEqual(self.get('api_homework', group=other.pk).status_code, 403)
+        self.assertEqual(self.get('api_homework', teacher='t0001').status_code, 403)
+
+        self.client.force_login(self.teacher)
+        self.assertEqual(self.get('api_timetable', group=other.pk).json()['group'], other.pk)
+        self.assertEqual(self.get('api_homework', group=self.group.pk).status_code, 200)
+
+    def test_homework_range_and_cursor(self):
+        params = {'from': '2025-09-01', 'to': '2025-09-07', 'limit': 2, 'fields': 'content,due_date'}
+        pages, cursor = [], None
+        while True:
+            # Сессия, пользователь и сама страница
+            with self.assertQueryBudget(3):
+                data = self.get('api_homework', **params, **({'cursor': cursor} if cursor else {})).json()
+            pages.append([item['content'] for item in data['results']])
+            cursor = data['next']
+            if not cursor:
+                break
+        self.assertEqual(pages, [['Задание 0', 'Задание 1'], ['Задание 2', 'Задание 3'], ['Задание 4']])
+        self.assertEqual(self.get('api_homework', cursor='мусор').status_code, 400)
+        self.assertEqual(self.get('api_homework', **{'from': '2025-09-07', 'to': '2025-09-01'}).status_code, 400)
+
+    def test_news_cursor_keeps_microseconds(self):
+        moment = datetime(2025, 9, 1, 12, 0, 0, 123456, tzinfo=dt_timezone.utc)
+        for index in range(3):
+            news = News.objects.create(title=f'Новость {index}', content='Текст', author=self.teacher)
+            # Одинаковое время с микросекундами - порядок решает id
+            News.objects.filter(pk=news.pk).update(created_at=moment)
+        first = self.get('api_news', limit=2, fields='title').json()
+        self.assertEqual([item['title'] for item in first['results']], ['Новость 2', 'Новость 1'])
+        second = self.get('api_news', limit=2, cursor=first['next']).json()
+        self.assertEqual([item['title'] for item in second['results']], ['Новость 0'])
+        self.assertEqual(second['results'][0]['author'], 'Сергей Преподавателев')
+        self.assertIsNone(second['next'])
+
+    def test_materials_filters_and_sort(self):
+        for name, size in [('Лекции', 300), ('Задачник', 100), ('Билеты', 200)]:
+            Material.objects.create(
+                name=name, faculty='ВМК', course=1, subject='Алгебра', type='book', uploaded_by=self.teacher,
+            )
+            Material.objects.filter(name=name).update(size=size)
+        Material.objects.create(name='Чужое', faculty='Мехмат', course=1, subject='Алгебра', type='book',
+                                uploaded_by=self.teacher)
+        data = self.get('api_materials', sort='-size', fields='name,size,type_display').json()
+        self.assertEqual(data['results'], [
+            {'name': 'Лекции', 'type_display': 'Книга', 'size': 300},
+            {'name': 'Билеты', 'type_display': 'Книга', 'size': 200},
+            {'name': 'Задачник', 'type_display': 'Книга', 'size': 100},
+        ])
+        self.assertEqual(self.get('api_materials', course='9').status_code, 400)
+
+    def test_etag_gzip_and_cache_headers(self):
+        response = self.get('api_timetable')
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('max-age=300', response['Cache-Control'])
+        not_modified = self.client.get(reverse('api_timetable'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+        compressed = self.client.get(reverse('api_timetable'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(compressed.content)), response.json())
+        self.assertEqual(
+            self.client.get(reverse('api_timetable'), HTTP_IF_NONE_MATCH=compressed['ETag']).status_code, 304,
+        )
+
+        self.lessons[0].classroom = '606'
+        self.lessons[0].save()
+        self.assertEqual(
+            self.client.get(reverse('api_timetable'), HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200,
+        )
+
+    def test_legacy_schedule_json(self):
+        # Добавлено позже, но выдано раньше - последним заданием не считается
+        Homework.objects.create(
+            schedule=self.lessons[0], content='Старое задание', created_by=self.teacher,
+            group=self.group, subject=self.subject, assigned_date=date(2025, 1, 1),
+        )
+        with self.assertQueryBudget(4):
+            data = self.client.get(reverse('schedule_json_day', args=['Понедельник'])).json()
+        first = data['schedule'][0]
+        self.assertEqual(first['teacher'], 'Сергей Преподавателев')
+        self.assertEqual(first['homework'], 'Задание 4')
+        self.assertIsNone(first['homework_file'])
+        self.assertEqual(len(data['schedule']), 2)
@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('timetable/', views.timetable, name='api_timetable'),
+    path('homework/', views.homework, name='api_homework'),
+    path('news/', views.news, name='api_news'),
+    path('materials/', views.materials, name='api_materials'),
+]
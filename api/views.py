@@ -0,0 +1,176 @@
+"""JSON API версии 1 для мобильного приложения и Telegram-бота.
+
+Каждый список - один запрос через values() без создания моделей и без
+запросов по внешним ключам на строку. ?fields=a,b сужает и ответ, и
+выбираемые столбцы; длинные списки листаются курсором ?cursor=... из поля
+next предыдущего ответа, размер страницы - ?limit=.
+"""
+from datetime import date, timedelta
+
+from django.urls import reverse
+
+from main.models import News
+from materials.forms import MaterialFilterForm
+from materials.listing import filter_materials, sort_field
+from materials.models import Material
+from schedule.lessons import full_name
+from schedule.models import Homework, Schedule, format_lesson_time
+from .http import ApiError, api_endpoint, columns, selected_fields, serialize
+from .pagination import cursor_page, page_limit
+
+TYPE_LABELS = dict(Material.TYPES)
+MAX_HOMEWORK_RANGE = timedelta(days=92)
+
+
+def _url(name):
+    return lambda pk, file: reverse(name, args=[pk]) if file else None
+
+
+LESSON_FIELDS = {
+    'id': 'id',
+    'day': 'day',
+    'lesson_number': 'lesson_number',
+    'start_time': 'start_time',
+    'end_time': 'end_time',
+    'time': (('start_time', 'end_time'), format_lesson_time),
+    'subject': 'subject__name',
+    'teacher': (('subject__teacher__first_name', 'subject__teacher__last_name'), full_name),
+    'teacher_id': 'teacher_id',
+    'group_id': 'group_id',
+    'group': 'group__name',
+    'classroom': 'classroom',
+}
+
+HOMEWORK_FIELDS = {
+    'id': 'id',
+    'lesson_id': 'schedule_id',
+    'group_id': 'group_id',
+    'subject': 'subject__name',
+    'content': 'content',
+    'assigned_date': 'assigned_date',
+    'due_date': 'due_date',
+    'file_url': (('id', 'file'), _url('download_homework_file')),
+}
+
+NEWS_FIELDS = {
+    'id': 'id',
+    'title': 'title',
+    'content': 'content',
+    'category': 'category',
+    'author': (('author__first_name', 'author__last_name'), full_name),
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+    'file_url': (('id', 'file'), _url('download_news')),
+}
+
+MATERIAL_FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'faculty': 'faculty',
+    'course': 'course',
+    'subject': 'subject',
+    'type': 'type',
+    'type_display': (('type',), lambda value: TYPE_LABELS.get(value, value)),
+    'size': 'size',
+    'upload_date': 'upload_date',
+    'uploaded_by': (('uploaded_by__first_name', 'uploaded_by__last_name'), full_name),
+    'folder_id': 'folder_id',
+    'download_url': (('id', 'file'), _url('download_material')),
+}
+
+
+def _date_param(request, name, default):
+    raw = request.GET.get(name)
+    if not raw:
+        return default
+    try:
+        return date.fromisoformat(raw)
+    except ValueError:
+        raise ApiError(f'{name}: ожидается дата ГГГГ-ММ-ДД') from None
+
+
+def _timetable_scope(request):
+    """Чьи пары: ?group=<id>, ?teacher=<ID преподавателя>, по умолчанию - свои.
+
+    Чужие группы и преподавателей видят только преподаватели и администраторы,
+    как и в поиске: ДЗ других групп студентам не показывается.
+    """
+    can_browse = request.user.role in ['teacher', 'admin']
+    group = request.GET.get('group')
+    if group:
+        if not group.isdigit():
+            raise ApiError('group: ожидается id группы')
+        if not can_browse and int(group) != request.user.group_id:
+            raise ApiError('Расписание других групп недоступно', status=403)
+        return 'group', int(group)
+    if request.GET.get('teacher'):
+        if not can_browse:
+            raise ApiError('Расписание преподавателей недоступно', status=403)
+        return 'teacher', request.GET['teacher']
+    if request.user.role == 'teacher':
+        return 'teacher', request.user.student_id
+    if request.user.group_id:
+        return 'group', request.user.group_id
+    raise ApiError('У вас не назначена группа')
+
+
+@api_endpoint(max_age=5 * 60)
+def timetable(request):
+    """Пары недели по дням; ?week - любая дата недели, по умолчанию текущая"""
+    day = _date_param(request, 'week', date.today())
+    week_start = day - timedelta(days=day.weekday())
+    kind, value = _timetable_scope(request)
+    names = selected_fields(request, LESSON_FIELDS)
+    rows = list(
+        Schedule.objects.filter(**{'group_id' if kind == 'group' else 'teacher_id': value})
+        .order_by('day', 'lesson_number')
+        .values(*columns(LESSON_FIELDS, names, 'day'))
+    )
+    days = [
+        {'day': number, 'name': name, 'date': week_start + timedelta(days=number), 'lessons': []}
+        for number, name in Schedule.DAYS
+    ]
+    for row, lesson in zip(rows, serialize(rows, LESSON_FIELDS, names)):
+        days[row['day']]['lessons'].append(lesson)
+    return {kind: value, 'week_start': week_start, 'days': days}
+
+
+@api_endpoint(max_age=60)
+def homework(request):
+    """ДЗ со сроком сдачи в [from, to] (по умолчанию текущая неделя) по возрастанию срока"""
+    today = date.today()
+    start = _date_param(request, 'from', today - timedelta(days=today.weekday()))
+    end = _date_param(request, 'to', start + timedelta(days=6))
+    if end < start or end - start > MAX_HOMEWORK_RANGE:
+        raise ApiError(f'Период должен быть не длиннее {MAX_HOMEWORK_RANGE.days} дней и не обратным')
+    kind, value = _timetable_scope(request)
+    names = selected_fields(request, HOMEWORK_FIELDS)
+    queryset = Homework.objects.filter(
+        due_date__range=(start, end),
+        **{'group_id' if kind == 'group' else 'schedule__teacher_id': value},
+    ).values(*columns(HOMEWORK_FIELDS, names, 'id', 'due_date'))
+    rows, next_cursor = cursor_page(queryset, 'due_date', False, request.GET.get('cursor'), page_limit(request))
+    return {'from': start, 'to': end, 'next': next_cursor, 'results': serialize(rows, HOMEWORK_FIELDS, names)}
+
+
+@api_endpoint(max_age=60)
+def news(request):
+    """Опубликованные новости, сначала свежие"""
+    names = selected_fields(request, NEWS_FIELDS)
+    queryset = News.objects.filter(is_published=True).values(*columns(NEWS_FIELDS, names, 'id', 'created_at'))
+    rows, next_cursor = cursor_page(queryset, 'created_at', True, request.GET.get('cursor'), page_limit(request))
+    return {'next': next_cursor, 'results': serialize(rows, NEWS_FIELDS, names)}
+
+
+@api_endpoint(max_age=2 * 60)
+def materials(request):
+    """Каталог материалов с фильтрами и сортировкой списка материалов; без faculty - факультет пользователя"""
+    form = MaterialFilterForm(request.GET)
+    if not form.is_valid():
+        raise ApiError('; '.join(f'{field}: {" ".join(errors)}' for field, errors in form.errors.items()))
+    filters = {**form.cleaned_data, 'faculty': form.cleaned_data['faculty'] or request.user.faculty}
+    field, descending = sort_field(filters['sort'])
+    names = selected_fields(request, MATERIAL_FIELDS)
+    queryset = filter_materials(Material.objects.all(), filters).values(*columns(MATERIAL_FIELDS, names, 'id', field))
+    rows, next_cursor = cursor_page(queryset, field, descending, request.GET.get('cursor'), page_limit(request))
+    return {'sort': filters['sort'], 'next': next_cursor, 'results': serialize(rows, MATERIAL_FIELDS, names)}
@@ -0,0 +1,75 @@
+"""Кэширование фрагментов главной страницы вошедшего пользователя.
+
+Расписание на сегодня одинаково для всей группы, лента новостей - для всех
+пользователей одной роли, поэтому они кэшируются тегом {% cache %} в
+home.html, а свежими рендерятся только шапка и приветствие. В ключи входят
+метки версий, которые сдвигают сигналы News и Schedule: менять сами
+фрагменты не нужно, старые просто перестают запрашиваться.
+"""
+from datetime import date
+
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+
+from schedule.cache import group_day_version
+from schedule.models import Schedule
+from .feed import feed_page, published_count
+from .models import News
+
+DASHBOARD_TIMEOUT = 60 * 60
+NEWS_VERSION_KEY = 'dashboard:news_version'
+# Преподаватели и администраторы видят у своих новостей кнопки с CSRF-токеном -
+# такой фрагмент нельзя делить даже с коллегами по роли
+UNCACHED_NEWS_ROLES = {'teacher', 'admin'}
+
+
+def news_version():
+    """Время последнего изменения ленты: updated_at последней правки или момент удаления"""
+    version = cache.get(NEWS_VERSION_KEY)
+    if version is None:
+        latest = News.objects.aggregate(latest=Max('updated_at'))['latest']
+        version = latest.isoformat() if latest else ''
+        cache.add(NEWS_VERSION_KEY, version, DASHBOARD_TIMEOUT)
+    return version
+
+
+def bump_news_version(moment=None):
+    # Метка живёт не дольше фрагментов: когда она истечёт и будет пересчитана по
+    # updated_at, фрагментов с прежними метками в кэше уже не останется
+    cache.set(NEWS_VERSION_KEY, (moment or timezone.now()).isoformat(), DASHBOARD_TIMEOUT)
+
+
+def _load_feed(after, before):
+    try:
+        return feed_page(after=after, before=before)
+    except ValueError:
+        # Испорченный курсор - просто первая страница
+        return feed_page()
+
+
+def dashboard_context(request):
+    """Контекст home.html; данные ленивые и читаются из БД, только если фрагмента нет в кэше"""
+    user = request.user
+    today = date.today()
+    weekday = today.weekday()
+    after, before = request.GET.get('after'), request.GET.get('before')
+
+    def load_schedule():
+        if not user.group_id:
+            return []
+        return list(Schedule.objects.for_group_day(user.group_id, weekday))
+
+    return {
+        'today': today,
+        'weekday': weekday,
+        'today_schedule': SimpleLazyObject(load_schedule),
+        'feed': SimpleLazyObject(lambda: _load_feed(after, before)),
+        'news_count': SimpleLazyObject(published_count),
+        'fragment_timeout': DASHBOARD_TIMEOUT,
+        'schedule_version': group_day_version(user.group_id, weekday) if user.group_id else '',
+        'news_version': news_version(),
+        'news_cursor': f'{after or ""}:{before or ""}',
+        'cache_news': user.role not in UNCACHED_NEWS_ROLES,
+    }
@@ -0,0 +1,150 @@
+"""Отдача загруженных файлов: Range, ETag/304 и передача тела фронтовому прокси.
+
+Права доступа проверяет сама view до вызова serve_file.
+"""
+import hashlib
+import mimetypes
+import os
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+CHUNK_SIZE = 64 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """Разбирает заголовок Range и возвращает (start, end) включительно.
+
+    None - заголовка нет или он не поддерживается (отдаём файл целиком),
+    RangeNotSatisfiable - диапазон за пределами файла (ответ 416).
+    Несколько диапазонов в одном запросе не поддерживаются: RFC 9110
+    разрешает в этом случае просто отдать весь файл.
+    """
+    if not header or not header.startswith('bytes='):
+        return None
+    spec = header[len('bytes='):].strip()
+    if ',' in spec:
+        return None
+    start, sep, end = spec.partition('-')
+    if not sep:
+        return None
+    try:
+        if not start:
+            # bytes=-500 - последние 500 байт
+            suffix = int(end)
+            # У пустого файла нет ни одного байта, который можно отдать
+            if suffix <= 0 or size == 0:
+                raise RangeNotSatisfiable
+            return max(size - suffix, 0), size - 1
+        start = int(start)
+        end = int(end) if end else size - 1
+    except ValueError:
+        return None
+    if start < 0 or start >= size or end < start:
+        raise RangeNotSatisfiable
+    return start, min(end, size - 1)
+
+
+def file_etag(name, size, modified):
+    """Сильный ETag: меняется при замене файла, даже если имя осталось прежним"""
+    digest = hashlib.md5(name.encode('utf-8')).hexdigest()[:12]
+    return f'"{digest}-{size:x}-{int(modified.timestamp() * 1000):x}"'
+
+
+def _if_range_matches(request, etag, last_modified):
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def _iter_range(file, start, length):
+    try:
+        file.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = file.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def _sendfile_response(field_file):
+    backend = getattr(settings, 'DOWNLOADS_SENDFILE', None)
+    if not backend:
+        return None
+    response = HttpResponse()
+    if backend == 'nginx':
+        prefix = getattr(settings, 'DOWNLOADS_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+        # Путь на диске относительно MEDIA_ROOT: имя в поле может быть логическим (cas/...)
+        relative_path = os.path.relpath(field_file.path, field_file.storage.location)
+        response['X-Accel-Redirect'] = prefix + quote(relative_path.replace(os.sep, '/'))
+    elif backend == 'apache':
+        response['X-Sendfile'] = field_file.path
+    else:
+        raise ValueError(f'Unknown DOWNLOADS_SENDFILE backend: {backend!r}')
+    return response
+
+
+def serve_file(request, field_file, as_attachment=True):
+    """Ответ с содержимым FieldFile с поддержкой Range, ETag и sendfile"""
+    storage = field_file.storage
+    name = field_file.name
+    if not name or not storage.exists(name):
+        raise Http404('Файл не найден')
+
+    size = storage.size(name)
+    modified = storage.get_modified_time(name)
+    etag = file_etag(name, size, modified)
+    last_modified = int(modified.timestamp())
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    filename = os.path.basename(name)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    # При sendfile тело и Range обрабатывает прокси, воркер освобождается сразу
+    response = _sendfile_response(field_file)
+    if response is None:
+        try:
+            byte_range = None
+            if _if_range_matches(request, etag, last_modified):
+                byte_range = parse_range(request.headers.get('Range'), size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        if byte_range is None:
+            response = FileResponse(storage.open(name, 'rb'), content_type=content_type)
+        else:
+            start, end = byte_range
+            length = end - start + 1
+            response = StreamingHttpResponse(
+                _iter_range(storage.open(name, 'rb'), start, length),
+                status=206,
+                content_type=content_type,
+            )
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = str(length)
+
+    response['Content-Type'] = content_type
+    response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
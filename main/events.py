@@ -0,0 +1,155 @@
+"""Push-уведомления о новых ДЗ и новостях через Server-Sent Events.
+
+Соединение - это корутина ASGI-сервера, которая ждёт в asyncio.Queue
+следующее событие своего канала; простаивающее соединение процессор не
+тратит вовсе, кроме редкого пинга, не дающего прокси его закрыть.
+
+Каналы: 'news' - для всех, 'group:<id>' - ДЗ группы, 'teacher:<ID>' - ДЗ к
+парам преподавателя. Публикация идёт только подписчикам нужного канала и
+одним вызовом call_soon_threadsafe на цикл событий, сколько бы соединений в
+нём ни было, поэтому публиковать можно и из синхронных представлений.
+
+Брокер выбирается настройкой EVENTS_BROKER. Встроенный InProcessBroker
+доставляет события в пределах одного процесса: это подходит, когда сайт
+целиком работает под ASGI-сервером в одном процессе. Для нескольких
+процессов нужен брокер с тем же интерфейсом поверх внешней шины.
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+QUEUE_SIZE = 100
+HEARTBEAT_INTERVAL = 25
+RETRY_MS = 5000
+NEWS_CHANNEL = 'news'
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def group_channel(group_id):
+    return f'group:{group_id}'
+
+
+def teacher_channel(teacher_id):
+    return f'teacher:{teacher_id}'
+
+
+class Subscription:
+    """Очередь событий одного соединения; создаётся внутри цикла событий"""
+
+    def __init__(self, channels, size=QUEUE_SIZE):
+        self.channels = tuple(channels)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(size)
+
+    def put(self, event):
+        # Клиент не успевает читать - старое событие выбрасываем, свежее важнее
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout=None):
+        """Следующее событие или None, если за timeout секунд ничего не пришло"""
+        if not self.queue.empty():
+            return self.queue.get_nowait()
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class InProcessBroker:
+    """Pub/sub в памяти процесса; publish потокобезопасен"""
+
+    def __init__(self):
+        self._channels = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, channels):
+        subscription = Subscription(channels)
+        with self._lock:
+            for channel in subscription.channels:
+                self._channels[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._channels.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._channels[channel]
+
+    def subscriber_count(self, channel):
+        with self._lock:
+            return len(self._channels.get(channel, ()))
+
+    def publish(self, channel, event):
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+        by_loop = defaultdict(list)
+        for subscription in subscribers:
+            by_loop[subscription.loop].append(subscription)
+        for loop, targets in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_fan_out, targets, event)
+            except RuntimeError:
+                # Цикл уже закрыт - его соединения отписываются сами при остановке
+                pass
+
+
+def _fan_out(subscriptions, event):
+    for subscription in subscriptions:
+        subscription.put(event)
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(getattr(settings, 'EVENTS_BROKER', 'main.events.InProcessBroker'))()
+    return _broker
+
+
+def publish(channels, event):
+    """Публикует событие в каналы после коммита транзакции - чтобы клиент, перечитав страницу, его увидел"""
+    def send():
+        broker = get_broker()
+        for channel in channels:
+            broker.publish(channel, event)
+    transaction.on_commit(send)
+
+
+def user_channels(user):
+    channels = [NEWS_CHANNEL]
+    if user.role == 'teacher':
+        channels.append(teacher_channel(user.student_id))
+    if user.group_id:
+        channels.append(group_channel(user.group_id))
+    return channels
+
+
+def format_event(event):
+    """Кадр SSE: тип события отдельным полем, данные - JSON"""
+    data = json.dumps(event, cls=DjangoJSONEncoder, ensure_ascii=False)
+    return f'event: {event["type"]}\ndata: {data}\n\n'
+
+
+async def stream(subscription, heartbeat=HEARTBEAT_INTERVAL):
+    """Тело ответа text/event-stream; при отключении клиента сервер отменяет генератор, и подписка снимается"""
+    try:
+        yield f'retry: {RETRY_MS}\n\n'
+        while True:
+            event = await subscription.get(heartbeat)
+            yield ': ping\n\n' if event is None else format_event(event)
+    finally:
+        get_broker().unsubscribe(subscription)
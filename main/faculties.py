@@ -0,0 +1,147 @@
+"""Данные и страница факультетов для анонимных посетителей.
+
+Главная для анонимов - самая посещаемая страница в приёмную кампанию,
+поэтому разобранный faculties.json и готовый HTML держатся в памяти
+процесса. Изменение файла замечается по mtime, который проверяется не
+чаще раза в FACULTIES_CHECK_INTERVAL секунд - попадание в кэш не трогает
+ни диск, ни шаблонизатор.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.shortcuts import render
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+FACULTIES_JSON = os.path.join(settings.BASE_DIR, 'static', 'data', 'faculties.json')
+FACULTIES_CHECK_INTERVAL = 5
+
+CachedPage = namedtuple('CachedPage', 'signature content etag last_modified')
+
+_lock = threading.RLock()
+_signature = None
+_checked_at = None
+_faculties = None
+_page = None
+
+
+def load_faculties_from_json():
+    """Загружает данные о факультетах из JSON файла"""
+    try:
+        with open(FACULTIES_JSON, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+            faculties = data.get('faculties', [])
+
+            # Добавляем пути к локальным логотипам
+            for faculty in faculties:
+                # Формируем путь к локальному файлу логотипа
+                logo_filename = f"{faculty['name'].lower()}.png"
+                logo_path = f"images/faculties/{logo_filename}"
+
+                # Проверяем существует ли файл
+                full_logo_path = os.path.join(settings.BASE_DIR, 'static', logo_path)
+                if os.path.exists(full_logo_path):
+                    faculty['local_logo'] = logo_path
+                else:
+                    faculty['local_logo'] = None
+
+            return faculties
+    except FileNotFoundError:
+        return get_default_faculties()
+    except Exception as e:
+        print(f"Ошибка загрузки JSON: {e}")
+        return get_default_faculties()
+
+
+def get_default_faculties():
+    """Возвращает тестовые данные с локальными логотипами"""
+    return [
+        {
+            'id': 1,
+            'name': 'ВМК',
+            'full_name': 'Факультет вычислительной математики и кибернетики',
+            'description': 'Ведущий факультет в области computer science в России. Готовит специалистов в области программирования, искусственного интеллекта, анализа данных и кибербезопасности.',
+            'points': 424,
+            'max_points': 500,
+            'previous_points': 414,
+            'website': 'https://cs.msu.ru',
+            'contact': 'vmk@cs.msu.ru',
+            'phone': '+7 (495) 939-54-01',
+            'local_logo': 'data/faculties/1.png'
+        }
+    ]
+
+
+def _json_signature():
+    try:
+        stat = os.stat(FACULTIES_JSON)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _current_signature():
+    """Версия faculties.json; os.stat - не чаще раза в FACULTIES_CHECK_INTERVAL"""
+    global _signature, _checked_at
+    now = time.monotonic()
+    if _checked_at is None or now - _checked_at >= FACULTIES_CHECK_INTERVAL:
+        _signature = _json_signature()
+        _checked_at = now
+    return _signature
+
+
+def get_faculties():
+    """Факультеты из faculties.json; файл разбирается заново только после изменения"""
+    global _faculties
+    signature = _current_signature()
+    cached = _faculties
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    with _lock:
+        if _faculties is None or _faculties[0] != signature:
+            _faculties = (signature, load_faculties_from_json())
+        return _faculties[1]
+
+
+def _rendered_page(request):
+    global _page
+    signature = _current_signature()
+    page = _page
+    if page is not None and page.signature == signature:
+        return page
+    with _lock:
+        if _page is None or _page.signature != signature:
+            content = render(request, 'faculties.html', {'faculties': get_faculties()}).content
+            _page = CachedPage(
+                signature=signature,
+                content=content,
+                etag='"%s"' % hashlib.md5(content).hexdigest(),
+                last_modified=int(time.time()),
+            )
+        return _page
+
+
+def faculties_response(request):
+    """Страница факультетов для анонимов: из памяти, с ETag/Last-Modified и 304"""
+    page = _rendered_page(request)
+    response = get_conditional_response(request, etag=page.etag, last_modified=page.last_modified)
+    if response is None:
+        response = HttpResponse(page.content)
+    response['ETag'] = page.etag
+    response['Last-Modified'] = http_date(page.last_modified)
+    # По тому же адресу вошедшие пользователи получают свою ленту
+    patch_vary_headers(response, ['Cookie'])
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def clear_cache():
+    global _signature, _checked_at, _faculties, _page
+    with _lock:
+        _signature = _checked_at = _faculties = _page = None
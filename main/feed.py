@@ -0,0 +1,91 @@
+"""Лента новостей с постраничной навигацией по курсору (created_at, id).
+
+В отличие от Paginator не нужны ни COUNT(*), ни OFFSET: страница - это
+"следующие N новостей после такой-то", и её стоимость не зависит от того,
+насколько глубоко пользователь пролистал архив. Общее число опубликованных
+новостей хранится в кэше и поправляется сигналами (main/signals.py).
+"""
+import base64
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .models import News
+
+FEED_PAGE_SIZE = 5
+PUBLISHED_COUNT_KEY = 'news:published_count'
+# update() и массовые действия админки сигналов не шлют - счётчик пересчитывается хотя бы так часто
+PUBLISHED_COUNT_TIMEOUT = 10 * 60
+
+FeedPage = namedtuple('FeedPage', 'items next_cursor previous_cursor')
+
+
+def encode_cursor(news):
+    raw = f'{news.created_at.isoformat()}|{news.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(created_at, id) из курсора; ValueError для испорченного значения"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, pk = raw.split('|')
+        created_at = parse_datetime(created_at)
+        pk = int(pk)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError(f'Invalid cursor: {cursor!r}') from exc
+    if created_at is None:
+        raise ValueError(f'Invalid cursor: {cursor!r}')
+    return created_at, pk
+
+
+def older_than(created_at, pk):
+    # Эквивалент (created_at, id) < (c, i); первое условие даёт диапазон по индексу ленты
+    return Q(created_at__lte=created_at) & (Q(created_at__lt=created_at) | Q(pk__lt=pk))
+
+
+def newer_than(created_at, pk):
+    return Q(created_at__gte=created_at) & (Q(created_at__gt=created_at) | Q(pk__gt=pk))
+
+
+def feed_page(after=None, before=None, size=FEED_PAGE_SIZE, queryset=None):
+    """Страница ленты: после курсора after (старее) или перед курсором before (новее).
+
+    Берётся на одну запись больше, чтобы узнать, есть ли страница дальше.
+    """
+    queryset = News.objects.published() if queryset is None else queryset
+    if before:
+        rows = list(queryset.filter(newer_than(*decode_cursor(before))).order_by('created_at', 'id')[:size + 1])
+        has_more = len(rows) > size
+        items = rows[:size][::-1]
+        next_cursor = encode_cursor(items[-1]) if items else None
+        previous_cursor = encode_cursor(items[0]) if items and has_more else None
+    else:
+        if after:
+            queryset = queryset.filter(older_than(*decode_cursor(after)))
+        rows = list(queryset[:size + 1])
+        has_more = len(rows) > size
+        items = rows[:size]
+        next_cursor = encode_cursor(items[-1]) if items and has_more else None
+        previous_cursor = encode_cursor(items[0]) if items and after else None
+    return FeedPage(items, next_cursor, previous_cursor)
+
+
+def published_count():
+    count = cache.get(PUBLISHED_COUNT_KEY)
+    if count is None:
+        count = News.objects.filter(is_published=True).count()
+        cache.add(PUBLISHED_COUNT_KEY, count, PUBLISHED_COUNT_TIMEOUT)
+    return count
+
+
+def adjust_published_count(delta):
+    """Сдвигает закэшированное число новостей; без значения в кэше его посчитают заново при чтении"""
+    if not delta:
+        return
+    try:
+        cache.incr(PUBLISHED_COUNT_KEY, delta)
+    except ValueError:
+        pass
@@ -1,6 +1,8 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+from .storage import blob_storage
+
 class CustomUser(AbstractUser):
     ROLES = [
         ('student', 'Студент'),
@@ -69,6 +71,12 @@ class Group(models.Model):
         verbose_name_plural = 'Группы'
         ordering = ['faculty', 'course', 'name']
 
+class NewsQuerySet(models.QuerySet):
+    def published(self):
+        """Опубликованные новости для ленты вместе с автором"""
+        return self.filter(is_published=True).select_related('author').order_by('-created_at', '-id')
+
+
 class News(models.Model):
     CATEGORIES = [
         ('news', 'Новость'),
@@ -83,12 +91,21 @@ class News(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата обновления')
     is_published = models.BooleanField(default=True, verbose_name='Опубликовано')
-    file = models.FileField(upload_to='news/', blank=True, null=True, verbose_name='Файл')
+    file = models.FileField(upload_to='news/', storage=blob_storage, max_length=255,
+                            blank=True, null=True, verbose_name='Файл')
+
+    objects = NewsQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Новость'
         verbose_name_plural = 'Новости'
         ordering = ['-created_at']
+        indexes = [
+            # Частичный индекс: в ленту попадают только опубликованные новости
+            # id - второй ключ курсора ленты (см. feed.py)
+            models.Index(fields=['-created_at', '-id'], condition=models.Q(is_published=True),
+                         name='news_published_feed_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -97,4 +114,17 @@ class News(models.Model):
         """Возвращает укороченное содержание (первые 100 символов)"""
         if len(self.content) > 100:
             return self.content[:100] + '...'
-        return self.content
\ No newline at end of file
+        return self.content
+
+class FileBlob(models.Model):
+    """Файл в хранилище с дедупликацией и число записей, которые на него ссылаются"""
+    digest = models.CharField(max_length=64, unique=True, verbose_name='SHA-256')
+    ref_count = models.PositiveIntegerField(default=0, verbose_name='Число ссылок')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
+
+    class Meta:
+        verbose_name = 'Файл хранилища'
+        verbose_name_plural = 'Файлы хранилища'
+
+    def __str__(self):
+        return f"{self.digest[:12]} ({self.ref_count})"
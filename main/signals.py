@@ -0,0 +1,44 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from taskqueue.queue import track_uploads
+from .dashboard import bump_news_version
+from .events import NEWS_CHANNEL, publish
+from .feed import adjust_published_count
+from .models import CustomUser, News
+from .storage import track_blob_references
+
+track_blob_references(News)
+track_uploads(News)
+track_uploads(CustomUser, 'photo')
+
+
+@receiver(pre_save, sender=News)
+def remember_published(sender, instance, **kwargs):
+    instance._was_published = bool(
+        instance.pk and News.objects.filter(pk=instance.pk, is_published=True).exists()
+    )
+
+
+@receiver(post_save, sender=News)
+def update_published_count(sender, instance, **kwargs):
+    adjust_published_count(int(instance.is_published) - int(getattr(instance, '_was_published', False)))
+    bump_news_version(instance.updated_at)
+    if instance.is_published and not getattr(instance, '_was_published', False):
+        publish([NEWS_CHANNEL], {'type': 'news', 'action': 'published', 'id': instance.pk, 'title': instance.title})
+
+
+@receiver(post_delete, sender=News)
+def decrease_published_count(sender, instance, **kwargs):
+    if instance.is_published:
+        adjust_published_count(-1)
+    bump_news_version()
+
+
+@receiver(post_save, sender=CustomUser)
+def refresh_author_names(sender, instance, update_fields=None, **kwargs):
+    # В ленте выводится имя автора; сохранение last_login при входе его не меняет
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    if instance.role in ['teacher', 'admin']:
+        bump_news_version()
@@ -0,0 +1,215 @@
+"""Хранилище загрузок с дедупликацией по содержимому.
+
+В поле модели хранится имя вида cas/<sha256>/<исходное имя файла>, а на
+диске лежит один общий blobs/<2 символа>/<sha256><расширение>. Сколько
+записей ссылаются на блоб, считает FileBlob; файл удаляется, когда уходит
+последняя ссылка.
+
+Запись файла и его удаление идут под блокировкой строки FileBlob: ссылку
+на блоб берёт уже сам _save, поэтому удаление последней ссылки в одном
+запросе не сотрёт файл, который только что загрузил другой, но ещё не
+сохранил свою запись.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files import File
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.utils.deconstruct import deconstructible
+
+CAS_PREFIX = 'cas/'
+BLOBS_DIR = 'blobs'
+DIGEST_LENGTH = 64
+
+
+def blob_digest(name):
+    """SHA-256 из имени cas/<digest>/<файл>, для прочих имён - None"""
+    if not name or not name.startswith(CAS_PREFIX):
+        return None
+    digest = name[len(CAS_PREFIX):].split('/', 1)[0]
+    return digest if len(digest) == DIGEST_LENGTH else None
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # Уникальность имени обеспечивает хэш содержимого, см. _save
+        return name
+
+    def blob_path(self, name):
+        digest = blob_digest(name)
+        extension = os.path.splitext(name)[1].lower()
+        return super().path(os.path.join(BLOBS_DIR, digest[:2], digest + extension))
+
+    def path(self, name):
+        if blob_digest(name):
+            return self.blob_path(name)
+        return super().path(name)
+
+    def url(self, name):
+        if blob_digest(name):
+            name = os.path.relpath(self.blob_path(name), self.location).replace(os.sep, '/')
+        return super().url(name)
+
+    def _save(self, name, content):
+        digest = getattr(content, 'sha256', None)
+        if digest is not None and hasattr(content, 'temporary_file_path'):
+            # Хэш уже посчитан (файл собран из частей) - переносим его, не перечитывая
+            return self._store(name, digest, content.temporary_file_path())
+
+        tmp_dir = super().path(os.path.join(BLOBS_DIR, 'tmp'))
+        os.makedirs(tmp_dir, exist_ok=True)
+
+        # Хэшируем по кускам, одновременно записывая во временный файл
+        sha256 = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    sha256.update(chunk)
+                    tmp.write(chunk)
+            return self._store(name, sha256.hexdigest(), tmp_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _store(self, name, digest, source_path):
+        """Кладёт файл source_path в блоб digest (или удаляет, если такой блоб уже есть)"""
+        filename = self.get_valid_name(os.path.basename(name))
+        root, extension = os.path.splitext(filename)
+        # cas/ + хэш + / + имя должны влезть в max_length=255 у полей
+        max_filename = 255 - len(CAS_PREFIX) - DIGEST_LENGTH - 1
+        filename = root[:max_filename - len(extension)] + extension
+        cas_name = f'{CAS_PREFIX}{digest}/{filename}'
+
+        full_path = self.blob_path(cas_name)
+        with transaction.atomic():
+            # Под блокировкой строки: удаление последней ссылки не пройдёт между проверкой и записью
+            _add_reference(digest)
+            if os.path.exists(full_path):
+                os.remove(source_path)
+            else:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                file_move_safe(source_path, full_path)
+                if self.file_permissions_mode is not None:
+                    os.chmod(full_path, self.file_permissions_mode)
+        return cas_name
+
+
+class HashedFile(File):
+    """Файл на диске с уже известным SHA-256 содержимого.
+
+    ContentAddressedStorage не перечитывает такой файл, а переносит его в
+    блоб (os.rename в пределах одного диска); исходного файла после
+    сохранения не остаётся.
+    """
+
+    def __init__(self, file, sha256, name=None):
+        super().__init__(file, name=name)
+        self.sha256 = sha256
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+blob_storage = ContentAddressedStorage()
+
+
+def _locked_blob(digest):
+    """Строка FileBlob под select_for_update; создаётся с нулём ссылок, если её нет"""
+    from .models import FileBlob
+
+    while True:
+        FileBlob.objects.get_or_create(digest=digest)
+        blob = FileBlob.objects.select_for_update().filter(digest=digest).first()
+        # Строку могли удалить между get_or_create и блокировкой - создаём заново
+        if blob is not None:
+            return blob
+
+
+def _add_reference(digest):
+    from .models import FileBlob
+
+    with transaction.atomic():
+        blob = _locked_blob(digest)
+        FileBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+
+
+def acquire_blob(name):
+    digest = blob_digest(name)
+    if digest is None:
+        return
+    _add_reference(digest)
+
+
+def release_blob(name, storage):
+    """Снимает ссылку на файл; сам файл удаляется после коммита, если ссылок не осталось"""
+    if not name:
+        return
+    digest = blob_digest(name)
+    if digest is None:
+        # Файлы, загруженные до перехода на блобы, принадлежат одной записи
+        transaction.on_commit(lambda: storage.delete(name))
+        return
+    from .models import FileBlob
+
+    with transaction.atomic():
+        blob = FileBlob.objects.select_for_update().filter(digest=digest).first()
+        if blob is None or not blob.ref_count:
+            return
+        FileBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1)
+        if blob.ref_count > 1:
+            return
+
+    def unlink():
+        # Строка с нулём ссылок остаётся до удаления файла: его блокировку ждёт _save той же загрузки
+        with transaction.atomic():
+            blob = FileBlob.objects.select_for_update().filter(digest=digest).first()
+            if blob is None or blob.ref_count > 0:
+                return
+            storage.delete(name)
+            blob.delete()
+
+    transaction.on_commit(unlink)
+
+
+def track_blob_references(model, field_name='file'):
+    """Подключает подсчёт ссылок на блобы для файлового поля модели"""
+    uid = f'blob_refs_{model._meta.label_lower}_{field_name}'
+
+    def remember_previous(sender, instance, **kwargs):
+        instance._previous_file_names = getattr(instance, '_previous_file_names', {})
+        instance._uploading_files = getattr(instance, '_uploading_files', {})
+        previous = None
+        if instance.pk:
+            previous = sender._default_manager.filter(pk=instance.pk).values_list(field_name, flat=True).first()
+        instance._previous_file_names[field_name] = previous or ''
+        # Незаписанный файл сохранит FileField.pre_save, и ссылку на блоб возьмёт _save
+        field_file = getattr(instance, field_name)
+        instance._uploading_files[field_name] = bool(field_file) and not field_file._committed
+
+    def update_references(sender, instance, created, **kwargs):
+        current = getattr(instance, field_name).name or ''
+        previous = getattr(instance, '_previous_file_names', {}).get(field_name, '')
+        if not getattr(instance, '_uploading_files', {}).get(field_name):
+            if current == previous:
+                return
+            acquire_blob(current)
+        # При повторной загрузке того же содержимого это снимает лишнюю ссылку, взятую _save
+        release_blob(previous, getattr(instance, field_name).storage)
+
+    def drop_reference(sender, instance, **kwargs):
+        field_file = getattr(instance, field_name)
+        release_blob(field_file.name, field_file.storage)
+
+    pre_save.connect(remember_previous, sender=model, weak=False, dispatch_uid=uid)
+    post_save.connect(update_references, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(drop_reference, sender=model, weak=False, dispatch_uid=uid)
@@ -0,0 +1,26 @@
+from django.apps import apps
+
+from taskqueue.queue import on_upload, task
+from .dashboard import bump_news_version
+from .thumbnails import generate_thumbnails, is_image
+
+# (модель, поле) -> набор ширин из thumbnails.PRESETS
+THUMBNAIL_FIELDS = {
+    ('main.News', 'file'): 'news',
+    ('main.CustomUser', 'photo'): 'avatar',
+}
+
+
+@on_upload('main.News', 'main.CustomUser')
+@task(priority=5, max_attempts=3)
+def make_thumbnails(model, pk, field='file'):
+    """Уменьшенные копии загруженной картинки; файлы других типов пропускаются"""
+    preset = THUMBNAIL_FIELDS.get((model, field))
+    instance = apps.get_model(model).objects.filter(pk=pk).first()
+    field_file = getattr(instance, field, None)
+    if preset is None or not field_file or not is_image(field_file.name):
+        return
+    generate_thumbnails(field_file, preset)
+    if model == 'main.News':
+        # Закэшированная лента на главной ссылается на оригинал - пусть перерисуется с srcset
+        bump_news_version()
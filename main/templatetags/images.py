@@ -0,0 +1,42 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+
+from ..thumbnails import FORMATS, available_variants, is_image, thumbnail_name
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(field_file, preset, sizes='100vw', **attrs):
+    """<picture> с WebP и JPEG копиями изображения через srcset.
+
+    Пока фоновая задача не создала копии, отдаётся исходный файл.
+    Пример: {% responsive_image news.file 'news' sizes='120px' alt=news.title class='img-fluid' %}
+    """
+    if not field_file or not is_image(field_file.name):
+        return ''
+    attrs.setdefault('loading', 'lazy')
+    attributes = format_html_join(' ', '{}="{}"', sorted(attrs.items()))
+
+    variants = available_variants(field_file.name, preset)
+    if not variants:
+        return format_html('<img src="{}" {}>', field_file.url, attributes)
+
+    srcsets = {}
+    for width, fmt in variants:
+        url = default_storage.url(thumbnail_name(field_file.name, width, fmt))
+        srcsets.setdefault(fmt, []).append((url, width))
+    def srcset(fmt):
+        return ', '.join(f'{url} {width}w' for url, width in srcsets[fmt])
+
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        ((FORMATS[fmt][2], srcset(fmt), sizes) for fmt in srcsets if fmt != 'jpeg'),
+    )
+    # JPEG - для браузеров без WebP; src - для совсем старых без srcset
+    fallback = 'jpeg' if 'jpeg' in srcsets else next(iter(srcsets))
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" {}></picture>',
+        sources, srcsets[fallback][0][0], srcset(fallback), sizes, attributes,
+    )
@@ -0,0 +1,79 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class _QueryBudgetContext(CaptureQueriesContext):
+    def __init__(self, test_case, budget):
+        self.test_case = test_case
+        self.budget = budget
+        super().__init__(connection)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        super().__exit__(exc_type, exc_value, traceback)
+        if exc_type is not None:
+            return
+        executed = len(self)
+        if executed > self.budget:
+            queries = '\n'.join(
+                f'{i}. {query["sql"]}' for i, query in enumerate(self.captured_queries, start=1)
+            )
+            self.test_case.fail(
+                f'{executed} queries executed, budget is {self.budget}\nCaptured queries were:\n{queries}'
+            )
+
+
+class QueryBudgetMixin:
+    """Примесь для TestCase: view не должна выходить за фиксированный бюджет запросов.
+
+    В отличие от assertNumQueries проверяется только верхняя граница, поэтому
+    тест не ломается от того, что страница стала дешевле. Бюджеты подбираются
+    так, чтобы не зависеть от количества строк - любое N+1 их сразу превышает.
+    """
+
+    def assertQueryBudget(self, budget):
+        return _QueryBudgetContext(self, budget)
+
+
+class QueryPlanMixin:
+    """Примесь для TestCase: проверка по EXPLAIN, что запрос идёт по индексу, а не полным сканом"""
+
+    def assertUsesIndex(self, queryset, index_name=None):
+        plan = queryset.explain()
+        if connection.vendor == 'sqlite':
+            uses_index = 'USING INDEX' in plan or 'USING COVERING INDEX' in plan
+        else:
+            uses_index = 'Index' in plan
+        if not uses_index:
+            self.fail(f'Query does not use an index:\n{queryset.query}\nPlan:\n{plan}')
+        if index_name is not None:
+            self.assertIn(index_name, plan)
+
+
+def pdf_file(*pages):
+    """Минимальный PDF с текстом страниц (латиница, стандартный шрифт Helvetica) для тестов извлечения"""
+    count = len(pages)
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [%s] /Count %d >>' % (
+            b' '.join(b'%d 0 R' % (4 + 2 * i) for i in range(count)), count,
+        ),
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ]
+    for i, text in enumerate(pages):
+        stream = b'BT /F1 12 Tf 72 720 Td (%s) Tj ET' % text.encode('latin-1')
+        objects.append(
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+            b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>' % (5 + 2 * i)
+        )
+        objects.append(b'<< /Length %d >>\nstream\n%s\nendstream' % (len(stream), stream))
+
+    content = b'%PDF-1.4\n'
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(content))
+        content += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+    xref = len(content)
+    content += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    content += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    content += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return content
@@ -1,3 +1,613 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import os
+import shutil
+import tempfile
+import time as time_module
+from datetime import date, datetime, time, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
+from django.templatetags.cache import CacheNode
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from PIL import Image
+
+from schedule.models import Homework, Schedule, Subject
+from taskqueue.queue import work_off
+from . import events, faculties
+from .models import CustomUser, FileBlob, Group, News
+from .feed import PUBLISHED_COUNT_TIMEOUT, decode_cursor, feed_page, published_count, older_than
+from .storage import ContentAddressedStorage
+from .testing import QueryBudgetMixin, QueryPlanMixin, pdf_file
+from .thumbnails import thumbnail_name
+
+
+class HomeQueryBudgetTests(QueryBudgetMixin, TestCase):
+    # сессия, пользователь, группа для шапки, пары, страница новостей и COUNT при пустом кэше
+    HOME_BUDGET = 6
+
+    def setUp(self):
+        self.group = Group.objects.create(name='ВМК-101', faculty='ВМК', course=1)
+        self.user = CustomUser.objects.create(
+            username='student1', student_id='s0001', faculty='ВМК', course=1, group=self.group,
+        )
+
+    def add_news(self, count):
+        for i in range(count):
+            author = CustomUser.objects.create(
+                username=f'author{i}', student_id=f'a{i}', first_name=f'Автор{i}',
+                faculty='ВМК', course=0, role='teacher',
+            )
+            News.objects.create(title=f'Новость {i}', content='Текст', author=author)
+
+    def test_home_within_budget(self):
+        self.add_news(5)
+        teacher = CustomUser.objects.get(username='author0')
+        subject = Subject.objects.create(name='Программирование', teacher=teacher)
+        for number in range(1, 5):
+            Schedule.objects.create(
+                faculty='ВМК', group=self.group, day=date.today().weekday() % 6, lesson_number=number,
+                teacher_id=teacher.student_id, start_time=time(9, 0), end_time=time(10, 30),
+                subject=subject, classroom='505',
+            )
+        self.client.force_login(self.user)
+        with self.assertQueryBudget(self.HOME_BUDGET):
+            response = self.client.get(reverse('home'))
+        self.assertContains(response, 'Автор4')
+
+    def test_published_feed_skips_drafts(self):
+        self.add_news(2)
+        News.objects.filter(title='Новость 0').update(is_published=False)
+        self.assertEqual(list(News.objects.published().values_list('title', flat=True)), ['Новость 1'])
+
+
+class NewsIndexTests(QueryPlanMixin, TestCase):
+    def test_published_feed_uses_index(self):
+        self.assertUsesIndex(News.objects.published(), 'news_published_feed_idx')
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class DownloadTests(TestCase):
+    CONTENT = bytes(range(256)) * 4
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='teacher1', student_id='t0001', faculty='ВМК', course=0)
+        self.news = News.objects.create(
+            title='Лекция', content='Текст', author=self.user,
+            file=SimpleUploadedFile('lecture.pdf', self.CONTENT),
+        )
+        self.url = reverse('download_news', args=[self.news.id])
+        self.client.force_login(self.user)
+
+    def test_full_download(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn('attachment; filename="lecture', response['Content-Disposition'])
+        self.assertTrue(response['ETag'].startswith('"'))
+
+    def test_byte_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT[10:20])
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.CONTENT)}')
+        self.assertEqual(response['Content-Length'], '10')
+
+    def test_suffix_and_open_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT[-5:])
+        response = self.client.get(self.url, HTTP_RANGE='bytes=1000-')
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT[1000:])
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.CONTENT)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.CONTENT)}')
+
+    def test_suffix_range_of_empty_file(self):
+        empty = News.objects.create(
+            title='Пусто', content='Текст', author=self.user, file=SimpleUploadedFile('empty.txt', b''),
+        )
+        response = self.client.get(reverse('download_news', args=[empty.id]), HTTP_RANGE='bytes=-5')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */0')
+
+    def test_if_none_match(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_stale_if_range_returns_whole_file(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"outdated"')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(DOWNLOADS_SENDFILE='nginx', DOWNLOADS_ACCEL_REDIRECT_PREFIX='/protected-media/')
+    def test_nginx_handoff(self):
+        response = self.client.get(self.url)
+        digest = self.news.file.name.split('/')[1]
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/blobs/{digest[:2]}/{digest}.pdf')
+        self.assertEqual(response.content, b'')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class BlobStorageTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='teacher1', student_id='t0001', faculty='ВМК', course=0)
+
+    def add_news(self, filename, content):
+        with self.captureOnCommitCallbacks(execute=True):
+            return News.objects.create(
+                title='Новость', content='Текст', author=self.user,
+                file=SimpleUploadedFile(filename, content),
+            )
+
+    def delete(self, obj):
+        with self.captureOnCommitCallbacks(execute=True):
+            obj.delete()
+
+    def test_duplicate_uploads_share_one_blob(self):
+        first = self.add_news('lecture.pdf', b'same bytes')
+        second = self.add_news('copy of lecture.pdf', b'same bytes')
+        self.assertNotEqual(first.file.name, second.file.name)
+        self.assertEqual(first.file.path, second.file.path)
+        self.assertEqual(second.file.name.rsplit('/', 1)[1], 'copy_of_lecture.pdf')
+        self.assertEqual(FileBlob.objects.get().ref_count, 2)
+
+    def test_blob_removed_with_last_reference(self):
+        first = self.add_news('lecture.pdf', b'shared')
+        second = self.add_news('lecture.pdf', b'shared')
+        path = first.file.path
+
+        self.delete(first)
+        self.assertTrue(os.path.exists(path))
+        self.delete(second)
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(FileBlob.objects.exists())
+
+    def test_upload_between_release_and_unlink_keeps_file(self):
+        first = self.add_news('lecture.pdf', b'shared')
+        with self.captureOnCommitCallbacks() as callbacks:
+            first.delete()
+        save = ContentAddressedStorage._save
+
+        def save_then_unlink(storage, name, content):
+            # Последняя ссылка удаляется между записью файла и сохранением второй новости
+            saved = save(storage, name, content)
+            for callback in callbacks:
+                callback()
+            return saved
+
+        with mock.patch.object(ContentAddressedStorage, '_save', save_then_unlink):
+            second = self.add_news('lecture.pdf', b'shared')
+        self.assertTrue(os.path.exists(second.file.path))
+        self.assertEqual(FileBlob.objects.get().ref_count, 1)
+
+    def test_reuploading_same_content_keeps_one_reference(self):
+        news = self.add_news('lecture.pdf', b'same')
+        news.file = SimpleUploadedFile('lecture.pdf', b'same')
+        with self.captureOnCommitCallbacks(execute=True):
+            news.save()
+        self.assertTrue(os.path.exists(news.file.path))
+        self.assertEqual(FileBlob.objects.get().ref_count, 1)
+
+    def test_replacing_file_releases_old_blob(self):
+        news = self.add_news('old.pdf', b'old')
+        old_path = news.file.path
+        news.file = SimpleUploadedFile('new.pdf', b'new')
+        with self.captureOnCommitCallbacks(execute=True):
+            news.save()
+        self.assertFalse(os.path.exists(old_path))
+        self.assertEqual(FileBlob.objects.get().digest, news.file.name.split('/')[1])
+
+
+def image_bytes(size, mode='RGB', fmt='PNG', **params):
+    buffer = io.BytesIO()
+    Image.new(mode, size).save(buffer, fmt, **params)
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, TEXT_EXTRACTION_WORKERS=0)
+class ThumbnailTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create(username='teacher1', student_id='t0001', faculty='ВМК', course=0)
+
+    def add_news(self, filename, content):
+        news = News.objects.create(
+            title='Новость', content='Текст', author=self.user, file=SimpleUploadedFile(filename, content),
+        )
+        return news
+
+    def render(self, news):
+        return Template("{% load images %}{% responsive_image news.file 'news' sizes='120px' alt=news.title %}").render(
+            Context({'news': news})
+        )
+
+    def test_variants_generated_in_background(self):
+        news = self.add_news('photo.png', image_bytes((800, 600), 'RGBA'))
+        html = self.render(news)
+        self.assertNotIn('<picture>', html)
+        self.assertIn(f'src="{news.file.url}"', html)
+
+        work_off('test')
+        for width in (160, 320, 640):
+            for fmt in ('webp', 'jpeg'):
+                self.assertTrue(default_storage.exists(thumbnail_name(news.file.name, width, fmt)))
+        self.assertFalse(default_storage.exists(thumbnail_name(news.file.name, 1280, 'webp')))
+        with default_storage.open(thumbnail_name(news.file.name, 320, 'jpeg')) as file:
+            image = Image.open(file)
+            self.assertEqual((image.format, image.mode, image.size), ('JPEG', 'RGB', (320, 240)))
+
+        html = self.render(news)
+        self.assertIn('<source type="image/webp" srcset="', html)
+        self.assertIn('640w', html)
+        self.assertNotIn('1280w', html)
+        self.assertIn('alt="Новость"', html)
+
+    def test_exif_orientation_applied(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # повернуть на 90° по часовой
+        news = self.add_news('phone.jpg', image_bytes((400, 200), fmt='JPEG', exif=exif))
+        work_off('test')
+        with default_storage.open(thumbnail_name(news.file.name, 160, 'webp')) as file:
+            self.assertEqual(Image.open(file).size, (160, 320))
+
+    def test_non_image_is_ignored(self):
+        news = self.add_news('plan.pdf', pdf_file('Plan'))
+        work_off('test')
+        self.assertEqual(self.render(news), '')
+
+
+class FacultiesPageTests(TestCase):
+    def setUp(self):
+        faculties.clear_cache()
+        self.addCleanup(faculties.clear_cache)
+
+    def test_repeat_visit_gets_304(self):
+        response = self.client.get('/')
+        self.assertContains(response, 'Факультеты МГУ')
+        self.assertIn('Cookie', response['Vary'])
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        response = self.client.get('/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_cache_hit_skips_filesystem_and_templates(self):
+        first = self.client.get('/')
+        with mock.patch.object(faculties.os, 'stat') as stat, mock.patch.object(faculties, 'render') as render:
+            second = self.client.get('/')
+        stat.assert_not_called()
+        render.assert_not_called()
+        self.assertEqual(first.content, second.content)
+
+    def test_changed_json_is_reloaded(self):
+        path = os.path.join(tempfile.mkdtemp(), 'faculties.json')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+
+        def write(name):
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump({'faculties': [{'id': 1, 'name': name, 'full_name': 'Факультет'}]}, file)
+
+        write('ВМК')
+        with mock.patch.object(faculties, 'FACULTIES_JSON', path), \
+                mock.patch.object(faculties, 'FACULTIES_CHECK_INTERVAL', 0):
+            self.assertEqual(faculties.get_faculties()[0]['name'], 'ВМК')
+            with mock.patch.object(faculties, 'load_faculties_from_json') as load:
+                faculties.get_faculties()
+            load.assert_not_called()
+
+            write('Мехмат')
+            os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10 ** 9))
+            self.assertEqual(faculties.get_faculties()[0]['name'], 'Мехмат')
+            self.assertContains(self.client.get('/'), 'Мехмат')
+
+
+class NewsFeedTests(QueryPlanMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = CustomUser.objects.create(
+            username='teacher1', student_id='t0001', first_name='Анна', faculty='ВМК', course=0, role='teacher',
+        )
+        moment = datetime(2025, 9, 1, 12, 0, tzinfo=dt_timezone.utc)
+        self.news = []
+        for i in range(12):
+            news = News.objects.create(title=f'Новость {i}', content='Текст', author=self.author)
+            # У трёх новостей одинаковое время - порядок между ними решает id
+            News.objects.filter(pk=news.pk).update(created_at=moment.replace(minute=min(i, 9)))
+            self.news.append(news)
+        self.expected = [news.pk for news in reversed(self.news)]
+
+    def test_walk_forward_and_back(self):
+        seen, pages, after = [], [], None
+        while True:
+            page = feed_page(after=after, size=5)
+            pages.append(page)
+            seen.extend(news.pk for news in page.items)
+            if not page.next_cursor:
+                break
+            after = page.next_cursor
+        self.assertEqual(seen, self.expected)
+        self.assertEqual([len(page.items) for page in pages], [5, 5, 2])
+        self.assertIsNone(pages[0].previous_cursor)
+
+        back = feed_page(before=pages[2].previous_cursor, size=5)
+        self.assertEqual([news.pk for news in back.items], [news.pk for news in pages[1].items])
+        back = feed_page(before=back.previous_cursor, size=5)
+        self.assertEqual([news.pk for news in back.items], self.expected[:5])
+        self.assertIsNone(back.previous_cursor)
+
+    def test_cursor_query_uses_feed_index(self):
+        cursor = feed_page(size=5).next_cursor
+        queryset = News.objects.published().filter(older_than(*decode_cursor(cursor)))
+        self.assertUsesIndex(queryset, 'news_published_feed_idx')
+
+    def test_published_count_follows_saves_and_deletes(self):
+        self.assertEqual(published_count(), 12)
+        with self.assertNumQueries(0):
+            self.assertEqual(published_count(), 12)
+
+        self.news[0].is_published = False
+        self.news[0].save()
+        self.news[1].delete()
+        News.objects.create(title='Черновик', content='...', author=self.author, is_published=False)
+        News.objects.create(title='Свежая', content='...', author=self.author)
+        with self.assertNumQueries(0):
+            self.assertEqual(published_count(), 11)
+        cache.clear()
+        self.assertEqual(published_count(), 11)
+
+    def test_published_count_heals_after_bulk_update(self):
+        self.assertEqual(published_count(), 12)
+        News.objects.filter(pk__in=[news.pk for news in self.news[:4]]).update(is_published=False)
+        self.assertEqual(published_count(), 12)
+        later = time_module.time() + PUBLISHED_COUNT_TIMEOUT + 1
+        with mock.patch('time.time', return_value=later):
+            self.assertEqual(published_count(), 8)
+
+    def test_json_feed(self):
+        self.client.force_login(self.author)
+        data = self.client.get(reverse('news_feed')).json()
+        self.assertEqual(data['count'], 12)
+        self.assertEqual([item['id'] for item in data['results']], self.expected[:5])
+        data = self.client.get(reverse('news_feed'), {'after': data['next']}).json()
+        self.assertEqual([item['id'] for item in data['results']], self.expected[5:10])
+        self.assertEqual(data['results'][0]['author'], 'Анна')
+        self.assertEqual(self.client.get(reverse('news_feed'), {'after': 'мусор'}).status_code, 400)
+
+    def test_home_links_to_next_page(self):
+        self.client.force_login(self.author)
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, f'?after={response.context["feed"].next_cursor}')
+        self.assertNotContains(response, '?before=')
+
+
+class MondayDate(date):
+    @classmethod
+    def today(cls):
+        return cls(2025, 9, 1)
+
+
+class DashboardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch('main.dashboard.date', MondayDate)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.group = Group.objects.create(name='ВМК-101', faculty='ВМК', course=1)
+        self.teacher = CustomUser.objects.create(
+            username='teacher1', student_id='t0001', first_name='Анна', faculty='ВМК', course=0, role='teacher',
+        )
+        self.students = [
+            CustomUser.objects.create(
+                username=f'student{i}', student_id=f's000{i}', first_name=f'Студент{i}',
+                faculty='ВМК', course=1, group=self.group,
+            )
+            for i in range(2)
+        ]
+        self.subject = Subject.objects.create(name='Программирование', teacher=self.teacher)
+        self.lesson = Schedule.objects.create(
+            faculty='ВМК', group=self.group, day=0, lesson_number=1,
+            start_time=time(9, 0), end_time=time(10, 30), subject=self.subject, classroom='505',
+        )
+        News.objects.create(title='Начало семестра', content='Текст', author=self.teacher)
+
+    def home_as(self, user):
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('home'))
+        tables = ('schedule_schedule', 'main_news')
+        return response, [q['sql'] for q in ctx.captured_queries if any(t in q['sql'] for t in tables)]
+
+    def test_group_mates_share_fragments(self):
+        self.home_as(self.students[0])
+        response, queries = self.home_as(self.students[1])
+        self.assertEqual(queries, [])
+        self.assertContains(response, 'Добро пожаловать, Студент1')
+        self.assertContains(response, 'Начало семестра')
+
+    def test_news_change_refreshes_feed(self):
+        self.home_as(self.students[0])
+        News.objects.create(title='Перенос экзамена', content='Текст', author=self.teacher)
+        self.assertContains(self.home_as(self.students[1])[0], 'Перенос экзамена')
+
+    def test_schedule_change_refreshes_block(self):
+        self.home_as(self.students[0])
+        self.lesson.classroom = '612'
+        self.lesson.save()
+        self.assertContains(self.home_as(self.students[1])[0], '612')
+
+    def test_moderator_controls_not_shared(self):
+        response, _ = self.home_as(self.teacher)
+        self.assertContains(response, reverse('edit_news', args=[News.objects.get().pk]))
+        response, _ = self.home_as(self.students[0])
+        self.assertNotContains(response, reverse('edit_news', args=[News.objects.get().pk]))
+
+    def test_moderator_feed_skips_cache(self):
+        fragments = []
+        render = CacheNode.render
+
+        def spy(node, context):
+            fragments.append(node.fragment_name)
+            return render(node, context)
+
+        with mock.patch.object(CacheNode, 'render', spy):
+            self.home_as(self.teacher)
+        self.assertIn('dashboard_schedule', fragments)
+        self.assertNotIn('dashboard_news', fragments)
+
+    @override_settings(MEDIA_ROOT=MEDIA_ROOT)
+    def test_thumbnails_refresh_cached_feed(self):
+        News.objects.create(
+            title='Фото с олимпиады', content='Текст', author=self.teacher,
+            file=SimpleUploadedFile('photo.png', image_bytes((800, 600))),
+        )
+        response, _ = self.home_as(self.students[0])
+        self.assertContains(response, 'Фото с олимпиады')
+        self.assertNotContains(response, '<picture>')
+        work_off('test')
+        self.assertContains(self.home_as(self.students[1])[0], '<picture>')
+
+
+class EventStreamTests(TestCase):
+    def setUp(self):
+        self.group = Group.objects.create(name='ВМК-101', faculty='ВМК', course=1)
+        self.teacher = CustomUser.objects.create_user(
+            username='teacher1', password='pass', student_id='t0001', faculty='ВМК', course=0, role='teacher',
+        )
+        self.student = CustomUser.objects.create_user(
+            username='student1', password='pass', student_id='s0001', faculty='ВМК', course=1,
+            role='student', group=self.group,
+        )
+
+    def test_fan_out_only_to_channel_subscribers(self):
+        broker = events.InProcessBroker()
+
+        async def scenario():
+            group = broker.subscribe([events.group_channel(self.group.pk)])
+            other = broker.subscribe([events.group_channel(self.group.pk + 1)])
+            # Публикация из синхронного кода идёт из другого потока
+            await asyncio.to_thread(broker.publish, events.group_channel(self.group.pk), {'type': 'homework', 'id': 1})
+            received = await group.get(1), await other.get(0.05)
+            broker.unsubscribe(group)
+            broker.unsubscribe(other)
+            return received
+
+        self.assertEqual(asyncio.run(scenario()), ({'type': 'homework', 'id': 1}, None))
+        self.assertEqual(broker.subscriber_count(events.group_channel(self.group.pk)), 0)
+
+    def test_slow_client_keeps_latest_events(self):
+        async def scenario():
+            subscription = events.Subscription(['news'], size=2)
+            for number in range(3):
+                subscription.put({'type': 'news', 'id': number})
+            return [await subscription.get(0) for _ in range(2)]
+
+        self.assertEqual([event['id'] for event in asyncio.run(scenario())], [1, 2])
+
+    def test_homework_and_news_published_after_commit(self):
+        subject = Subject.objects.create(name='Программирование', teacher=self.teacher)
+        lesson = Schedule.objects.create(
+            faculty='ВМК', group=self.group, day=0, lesson_number=1, teacher_id='t0001', subject=subject,
+            classroom='505', start_time=time(9, 0), end_time=time(10, 30),
+        )
+        published = []
+        with mock.patch.object(events.InProcessBroker, 'publish', lambda broker, *args: published.append(args)):
+            with self.captureOnCommitCallbacks(execute=True):
+                homework = Homework.objects.create(
+                    schedule=lesson, content='Задачи 1-5', created_by=self.teacher, group=self.group, subject=subject,
+                    due_date=date(2025, 9, 8),
+                )
+                self.assertEqual(published, [])
+            with self.captureOnCommitCallbacks(execute=True):
+                news = News.objects.create(title='Черновик', content='Текст', author=self.teacher, is_published=False)
+                news.is_published = True
+                news.save()
+                # Повторное сохранение опубликованной новости событие не шлёт
+                news.save()
+        self.assertEqual([channel for channel, _ in published], [
+            events.group_channel(self.group.pk), events.teacher_channel('t0001'), events.NEWS_CHANNEL,
+        ])
+        self.assertEqual(published[0][1], {
+            'type': 'homework', 'action': 'added', 'id': homework.pk, 'group_id': self.group.pk,
+            'schedule_id': lesson.pk, 'due_date': date(2025, 9, 8),
+        })
+        self.assertEqual(published[2][1], {'type': 'news', 'action': 'published', 'id': news.pk, 'title': 'Черновик'})
+        self.assertIn('"due_date": "2025-09-08"', events.format_event(published[0][1]))
+
+    def test_cascade_delete_skips_teacher_lookup(self):
+        subject = Subject.objects.create(name='Программирование', teacher=self.teacher)
+        lesson = Schedule.objects.create(
+            faculty='ВМК', group=self.group, day=0, lesson_number=1, teacher_id='t0001', subject=subject,
+            classroom='505',
+        )
+        for number in range(5):
+            Homework.objects.create(
+                schedule=lesson, content=f'Задание {number}', created_by=self.teacher, group=self.group,
+                subject=subject,
+            )
+        with CaptureQueriesContext(connection) as queries:
+            lesson.delete()
+        lookups = [query['sql'] for query in queries if 'SELECT "schedule_schedule"."teacher_id"' in query['sql']]
+        self.assertEqual(lookups, [])
+
+    def test_requires_asgi_and_login(self):
+        self.client.force_login(self.student)
+        self.assertEqual(self.client.get(reverse('event_stream')).status_code, 501)
+
+    async def test_pages_subscribe_only_under_asgi(self):
+        await self.async_client.aforce_login(self.student)
+        response = await self.async_client.get(reverse('home'))
+        self.assertContains(response, f"new EventSource('{reverse('event_stream')}')")
+        self.assertContains(response, 'data-event-badge="homework"')
+
+        await self.client.aforce_login(self.student)
+        response = await sync_to_async(self.client.get)(reverse('home'))
+        self.assertNotContains(response, 'EventSource')
+
+    async def test_stream_delivers_group_events(self):
+        response = await self.async_client.get(reverse('event_stream'))
+        self.assertEqual(response.status_code, 401)
+
+        await self.async_client.aforce_login(self.student)
+        response = await self.async_client.get(reverse('event_stream'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        chunks = aiter(response.streaming_content)
+        self.assertEqual(await anext(chunks), f'retry: {events.RETRY_MS}\n\n'.encode())
+
+        broker = events.get_broker()
+        channel = events.group_channel(self.group.pk)
+        self.assertEqual(broker.subscriber_count(channel), 1)
+        broker.publish(channel, {'type': 'homework', 'action': 'added', 'id': 7})
+        frame = (await anext(chunks)).decode()
+        self.assertTrue(frame.startswith('event: homework\ndata: '))
+        self.assertEqual(json.loads(frame.split('data: ', 1)[1])['id'], 7)
+
+        # При отключении клиента сервер отменяет ожидание следующего кадра - подписка снимается
+        waiting = asyncio.ensure_future(anext(chunks))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        self.assertEqual(broker.subscriber_count(channel), 0)
@@ -0,0 +1,117 @@
+"""Уменьшенные копии изображений новостей и фото профилей.
+
+Копии строятся фоновой задачей (main/tasks.py) сразу после загрузки и
+лежат в MEDIA_ROOT/thumbs/ под ключом из хэша содержимого, поэтому
+одинаковые загрузки используют одни и те же файлы. Шаблонный тег
+responsive_image (templatetags/images.py) отдаёт их через srcset.
+"""
+import hashlib
+import io
+import os
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .storage import blob_digest
+
+THUMBS_DIR = 'thumbs'
+# Ширины в пикселях под места, где картинка показывается
+PRESETS = {
+    'news': (160, 320, 640, 1280),
+    'avatar': (40, 80, 160, 320),
+}
+# (формат Pillow, расширение, MIME-тип, параметры сохранения); WebP - основной, JPEG - для старых браузеров
+FORMATS = {
+    'webp': ('WEBP', 'webp', 'image/webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.tif', '.tiff'}
+VARIANTS_TIMEOUT = 24 * 60 * 60
+# Пока задача не отработала, проверяем диск снова через минуту
+PENDING_TIMEOUT = 60
+
+
+def is_image(name):
+    return bool(name) and os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+
+
+def thumbnail_key(name):
+    """Ключ копий: SHA-256 содержимого для блобов, иначе хэш имени файла"""
+    return blob_digest(name) or hashlib.sha256(name.encode('utf-8')).hexdigest()
+
+
+def thumbnail_name(name, width, fmt):
+    key = thumbnail_key(name)
+    return f'{THUMBS_DIR}/{key[:2]}/{key}/{width}.{FORMATS[fmt][1]}'
+
+
+def _variants_cache_key(name, preset):
+    return f'thumbs:{thumbnail_key(name)}:{preset}'
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+
+
+def _convert(image, fmt):
+    if fmt == 'jpeg':
+        if _has_alpha(image):
+            # JPEG без прозрачности - подкладываем белый фон
+            rgba = image.convert('RGBA')
+            background = Image.new('RGB', rgba.size, (255, 255, 255))
+            background.paste(rgba, mask=rgba.getchannel('A'))
+            return background
+        return image if image.mode == 'RGB' else image.convert('RGB')
+    if image.mode in ('RGB', 'RGBA'):
+        return image
+    return image.convert('RGBA' if _has_alpha(image) else 'RGB')
+
+
+def generate_thumbnails(field_file, preset):
+    """Создаёт недостающие копии изображения; возвращает список доступных (ширина, формат)"""
+    name = field_file.name
+    widths = sorted(PRESETS[preset], reverse=True)
+    with field_file.open('rb') as source:
+        image = Image.open(source)
+        # Для JPEG декодер сразу уменьшает картинку кратно 2 - большие фото с телефона
+        # разбираются в разы быстрее. Квадратный размер сохраняет запас и при повороте по EXIF
+        image.draft('RGB', (widths[0], widths[0]))
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+    available = []
+    current = image
+    # От большей ширины к меньшей: каждую копию уменьшаем из предыдущей, а не из оригинала
+    for width in widths:
+        if width > image.width:
+            continue
+        height = max(1, round(image.height * width / image.width))
+        current = current.resize((width, height), Image.Resampling.LANCZOS)
+        for fmt, (pil_format, _, _, options) in FORMATS.items():
+            target = thumbnail_name(name, width, fmt)
+            if not default_storage.exists(target):
+                buffer = io.BytesIO()
+                _convert(current, fmt).save(buffer, pil_format, **options)
+                default_storage.save(target, ContentFile(buffer.getvalue()))
+            available.append((width, fmt))
+
+    available.sort()
+    cache.set(_variants_cache_key(name, preset), available, VARIANTS_TIMEOUT)
+    return available
+
+
+def available_variants(name, preset):
+    """Готовые копии изображения [(ширина, формат)], по возрастанию ширины"""
+    key = _variants_cache_key(name, preset)
+    available = cache.get(key)
+    if available is None:
+        available = [
+            (width, fmt)
+            for width in sorted(PRESETS[preset])
+            for fmt in FORMATS
+            if default_storage.exists(thumbnail_name(name, width, fmt))
+        ]
+        cache.set(key, available, VARIANTS_TIMEOUT if available else PENDING_TIMEOUT)
+    return available
@@ -1,106 +1,32 @@
-import json
-import os
-from django.http import FileResponse
 from django.shortcuts import render, get_object_or_404, redirect
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.urls import reverse
 from django.contrib.auth import login, authenticate
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.conf import settings
 from .forms import CustomAuthForm
-from django.core.paginator import Paginator
+from .downloads import serve_file
+from .faculties import faculties_response
+from .dashboard import dashboard_context
+from .events import get_broker, stream, user_channels
+from .feed import feed_page, published_count
 from datetime import datetime, timedelta, date
 from .models import News
 from django.contrib import messages
 from .forms import NewsForm
-from schedule.models import Schedule
 
 
 def is_teacher_or_above(user):
     return user.role in ['teacher', 'admin']
 
 
-def load_faculties_from_json():
-    """Загружает данные о факультетах из JSON файла"""
-    json_path = os.path.join(settings.BASE_DIR, 'static', 'data', 'faculties.json')
-
-    try:
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            faculties = data.get('faculties', [])
-
-            # Добавляем пути к локальным логотипам
-            for faculty in faculties:
-                # Формируем путь к локальному файлу логотипа
-                logo_filename = f"{faculty['name'].lower()}.png"
-                logo_path = f"images/faculties/{logo_filename}"
-
-                # Проверяем существует ли файл
-                full_logo_path = os.path.join(settings.BASE_DIR, 'static', logo_path)
-                if os.path.exists(full_logo_path):
-                    faculty['local_logo'] = logo_path
-                else:
-                    faculty['local_logo'] = None
-
-            return faculties
-    except FileNotFoundError:
-        return get_default_faculties()
-    except Exception as e:
-        print(f"Ошибка загрузки JSON: {e}")
-        return get_default_faculties()
-
-
-def get_default_faculties():
-    """Возвращает тестовые данные с локальными логотипами"""
-    return [
-        {
-            'id': 1,
-            'name': 'ВМК',
-            'full_name': 'Факультет вычислительной математики и кибернетики',
-            'description': 'Ведущий факультет в области computer science в России. Готовит специалистов в области программирования, искусственного интеллекта, анализа данных и кибербезопасности.',
-            'points': 424,
-            'max_points': 500,
-            'previous_points': 414,
-            'website': 'https://cs.msu.ru',
-            'contact': 'vmk@cs.msu.ru',
-            'phone': '+7 (495) 939-54-01',
-            'local_logo': 'data/faculties/1.png'
-        }
-    ]
-
-
 def home(request):
     if request.user.is_authenticated:
-        # Получаем расписание на сегодня для текущего пользователя
-        today_schedule = []
-        if hasattr(request.user, 'group') and request.user.group:
-            # Получаем день недели для сегодня
-            days_map = {
-                0: 'monday', 1: 'tuesday', 2: 'wednesday',
-                3: 'thursday', 4: 'friday', 5: 'saturday'
-            }
-            today = date.today()
-            today_day = days_map.get(today.weekday(), 'monday')
-
-            # Получаем расписание на сегодня
-            today_schedule = Schedule.objects.filter(
-                group=request.user.group,
-                day=today_day
-            ).order_by('lesson_number')
-
-        # Получаем новости с пагинацией
-        news_list = News.objects.filter(is_published=True).order_by('-created_at')
-        paginator = Paginator(news_list, 5)  # 5 новостей на страницу
-        page_number = request.GET.get('page')
-        page_obj = paginator.get_page(page_number)
-
-        context = {
-            'today_schedule': today_schedule,
-            'page_obj': page_obj,
-            'today': date.today(),
-        }
+        # Расписание, лента и статистика кэшируются фрагментами (см. dashboard.py)
+        context = dashboard_context(request)
         return render(request, 'home.html', context)
     else:
-        faculties = load_faculties_from_json()
-        return render(request, 'faculties.html', {'faculties': faculties})
+        return faculties_response(request)
 
 
 def login_view(request):
@@ -146,12 +72,11 @@ def add_news(request):
 def edit_news(request, news_id):
     """Редактирование новости"""
     news = get_object_or_404(News, id=news_id)
-    file = news.file
     if request.method == 'POST':
         form = NewsForm(request.POST, request.FILES, instance=news)
         if form.is_valid():
-            if os.path.isfile(f"media/{file}"):
-                os.remove(f"media/{file}")
+            # Старый файл освобождается, а новый ставится на обработку сигналами
+            # (см. main/storage.py и taskqueue.queue.track_uploads)
             form.save()
             messages.success(request, 'Новость успешно обновлена')
             return redirect('home')
@@ -167,8 +92,6 @@ def delete_news(request, news_id):
     """Удаление новости"""
     news = get_object_or_404(News, id=news_id)
     if request.method == 'POST':
-        if os.path.isfile(f"media/{news.file}"):
-            os.remove(f"media/{news.file}")
         news.delete()
         messages.success(request, 'Новость успешно удалена')
     return redirect('home')
@@ -177,9 +100,54 @@ def delete_news(request, news_id):
 def download_news(request, news_id):
     news = get_object_or_404(News, id=news_id)
     if news.file:
-        response = FileResponse(news.file.open(), as_attachment=True)
-        response['Content-Disposition'] = f'attachment; filename="{news.file.name}"'
-        return response
+        return serve_file(request, news.file)
     else:
         messages.error(request, "Файл не найден")
-        return redirect('home')
\ No newline at end of file
+        return redirect('home')
+
+
+@login_required
+def news_feed(request):
+    """Лента новостей в JSON для бесконечной прокрутки, курсоры те же, что на главной"""
+    try:
+        feed = feed_page(after=request.GET.get('after'), before=request.GET.get('before'))
+    except ValueError:
+        return JsonResponse({'error': 'Некорректный курсор'}, status=400)
+
+    results = [
+        {
+            'id': news.id,
+            'title': news.title,
+            'content': news.content,
+            'category': news.category,
+            'author': news.author.get_full_name(),
+            'created_at': news.created_at.isoformat(),
+            'file_url': reverse('download_news', args=[news.id]) if news.file else None,
+        }
+        for news in feed.items
+    ]
+    return JsonResponse({
+        'count': published_count(),
+        'next': feed.next_cursor,
+        'previous': feed.previous_cursor,
+        'results': results,
+    }, json_dumps_params={'ensure_ascii': False})
+
+
+async def event_stream(request):
+    """Поток Server-Sent Events: новости для всех и ДЗ групп пользователя.
+
+    Работает только под ASGI: под WSGI каждое соединение держало бы поток воркера.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': 'Поток событий доступен только через ASGI-сервер'}, status=501)
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'error': 'Требуется вход'}, status=401)
+
+    subscription = get_broker().subscribe(user_channels(user))
+    response = StreamingHttpResponse(stream(subscription), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # nginx иначе копит ответ в буфере и события приходят пачками
+    response['X-Accel-Buffering'] = 'no'
+    return response
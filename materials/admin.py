@@ -1,19 +1,21 @@
 from django.contrib import admin
-from .models import Material, MaterialFolder
+from .models import Material, MaterialFacet, MaterialFolder
 
 
 @admin.register(MaterialFolder)
 class MaterialFolderAdmin(admin.ModelAdmin):
     list_display = ['name', 'faculty', 'course', 'subject', 'parent_folder', 'created_by', 'created_at']
     list_filter = ['faculty', 'course', 'subject', 'created_at']
+    list_select_related = ['parent_folder', 'created_by']
     search_fields = ['name', 'faculty', 'subject', 'created_by__username']
-    readonly_fields = ['created_at']
+    readonly_fields = ['path', 'created_at']
     ordering = ['faculty', 'course', 'subject', 'name']
 
 
 @admin.register(Material)
 class MaterialAdmin(admin.ModelAdmin):
     list_display = ['name', 'faculty', 'course', 'subject', 'type', 'uploaded_by', 'upload_date', 'folder']
+    list_select_related = ['uploaded_by', 'folder']
     list_filter = ['faculty', 'course', 'subject', 'type', 'upload_date']
     search_fields = ['name', 'subject', 'uploaded_by__username', 'faculty']
     readonly_fields = ['upload_date']
@@ -27,4 +29,11 @@ class MaterialAdmin(admin.ModelAdmin):
             'fields': ('uploaded_by', 'upload_date'),
             'classes': ('collapse',)
         }),
-    )
\ No newline at end of file
+    )
+
+
+@admin.register(MaterialFacet)
+class MaterialFacetAdmin(admin.ModelAdmin):
+    list_display = ['faculty', 'course', 'subject', 'type', 'count']
+    list_filter = ['faculty', 'course', 'type']
+    ordering = ['faculty', 'course', 'subject', 'type']
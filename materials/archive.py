@@ -0,0 +1,166 @@
+"""ZIP-архив раздела каталога или папки, собираемый на лету.
+
+Архив пишется в генератор по кускам, без временного файла: в памяти
+держится только очередной кусок файла и то, что ZipFile успел записать
+после него. Уже сжатые форматы кладутся без сжатия (ZIP_STORED) - deflate
+для них только тратит процессор. ETag считается по списку файлов, поэтому
+повторный запрос неизменённого раздела стоит одного запроса к базе и 304.
+"""
+import hashlib
+import io
+import logging
+import os
+import zipfile
+from collections import namedtuple
+
+from django.http import Http404, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import content_disposition_header
+
+from main.downloads import CHUNK_SIZE
+from .models import Material, MaterialFolder
+
+logger = logging.getLogger(__name__)
+
+# Форматы, которые и так сжаты; PDF почти всегда внутри сжат Flate
+STORED_EXTENSIONS = {
+    '.zip', '.rar', '.7z', '.gz', '.bz2', '.xz',
+    '.jpg', '.jpeg', '.png', '.gif', '.webp',
+    '.mp3', '.mp4', '.mkv', '.avi', '.mov', '.webm',
+    '.docx', '.pptx', '.xlsx', '.odt', '.odp', '.ods', '.epub', '.djvu', '.pdf',
+}
+ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)
+
+ArchiveEntry = namedtuple('ArchiveEntry', 'arcname name size date_time')
+
+
+class _ZipSink(io.RawIOBase):
+    """Приёмник для ZipFile без seek: копит записанное до следующего yield"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _safe_component(value):
+    # Предмет и названия папок вводят пользователи - не даём выйти за пределы архива
+    value = str(value).replace('/', '_').replace('\\', '_').strip()
+    return '_' if value in ('', '.', '..') else value
+
+
+def _entries(rows):
+    """ArchiveEntry из (каталоги, имя в хранилище, размер, дата); одинаковые имена нумеруются"""
+    entries, seen = [], set()
+    for directories, name, size, uploaded in rows:
+        filename = _safe_component(os.path.basename(name))
+        arcname = '/'.join([*map(_safe_component, directories), filename])
+        root, extension = os.path.splitext(arcname)
+        number = 1
+        while arcname in seen:
+            number += 1
+            arcname = f'{root} ({number}){extension}'
+        seen.add(arcname)
+        date_time = max(timezone.localtime(uploaded).timetuple()[:6], ZIP_EPOCH)
+        entries.append(ArchiveEntry(arcname, name, size, date_time))
+    return entries
+
+
+def catalog_entries(faculty, course=None, subject=None, material_type=None):
+    """Файлы раздела каталога; уровни ниже выбранного становятся каталогами архива"""
+    filters = {'faculty': faculty, 'course': course, 'subject': subject, 'type': material_type}
+    type_labels = dict(Material.TYPES)
+    rows = (
+        Material.objects.filter(**{field: value for field, value in filters.items() if value is not None})
+        .exclude(file='')
+        .order_by('course', 'subject', 'type', 'name', 'id')
+        .values_list('course', 'subject', 'type', 'file', 'size', 'upload_date')
+    )
+    return _entries(
+        (
+            [
+                *([f'{row_course} курс'] if course is None else []),
+                *([row_subject] if subject is None else []),
+                *([type_labels.get(row_type, row_type)] if material_type is None else []),
+            ],
+            name, size, uploaded,
+        )
+        for row_course, row_subject, row_type, name, size, uploaded in rows
+    )
+
+
+def folder_entries(folder):
+    """Файлы папки и всех вложенных; структура папок сохраняется в архиве"""
+    names = dict(MaterialFolder.objects.subtree(folder).values_list('id', 'name'))
+    rows = (
+        Material.objects.filter(folder__path__startswith=folder.path)
+        .exclude(file='')
+        .order_by('folder__path', 'name', 'id')
+        .values_list('folder__path', 'file', 'size', 'upload_date')
+    )
+    return _entries(
+        (
+            [folder.name, *(names.get(int(pk), pk) for pk in path.split('/')[folder.depth:-1])],
+            name, size, uploaded,
+        )
+        for path, name, size, uploaded in rows
+    )
+
+
+def archive_etag(entries):
+    digest = hashlib.sha256()
+    for entry in entries:
+        digest.update(f'{entry.arcname}\0{entry.name}\0{entry.size}\0'.encode())
+    return f'W/"{digest.hexdigest()[:32]}"'
+
+
+def stream_zip(entries, storage=None):
+    """Генератор байтов ZIP-архива; недоступные файлы пропускаются с предупреждением в лог"""
+    storage = storage or Material._meta.get_field('file').storage
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for entry in entries:
+            try:
+                source = storage.open(entry.name, 'rb')
+            except OSError:
+                logger.warning('Файл %s пропущен при сборке архива', entry.name, exc_info=True)
+                continue
+            info = zipfile.ZipInfo(entry.arcname, entry.date_time)
+            stored = os.path.splitext(entry.arcname)[1].lower() in STORED_EXTENSIONS
+            info.compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+            # По заявленному размеру ZipFile решает, нужен ли ZIP64
+            info.file_size = entry.size
+            with source, archive.open(info, 'w') as target:
+                for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                    target.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            yield sink.drain()
+    yield sink.drain()
+
+
+def archive_response(request, entries, filename):
+    """Потоковый ответ с архивом или 304, если набор файлов не изменился"""
+    if not entries:
+        raise Http404('Нет материалов')
+    etag = archive_etag(entries)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = StreamingHttpResponse(stream_zip(entries), content_type='application/zip')
+        response['Content-Disposition'] = content_disposition_header(True, filename)
+    # Без Last-Modified: удаление файла дату не сдвигает, а ETag меняется
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,74 @@
+"""Индекс каталога материалов: факультет -> курс -> предмет -> тип со счётчиками.
+
+Счётчики хранятся в MaterialFacet и меняются на ±1 при создании, переносе и
+удалении материала. Для навигации вся таблица (по строке на тип материала
+в предмете) собирается в дерево и кэшируется целиком, так что страница
+получает списки и количества без запросов к Material.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import Material, MaterialFacet
+
+FACET_FIELDS = ('faculty', 'course', 'subject', 'type')
+FACET_TREE_KEY = 'materials:facet_tree'
+# Дерево сбрасывается при пересчёте счётчиков; таймаут - страховка от пропущенного сброса
+FACET_TREE_TIMEOUT = 60 * 60
+
+
+def facet_path(material):
+    return tuple(getattr(material, field) for field in FACET_FIELDS)
+
+
+def adjust_facet(path, delta):
+    if not delta:
+        return
+    lookup = dict(zip(FACET_FIELDS, path))
+    with transaction.atomic():
+        if delta > 0:
+            MaterialFacet.objects.get_or_create(**lookup)
+        MaterialFacet.objects.filter(**lookup).update(count=F('count') + delta)
+        MaterialFacet.objects.filter(count__lte=0, **lookup).delete()
+    cache.delete(FACET_TREE_KEY)
+
+
+def rebuild_facets():
+    """Пересчитывает индекс по таблице материалов; возвращает число узлов"""
+    rows = Material.objects.values(*FACET_FIELDS).annotate(total=Count('id')).order_by()
+    facets = [MaterialFacet(count=row.pop('total'), **row) for row in rows]
+    with transaction.atomic():
+        MaterialFacet.objects.all().delete()
+        MaterialFacet.objects.bulk_create(facets)
+    cache.delete(FACET_TREE_KEY)
+    return len(facets)
+
+
+def _build_tree():
+    tree = {'count': 0, 'children': {}}
+    for row in MaterialFacet.objects.values_list(*FACET_FIELDS, 'count'):
+        *path, count = row
+        node = tree
+        node['count'] += count
+        for value in path:
+            node = node['children'].setdefault(value, {'count': 0, 'children': {}})
+            node['count'] += count
+    return tree
+
+
+def facet_tree():
+    tree = cache.get(FACET_TREE_KEY)
+    if tree is None:
+        tree = _build_tree()
+        cache.set(FACET_TREE_KEY, tree, FACET_TREE_TIMEOUT)
+    return tree
+
+
+def facet_children(*path):
+    """Дочерние узлы каталога [(значение, число материалов)] в порядке значений"""
+    node = facet_tree()
+    for value in path:
+        node = node['children'].get(value)
+        if node is None:
+            return []
+    return sorted((value, child['count']) for value, child in node['children'].items())
@@ -1,5 +1,8 @@
 from django import forms
-from .models import Material, MaterialFolder
+from django.conf import settings
+from django.template.defaultfilters import filesizeformat
+from .listing import DEFAULT_SORT, SORT_CHOICES
+from .models import Material, MaterialFolder, ChunkedUpload
 
 
 class MaterialUploadForm(forms.ModelForm):
@@ -42,8 +45,45 @@ class MaterialFilterForm(forms.Form):
     faculty = forms.ChoiceField(choices=[('', 'Все факультеты')] + [
         ('ВМК', 'ВМК'), ('Мехмат', 'Мехмат'), ('Физфак', 'Физфак')
     ], required=False)
-    course = forms.ChoiceField(choices=[('', 'Все курсы')] + [
+    course = forms.TypedChoiceField(choices=[('', 'Все курсы')] + [
         (i, f'{i} курс') for i in range(1, 7)
-    ], required=False)
+    ], coerce=int, empty_value=None, required=False)
     subject = forms.CharField(required=False, widget=forms.TextInput(attrs={'placeholder': 'Предмет'}))
-    material_type = forms.ChoiceField(choices=[('', 'Все типы')] + Material.TYPES, required=False)
\ No newline at end of file
+    material_type = forms.ChoiceField(choices=[('', 'Все типы')] + Material.TYPES, required=False)
+    sort = forms.ChoiceField(choices=SORT_CHOICES, required=False, label='Сортировка')
+
+    def clean_sort(self):
+        return self.cleaned_data['sort'] or DEFAULT_SORT
+
+class ChunkedUploadForm(forms.ModelForm):
+    """Начало загрузки по частям: метаданные материала и параметры файла"""
+
+    class Meta:
+        model = ChunkedUpload
+        fields = ['filename', 'size', 'sha256', 'chunk_size', 'name', 'faculty', 'course', 'subject', 'type', 'folder']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['chunk_size'].required = False
+
+    def clean_size(self):
+        size = self.cleaned_data['size']
+        if size <= 0:
+            raise forms.ValidationError('Пустой файл')
+        if size > settings.CHUNKED_UPLOAD_MAX_SIZE:
+            raise forms.ValidationError(
+                f'Файл больше {filesizeformat(settings.CHUNKED_UPLOAD_MAX_SIZE)}, такие загружать нельзя'
+            )
+        return size
+
+    def clean_sha256(self):
+        sha256 = self.cleaned_data['sha256'].lower()
+        if len(sha256) != 64 or any(c not in '0123456789abcdef' for c in sha256):
+            raise forms.ValidationError('Ожидается SHA-256 в шестнадцатеричном виде')
+        return sha256
+
+    def clean_chunk_size(self):
+        chunk_size = self.cleaned_data.get('chunk_size') or ChunkedUpload.DEFAULT_CHUNK_SIZE
+        if not ChunkedUpload.MIN_CHUNK_SIZE <= chunk_size <= ChunkedUpload.MAX_CHUNK_SIZE:
+            raise forms.ValidationError('Недопустимый размер части')
+        return chunk_size
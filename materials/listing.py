@@ -0,0 +1,118 @@
+"""Список материалов: фильтры MaterialFilterForm, сортировка и курсор (значение, id).
+
+Как и лента новостей (main/feed.py), страница - это "следующие N записей
+после такой-то" без COUNT(*) и OFFSET. Каждой сортировке соответствует индекс
+(faculty, <поле>, id), поэтому любая страница - короткий проход по диапазону
+индекса, сколько бы файлов ни было на факультете.
+"""
+import base64
+import json
+from collections import namedtuple
+from datetime import datetime
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+LISTING_PAGE_SIZE = 30
+
+# Ключ сортировки в запросе -> поле модели; минус - по убыванию
+SORT_FIELDS = {
+    'date': 'upload_date',
+    'name': 'name',
+    'size': 'size',
+}
+SORT_CHOICES = [
+    ('-date', 'Сначала новые'),
+    ('date', 'Сначала старые'),
+    ('name', 'По названию, А-Я'),
+    ('-name', 'По названию, Я-А'),
+    ('-size', 'Сначала большие'),
+    ('size', 'Сначала маленькие'),
+]
+DEFAULT_SORT = '-date'
+
+ListingPage = namedtuple('ListingPage', 'items next_cursor previous_cursor')
+
+
+def sort_field(sort):
+    """(поле модели, по убыванию ли) для ключа сортировки; неизвестный ключ - ValueError"""
+    descending = sort.startswith('-')
+    try:
+        return SORT_FIELDS[sort.lstrip('-')], descending
+    except KeyError:
+        raise ValueError(f'Unknown sort: {sort!r}') from None
+
+
+def encode_cursor(material, field):
+    value = getattr(material, field)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([value, material.pk], ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, field):
+    """(значение поля сортировки, id) из курсора; ValueError для испорченного значения"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        value, pk = json.loads(raw)
+        pk = int(pk)
+        if field == 'upload_date':
+            value = parse_datetime(value)
+        elif field == 'size':
+            value = int(value)
+        elif not isinstance(value, str):
+            value = None
+    except (ValueError, TypeError, UnicodeDecodeError) as exc:
+        raise ValueError(f'Invalid cursor: {cursor!r}') from exc
+    if value is None:
+        raise ValueError(f'Invalid cursor: {cursor!r}')
+    return value, pk
+
+
+def _beyond(field, descending, value, pk):
+    # (field, id) дальше (v, i) в порядке сортировки; первое условие даёт диапазон по индексу
+    if descending:
+        return Q(**{f'{field}__lte': value}) & (Q(**{f'{field}__lt': value}) | Q(pk__lt=pk))
+    return Q(**{f'{field}__gte': value}) & (Q(**{f'{field}__gt': value}) | Q(pk__gt=pk))
+
+
+def _ordering(field, descending):
+    return (f'-{field}', '-id') if descending else (field, 'id')
+
+
+def filter_materials(queryset, filters):
+    """Применяет очищенные данные MaterialFilterForm; пустые поля не фильтруют"""
+    lookups = {
+        'faculty': filters.get('faculty'),
+        'course': filters.get('course'),
+        'subject': filters.get('subject'),
+        'type': filters.get('material_type'),
+    }
+    return queryset.filter(**{name: value for name, value in lookups.items() if value not in (None, '')})
+
+
+def listing_page(queryset, sort=DEFAULT_SORT, after=None, before=None, size=LISTING_PAGE_SIZE):
+    """Страница списка после курсора after или перед курсором before.
+
+    Берётся на одну запись больше, чтобы узнать, есть ли страница дальше.
+    """
+    field, descending = sort_field(sort)
+    if before:
+        rows = list(
+            queryset.filter(_beyond(field, not descending, *decode_cursor(before, field)))
+            .order_by(*_ordering(field, not descending))[:size + 1]
+        )
+        has_more = len(rows) > size
+        items = rows[:size][::-1]
+        next_cursor = encode_cursor(items[-1], field) if items else None
+        previous_cursor = encode_cursor(items[0], field) if items and has_more else None
+    else:
+        if after:
+            queryset = queryset.filter(_beyond(field, descending, *decode_cursor(after, field)))
+        rows = list(queryset.order_by(*_ordering(field, descending))[:size + 1])
+        has_more = len(rows) > size
+        items = rows[:size]
+        next_cursor = encode_cursor(items[-1], field) if items and has_more else None
+        previous_cursor = encode_cursor(items[0], field) if items and after else None
+    return ListingPage(items, next_cursor, previous_cursor)
@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from materials.models import ChunkedUpload
+
+
+class Command(BaseCommand):
+    help = 'Удаляет брошенные загрузки по частям вместе с их временными файлами'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24,
+                            help='Удалять загрузки, начатые раньше, чем столько часов назад')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        stale = ChunkedUpload.objects.filter(created_at__lt=cutoff)
+        count = 0
+        for upload in stale:
+            upload.discard()
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'Удалено незавершённых загрузок: {count}'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from materials.facets import rebuild_facets
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает индекс каталога материалов (факультет -> курс -> предмет -> тип)'
+
+    def handle(self, *args, **options):
+        count = rebuild_facets()
+        self.stdout.write(self.style.SUCCESS(f'Узлов каталога: {count}'))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0002_alter_material_options_alter_material_type_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='material',
+            index=models.Index(fields=['faculty', 'course', 'subject', 'type'], name='material_catalog_idx'),
+        ),
+    ]
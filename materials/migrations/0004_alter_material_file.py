@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:15
+
+import main.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0003_material_material_catalog_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='material',
+            name='file',
+            field=models.FileField(max_length=255, storage=main.storage.ContentAddressedStorage(), upload_to='materials/', verbose_name='Файл'),
+        ),
+    ]
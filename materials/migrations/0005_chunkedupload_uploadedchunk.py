@@ -0,0 +1,50 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:16
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0004_alter_material_file'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChunkedUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255, verbose_name='Имя файла')),
+                ('size', models.BigIntegerField(verbose_name='Размер')),
+                ('sha256', models.CharField(max_length=64, verbose_name='SHA-256')),
+                ('chunk_size', models.PositiveIntegerField(default=8388608, verbose_name='Размер части')),
+                ('name', models.CharField(max_length=200, verbose_name='Название')),
+                ('faculty', models.CharField(max_length=100, verbose_name='Факультет')),
+                ('course', models.IntegerField(verbose_name='Курс')),
+                ('subject', models.CharField(max_length=100, verbose_name='Предмет')),
+                ('type', models.CharField(choices=[('book', 'Книга'), ('notes', 'Конспект'), ('video', 'Видео'), ('presentation', 'Презентация'), ('code', 'Исходный код'), ('other', 'Другое')], max_length=20, verbose_name='Тип материала')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Начало загрузки')),
+                ('folder', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='materials.materialfolder', verbose_name='Папка')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Загружает')),
+            ],
+            options={
+                'verbose_name': 'Загрузка по частям',
+                'verbose_name_plural': 'Загрузки по частям',
+            },
+        ),
+        migrations.CreateModel(
+            name='UploadedChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveIntegerField(verbose_name='Номер части')),
+                ('upload', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='materials.chunkedupload')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('upload', 'index'), name='uploaded_chunk_unique_index')],
+            },
+        ),
+    ]
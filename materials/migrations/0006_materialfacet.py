@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:38
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_facets(apps, schema_editor):
+    Material = apps.get_model('materials', 'Material')
+    MaterialFacet = apps.get_model('materials', 'MaterialFacet')
+    rows = Material.objects.values('faculty', 'course', 'subject', 'type').annotate(total=Count('id')).order_by()
+    MaterialFacet.objects.bulk_create([MaterialFacet(count=row.pop('total'), **row) for row in rows])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0005_chunkedupload_uploadedchunk'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MaterialFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('faculty', models.CharField(max_length=100, verbose_name='Факультет')),
+                ('course', models.IntegerField(verbose_name='Курс')),
+                ('subject', models.CharField(max_length=100, verbose_name='Предмет')),
+                ('type', models.CharField(choices=[('book', 'Книга'), ('notes', 'Конспект'), ('video', 'Видео'), ('presentation', 'Презентация'), ('code', 'Исходный код'), ('other', 'Другое')], max_length=20, verbose_name='Тип материала')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Материалов')),
+            ],
+            options={
+                'verbose_name': 'Узел каталога',
+                'verbose_name_plural': 'Узлы каталога',
+                'constraints': [models.UniqueConstraint(fields=('faculty', 'course', 'subject', 'type'), name='material_facet_unique')],
+            },
+        ),
+        migrations.RunPython(fill_facets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_sizes(apps, schema_editor):
+    Material = apps.get_model('materials', 'Material')
+    changed = []
+    for material in Material.objects.exclude(file='').only('id', 'file').iterator():
+        try:
+            material.size = material.file.size
+        except OSError:
+            continue
+        changed.append(material)
+    Material.objects.bulk_update(changed, ['size'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0006_materialfacet'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='material',
+            name='size',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='Размер файла'),
+        ),
+        migrations.AddIndex(
+            model_name='material',
+            index=models.Index(fields=['faculty', 'upload_date', 'id'], name='material_faculty_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='material',
+            index=models.Index(fields=['faculty', 'name', 'id'], name='material_faculty_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='material',
+            index=models.Index(fields=['faculty', 'size', 'id'], name='material_faculty_size_idx'),
+        ),
+        migrations.RunPython(fill_sizes, migrations.RunPython.noop),
+    ]
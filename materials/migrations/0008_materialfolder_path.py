@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:43
+
+from django.db import migrations, models
+
+
+def fill_paths(apps, schema_editor):
+    MaterialFolder = apps.get_model('materials', 'MaterialFolder')
+    parents = dict(MaterialFolder.objects.values_list('id', 'parent_folder_id'))
+    paths = {}
+
+    def path_of(pk):
+        if pk not in paths:
+            parent = parents[pk]
+            paths[pk] = (path_of(parent) if parent else '') + f'{pk}/'
+        return paths[pk]
+
+    folders = [MaterialFolder(id=pk, path=path_of(pk)) for pk in parents]
+    MaterialFolder.objects.bulk_update(folders, ['path'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0007_material_size_sort_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='materialfolder',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255, verbose_name='Путь в дереве'),
+        ),
+        migrations.RunPython(fill_paths, migrations.RunPython.noop),
+    ]
@@ -1,17 +1,48 @@
+import os
+import uuid
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import F, Func, OuterRef, Subquery, Value
+from django.db.models.functions import Concat, Substr
 from main.models import Group, CustomUser
+from main.storage import blob_storage
+
+
+class MaterialFolderQuerySet(models.QuerySet):
+    def subtree(self, folder, include_self=True):
+        """Папка и все вложенные в неё на любую глубину - один запрос по префиксу пути"""
+        folders = self.filter(path__startswith=folder.path)
+        return folders if include_self else folders.exclude(pk=folder.pk)
+
+    def with_material_counts(self):
+        """material_total - материалы во всём поддереве папки, подзапросом в том же SELECT"""
+        materials = Material.objects.filter(folder__path__startswith=OuterRef('path')).order_by()
+        total = materials.annotate(total=Func(F('id'), function='COUNT')).values('total')
+        return self.annotate(material_total=Subquery(total))
 
 
 class MaterialFolder(models.Model):
+    """Папка материалов.
+
+    Кроме ссылки на родителя хранится материализованный путь - id всех
+    предков и самой папки через '/' (например '3/17/42/'). Поддерево,
+    хлебные крошки, число материалов с вложенными папками и перенос
+    поддерева обходятся одним запросом вместо запроса на каждый уровень.
+    """
     name = models.CharField(max_length=200, verbose_name='Название папки')
     faculty = models.CharField(max_length=100, verbose_name='Факультет')
     course = models.IntegerField(verbose_name='Курс')
     subject = models.CharField(max_length=100, verbose_name='Предмет', blank=True)
     parent_folder = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True,
                                       verbose_name='Родительская папка')
+    path = models.CharField(max_length=255, db_index=True, editable=False, default='', verbose_name='Путь в дереве')
     created_by = models.ForeignKey(CustomUser, on_delete=models.CASCADE, verbose_name='Создатель')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
 
+    objects = MaterialFolderQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Папка материалов'
         verbose_name_plural = 'Папки материалов'
@@ -21,10 +52,65 @@ class MaterialFolder(models.Model):
         path = f"{self.faculty}/{self.course} курс"
         if self.subject:
             path += f"/{self.subject}"
-        if self.parent_folder:
+        # Родителя показываем, только если он уже загружен (select_related): __str__ не ходит в базу
+        if self.parent_folder_id and type(self).parent_folder.is_cached(self):
             path += f"/{self.parent_folder.name}"
         return f"{path}/{self.name}"
 
+    @property
+    def depth(self):
+        return self.path.count('/')
+
+    def ancestor_ids(self):
+        """id предков от корня к родителю, прямо из пути"""
+        return [int(pk) for pk in self.path.split('/')[:-2]]
+
+    def ancestors(self):
+        """Папки от корня до родителя для хлебных крошек одним запросом"""
+        ids = self.ancestor_ids()
+        folders = MaterialFolder.objects.in_bulk(ids)
+        return [folders[pk] for pk in ids if pk in folders]
+
+    def material_count(self):
+        """Материалы в папке и во всех вложенных"""
+        return Material.objects.filter(folder__path__startswith=self.path).count()
+
+    def is_in_subtree_of(self, folder):
+        return bool(folder.path) and self.path.startswith(folder.path)
+
+    def clean(self):
+        super().clean()
+        if self.parent_folder_id and self.pk and self.parent_folder.is_in_subtree_of(self):
+            raise ValidationError({'parent_folder': 'Нельзя переместить папку внутрь неё самой'})
+
+    def save(self, *args, **kwargs):
+        parent_path = self.parent_folder.path if self.parent_folder_id else ''
+        if self.path and parent_path.startswith(self.path):
+            raise ValueError(f'Folder {self.pk} cannot be moved into its own subtree')
+        old_path = self.path
+        super().save(*args, **kwargs)
+
+        new_path = f'{parent_path}{self.pk}/'
+        if new_path == old_path:
+            return
+        if old_path:
+            # Перенос: один UPDATE меняет префикс у папки и у всех вложенных
+            MaterialFolder.objects.filter(path__startswith=old_path).update(
+                path=Concat(Value(new_path), Substr('path', len(old_path) + 1)),
+            )
+        else:
+            MaterialFolder.objects.filter(pk=self.pk).update(path=new_path)
+        self.path = new_path
+
+
+class MaterialQuerySet(models.QuerySet):
+    def for_listing(self):
+        """Только поля, нужные списку материалов, и загрузивший пользователь одним JOIN"""
+        return self.select_related('uploaded_by').only(
+            'id', 'name', 'file', 'faculty', 'course', 'subject', 'type', 'upload_date', 'size', 'folder_id',
+            'uploaded_by__first_name', 'uploaded_by__last_name',
+        )
+
 
 class Material(models.Model):
     TYPES = [
@@ -37,7 +123,7 @@ class Material(models.Model):
     ]
 
     name = models.CharField(max_length=200, verbose_name='Название')
-    file = models.FileField(upload_to='materials/', verbose_name='Файл')
+    file = models.FileField(upload_to='materials/', storage=blob_storage, max_length=255, verbose_name='Файл')
     faculty = models.CharField(max_length=100, verbose_name='Факультет')
     course = models.IntegerField(verbose_name='Курс')
     subject = models.CharField(max_length=100, verbose_name='Предмет')
@@ -45,11 +131,119 @@ class Material(models.Model):
     folder = models.ForeignKey(MaterialFolder, on_delete=models.SET_NULL, null=True, blank=True, verbose_name='Папка')
     uploaded_by = models.ForeignKey(CustomUser, on_delete=models.CASCADE, verbose_name='Загрузил')
     upload_date = models.DateTimeField(auto_now_add=True, verbose_name='Дата загрузки')
+    size = models.BigIntegerField(default=0, editable=False, verbose_name='Размер файла')
+
+    objects = MaterialQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Материал'
         verbose_name_plural = 'Материалы'
         ordering = ['-upload_date']
+        indexes = [
+            models.Index(fields=['faculty', 'course', 'subject', 'type'], name='material_catalog_idx'),
+            # Сортировки списка материалов (см. listing.py): диапазон по курсору внутри факультета
+            models.Index(fields=['faculty', 'upload_date', 'id'], name='material_faculty_date_idx'),
+            models.Index(fields=['faculty', 'name', 'id'], name='material_faculty_name_idx'),
+            models.Index(fields=['faculty', 'size', 'id'], name='material_faculty_size_idx'),
+        ]
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+    def save(self, *args, **kwargs):
+        # Размер храним в строке, чтобы сортировать по нему индексом, а не stat() на каждый файл
+        if self.file:
+            try:
+                self.size = self.file.size
+            except OSError:
+                pass
+        else:
+            self.size = 0
+        super().save(*args, **kwargs)
+
+
+class MaterialFacet(models.Model):
+    """Сколько материалов в узле каталога факультет -> курс -> предмет -> тип.
+
+    Денормализованный счётчик для навигации вместо DISTINCT по всей таблице
+    материалов, поддерживается сигналами (см. facets.py).
+    """
+    faculty = models.CharField(max_length=100, verbose_name='Факультет')
+    course = models.IntegerField(verbose_name='Курс')
+    subject = models.CharField(max_length=100, verbose_name='Предмет')
+    type = models.CharField(max_length=20, choices=Material.TYPES, verbose_name='Тип материала')
+    count = models.PositiveIntegerField(default=0, verbose_name='Материалов')
+
+    class Meta:
+        verbose_name = 'Узел каталога'
+        verbose_name_plural = 'Узлы каталога'
+        constraints = [
+            models.UniqueConstraint(fields=['faculty', 'course', 'subject', 'type'], name='material_facet_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.faculty}/{self.course}/{self.subject}/{self.type}: {self.count}"
+
+
+class ChunkedUpload(models.Model):
+    """Загрузка большого файла по частям: init -> PUT частей (в любом порядке) -> finalize"""
+    DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+    # Снизу размер части ограничен, чтобы число частей (и список недостающих) оставалось небольшим
+    MIN_CHUNK_SIZE = 64 * 1024
+    MAX_CHUNK_SIZE = 64 * 1024 * 1024
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(CustomUser, on_delete=models.CASCADE, verbose_name='Загружает')
+    filename = models.CharField(max_length=255, verbose_name='Имя файла')
+    size = models.BigIntegerField(verbose_name='Размер')
+    sha256 = models.CharField(max_length=64, verbose_name='SHA-256')
+    chunk_size = models.PositiveIntegerField(default=DEFAULT_CHUNK_SIZE, verbose_name='Размер части')
+
+    # Поля будущего Material
+    name = models.CharField(max_length=200, verbose_name='Название')
+    faculty = models.CharField(max_length=100, verbose_name='Факультет')
+    course = models.IntegerField(verbose_name='Курс')
+    subject = models.CharField(max_length=100, verbose_name='Предмет')
+    type = models.CharField(max_length=20, choices=Material.TYPES, verbose_name='Тип материала')
+    folder = models.ForeignKey(MaterialFolder, on_delete=models.SET_NULL, null=True, blank=True, verbose_name='Папка')
+
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Начало загрузки')
+
+    class Meta:
+        verbose_name = 'Загрузка по частям'
+        verbose_name_plural = 'Загрузки по частям'
+
+    def __str__(self):
+        return f"{self.filename} ({self.owner})"
+
+    @property
+    def chunk_count(self):
+        return max(1, -(-self.size // self.chunk_size))
+
+    def expected_chunk_length(self, index):
+        if index == self.chunk_count - 1:
+            return self.size - index * self.chunk_size
+        return self.chunk_size
+
+    @property
+    def part_path(self):
+        return os.path.join(settings.CHUNKED_UPLOAD_ROOT, f'{self.id}.part')
+
+    def missing_chunks(self):
+        received = set(self.chunks.values_list('index', flat=True))
+        return [index for index in range(self.chunk_count) if index not in received]
+
+    def discard(self):
+        if os.path.exists(self.part_path):
+            os.remove(self.part_path)
+        self.delete()
+
+
+class UploadedChunk(models.Model):
+    upload = models.ForeignKey(ChunkedUpload, on_delete=models.CASCADE, related_name='chunks')
+    index = models.PositiveIntegerField(verbose_name='Номер части')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['upload', 'index'], name='uploaded_chunk_unique_index'),
+        ]
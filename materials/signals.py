@@ -0,0 +1,34 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from main.storage import track_blob_references
+from taskqueue.queue import track_uploads
+from .facets import adjust_facet, facet_path
+from .models import Material
+
+track_blob_references(Material)
+track_uploads(Material)
+
+
+@receiver(pre_save, sender=Material)
+def remember_facet(sender, instance, **kwargs):
+    previous = None
+    if instance.pk:
+        previous = Material.objects.filter(pk=instance.pk).values_list('faculty', 'course', 'subject', 'type').first()
+    instance._previous_facet = previous
+
+
+@receiver(post_save, sender=Material)
+def update_facet(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_facet', None)
+    current = facet_path(instance)
+    if previous == current:
+        return
+    if previous is not None:
+        adjust_facet(previous, -1)
+    adjust_facet(current, 1)
+
+
+@receiver(post_delete, sender=Material)
+def drop_facet(sender, instance, **kwargs):
+    adjust_facet(facet_path(instance), -1)
@@ -1,3 +1,417 @@
-from django.test import TestCase
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from main.models import CustomUser
+from main.testing import QueryBudgetMixin, QueryPlanMixin
+from .facets import facet_children, rebuild_facets
+from .listing import filter_materials, listing_page, sort_field
+from .models import Material, MaterialFacet, MaterialFolder, ChunkedUpload
+
+MEDIA_ROOT = tempfile.mkdtemp()
+CHUNKED_UPLOAD_ROOT = os.path.join(MEDIA_ROOT, 'chunks')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class MaterialsQueryBudgetTests(QueryBudgetMixin, TestCase):
+    # сессия, пользователь, список материалов и дерево каталога при пустом кэше
+    LISTING_BUDGET = 4
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = CustomUser.objects.create(
+            username='headman1', student_id='h0001', faculty='ВМК', course=1, role='headman',
+        )
+        for i in range(10):
+            uploader = CustomUser.objects.create(
+                username=f'uploader{i}', student_id=f'u{i}', first_name=f'Загрузивший{i}',
+                faculty='ВМК', course=1,
+            )
+            Material.objects.create(
+                name=f'Лекция {i}', file=SimpleUploadedFile(f'lecture{i}.pdf', b'%PDF'),
+                faculty='ВМК', course=1, subject='Матанализ', type='notes', uploaded_by=uploader,
+            )
+        self.client.force_login(self.user)
+
+    def test_materials_within_budget(self):
+        with self.assertQueryBudget(self.LISTING_BUDGET):
+            response = self.client.get(reverse('materials'))
+        self.assertContains(response, 'Загрузивший9')
+
+    def test_course_materials_within_budget(self):
+        with self.assertQueryBudget(self.LISTING_BUDGET):
+            response = self.client.get(reverse('course_materials', args=['ВМК', 1]))
+        self.assertContains(response, 'Лекция 0')
+        self.assertContains(response, 'Матанализ')
+
+
+class MaterialIndexTests(QueryPlanMixin, TestCase):
+    def test_catalog_filter_uses_index(self):
+        materials = Material.objects.for_listing().filter(faculty='ВМК', course=1, subject='Матанализ')
+        self.assertUsesIndex(materials.order_by(), 'material_catalog_idx')
+        # С сортировкой планировщик вправе взять индекс сортировки, лишь бы не полный скан
+        self.assertUsesIndex(materials.order_by('-upload_date', '-id'))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class MaterialListingTests(QueryPlanMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create(username='student1', student_id='s0001', faculty='ВМК', course=1)
+        for i, subject in enumerate(['Матанализ', 'Алгебра', 'Матанализ', 'Алгебра', 'Матанализ']):
+            Material.objects.create(
+                name=f'Файл {i}', file=SimpleUploadedFile(f'file{i}.txt', b'x' * (100 * (5 - i))),
+                faculty='ВМК', course=1, subject=subject, type='notes', uploaded_by=self.user,
+            )
+        Material.objects.create(
+            name='Чужой', file=SimpleUploadedFile('other.txt', b'x'), faculty='Мехмат', course=1,
+            subject='Механика', type='book', uploaded_by=self.user,
+        )
+        self.client.force_login(self.user)
+
+    def fetch(self, url, **params):
+        response = self.client.get(url, {'format': 'json', **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_size_is_stored(self):
+        self.assertEqual(Material.objects.get(name='Файл 0').size, 500)
+
+    def test_pages_follow_sort_in_both_directions(self):
+        materials = filter_materials(Material.objects.for_listing(), {'faculty': 'ВМК'})
+        names, after, pages = [], None, []
+        while True:
+            page = listing_page(materials, 'size', after=after, size=2)
+            pages.append(page)
+            names += [material.name for material in page.items]
+            after = page.next_cursor
+            if after is None:
+                break
+        self.assertEqual(names, ['Файл 4', 'Файл 3', 'Файл 2', 'Файл 1', 'Файл 0'])
+        back = listing_page(materials, 'size', before=pages[-1].previous_cursor, size=2)
+        self.assertEqual(back.items, pages[1].items)
+        self.assertEqual(back.next_cursor, pages[1].next_cursor)
+
+    def test_json_page(self):
+        data = self.fetch(reverse('materials'), sort='-size')
+        self.assertEqual(data['sort'], '-size')
+        self.assertIsNone(data['next'])
+        self.assertEqual([row['size'] for row in data['results']], [500, 400, 300, 200, 100])
+        self.assertTrue(data['results'][0]['download_url'])
+
+    def test_filters_from_form_and_path(self):
+        data = self.fetch(reverse('materials'), subject='Алгебра', sort='name')
+        self.assertEqual([row['name'] for row in data['results']], ['Файл 1', 'Файл 3'])
+        data = self.fetch(reverse('faculty_materials', args=['Мехмат']), faculty='ВМК')
+        self.assertEqual([row['name'] for row in data['results']], ['Чужой'])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(reverse('materials'), {'format': 'json', 'after': 'мусор'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('materials'), {'format': 'json', 'sort': 'owner'}).status_code, 400)
+        self.assertContains(self.client.get(reverse('materials'), {'after': 'мусор'}), 'Файл 4')
+
+    def test_sorted_page_uses_index(self):
+        page = filter_materials(Material.objects.all(), {'faculty': 'ВМК'})
+        for sort, index_name in [('-date', 'material_faculty_date_idx'), ('name', 'material_faculty_name_idx'),
+                                 ('-size', 'material_faculty_size_idx')]:
+            field, descending = sort_field(sort)
+            ordering = (f'-{field}', '-id') if descending else (field, 'id')
+            self.assertUsesIndex(page.order_by(*ordering)[:30], index_name)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class MaterialFolderTreeTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create(username='teacher1', student_id='t0001', faculty='ВМК', course=1)
+        self.root = self.folder('Лекции')
+        self.term = self.folder('Семестр 1', self.root)
+        self.week = self.folder('Неделя 1', self.term)
+        self.other = self.folder('Семинары')
+        for folder in (self.root, self.term, self.week, self.week):
+            Material.objects.create(
+                name=f'Файл в {folder.name}', file='materials/old.pdf', faculty='ВМК', course=1,
+                subject='Матанализ', type='notes', folder=folder, uploaded_by=self.user,
+            )
+
+    def folder(self, name, parent=None):
+        return MaterialFolder.objects.create(
+            name=name, faculty='ВМК', course=1, subject='Матанализ', parent_folder=parent, created_by=self.user,
+        )
+
+    def test_paths_and_single_query_reads(self):
+        self.assertEqual(self.week.path, f'{self.root.pk}/{self.term.pk}/{self.week.pk}/')
+        with self.assertNumQueries(1):
+            self.assertEqual([folder.name for folder in self.week.ancestors()], ['Лекции', 'Семестр 1'])
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                set(MaterialFolder.objects.subtree(self.root).values_list('name', flat=True)),
+                {'Лекции', 'Семестр 1', 'Неделя 1'},
+            )
+        with self.assertNumQueries(1):
+            self.assertEqual(self.root.material_count(), 4)
+        with self.assertNumQueries(1):
+            totals = dict(MaterialFolder.objects.with_material_counts().values_list('name', 'material_total'))
+        self.assertEqual(totals, {'Лекции': 4, 'Семестр 1': 3, 'Неделя 1': 2, 'Семинары': 0})
+
+    def test_move_rewrites_subtree_in_one_update(self):
+        self.term.parent_folder = self.other
+        with self.assertNumQueries(2):
+            self.term.save()
+        self.week.refresh_from_db()
+        self.assertEqual(self.week.path, f'{self.other.pk}/{self.term.pk}/{self.week.pk}/')
+        self.assertEqual(self.other.material_count(), 3)
+        self.assertEqual(self.root.material_count(), 1)
+
+    def test_cannot_move_into_own_subtree(self):
+        self.root.parent_folder = self.week
+        with self.assertRaises(ValidationError):
+            self.root.full_clean()
+        with self.assertRaises(ValueError):
+            self.root.save()
+
+    def test_str_does_not_query(self):
+        folder = MaterialFolder.objects.get(pk=self.week.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(str(folder), 'ВМК/1 курс/Матанализ/Неделя 1')
+
+    def test_folder_view(self):
+        self.client.force_login(self.user)
+        # сессия, пользователь, папка с итогом, предки, вложенные папки, материалы, дерево каталога
+        with self.assertQueryBudget(7):
+            response = self.client.get(reverse('folder_view', args=[self.term.pk]))
+        self.assertContains(response, 'Файл в Семестр 1')
+        self.assertContains(response, reverse('folder_view', args=[self.root.pk]))
+        self.assertContains(response, reverse('folder_view', args=[self.week.pk]))
+        self.assertContains(response, '3 материалов')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class MaterialArchiveTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='student1', student_id='s0001', faculty='ВМК', course=1)
+        self.folder = MaterialFolder.objects.create(
+            name='Лекции', faculty='ВМК', course=1, subject='Матанализ', created_by=self.user,
+        )
+        self.subfolder = MaterialFolder.objects.create(
+            name='Неделя 1', faculty='ВМК', course=1, subject='Матанализ',
+            parent_folder=self.folder, created_by=self.user,
+        )
+        self.add('notes.txt', b'a' * 10000, 'notes', self.folder)
+        self.add('photo.jpg', b'\xff\xd8' + b'b' * 1000, 'notes', self.subfolder)
+        self.add('book.txt', b'book', 'book')
+        self.add('notes.txt', b'other', 'notes', subject='../Алгебра')
+        self.client.force_login(self.user)
+
+    def add(self, filename, content, material_type, folder=None, subject='Матанализ'):
+        return Material.objects.create(
+            name=filename, file=SimpleUploadedFile(filename, content), faculty='ВМК', course=1,
+            subject=subject, type=material_type, folder=folder, uploaded_by=self.user,
+        )
+
+    def archive(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        return zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+
+    def test_subject_archive(self):
+        archive = self.archive(self.client.get(reverse('export_materials', args=['ВМК', 1, 'Матанализ'])))
+        self.assertEqual(sorted(archive.namelist()), ['Книга/book.txt', 'Конспект/notes.txt', 'Конспект/photo.jpg'])
+        self.assertIsNone(archive.testzip())
+        self.assertEqual(archive.read('Конспект/notes.txt'), b'a' * 10000)
+        self.assertEqual(archive.getinfo('Конспект/notes.txt').compress_type, zipfile.ZIP_DEFLATED)
+        self.assertEqual(archive.getinfo('Конспект/photo.jpg').compress_type, zipfile.ZIP_STORED)
+
+    def test_user_input_stays_inside_archive(self):
+        archive = self.archive(self.client.get(reverse('export_materials', args=['ВМК', 1])))
+        self.assertIn('.._Алгебра/Конспект/notes.txt', archive.namelist())
+
+    def test_folder_archive_keeps_structure(self):
+        archive = self.archive(self.client.get(reverse('export_folder', args=[self.folder.pk])))
+        self.assertEqual(sorted(archive.namelist()), ['Лекции/notes.txt', 'Лекции/Неделя 1/photo.jpg'])
+
+    def test_unchanged_archive_is_not_modified(self):
+        url = reverse('export_materials', args=['ВМК', 1, 'Матанализ', 'notes'])
+        etag = self.client.get(url)['ETag']
+        # сессия, пользователь и список файлов
+        with self.assertQueryBudget(3):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.add('extra.txt', b'extra', 'notes')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_empty_section(self):
+        self.assertEqual(self.client.get(reverse('export_materials', args=['Физфак'])).status_code, 404)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class MaterialFacetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create(username='teacher1', student_id='t0001', faculty='ВМК', course=0)
+
+    def add(self, faculty, course, subject, material_type):
+        return Material.objects.create(
+            name='Материал', file='materials/old.pdf', faculty=faculty, course=course,
+            subject=subject, type=material_type, uploaded_by=self.user,
+        )
+
+    def test_counts_follow_create_move_and_delete(self):
+        first = self.add('ВМК', 1, 'Матанализ', 'notes')
+        self.add('ВМК', 1, 'Матанализ', 'book')
+        self.add('ВМК', 2, 'Алгебра', 'notes')
+        self.add('Мехмат', 1, 'Механика', 'video')
+        self.assertEqual(facet_children(), [('ВМК', 3), ('Мехмат', 1)])
+        self.assertEqual(facet_children('ВМК'), [(1, 2), (2, 1)])
+        self.assertEqual(facet_children('ВМК', 1, 'Матанализ'), [('book', 1), ('notes', 1)])
+
+        first.subject = 'Алгебра'
+        first.save()
+        self.assertEqual(facet_children('ВМК', 1), [('Алгебра', 1), ('Матанализ', 1)])
+
+        first.delete()
+        self.assertEqual(facet_children('ВМК', 1), [('Матанализ', 1)])
+        self.assertFalse(MaterialFacet.objects.filter(subject='Алгебра', course=1).exists())
+
+        counts = set(MaterialFacet.objects.values_list('faculty', 'course', 'subject', 'type', 'count'))
+        rebuild_facets()
+        self.assertEqual(set(MaterialFacet.objects.values_list('faculty', 'course', 'subject', 'type', 'count')), counts)
+
+    def test_cached_tree_needs_no_queries(self):
+        self.add('ВМК', 1, 'Матанализ', 'notes')
+        facet_children()
+        with self.assertNumQueries(0):
+            self.assertEqual(facet_children('ВМК', 1), [('Матанализ', 1)])
+            self.assertEqual(facet_children('Физфак'), [])
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, CHUNKED_UPLOAD_ROOT=CHUNKED_UPLOAD_ROOT)
+class ChunkedUploadTests(TestCase):
+    CHUNK = ChunkedUpload.MIN_CHUNK_SIZE
+    CONTENT = os.urandom(2 * CHUNK + CHUNK // 2)
+
+    def setUp(self):
+        self.user = CustomUser.objects.create(
+            username='headman1', student_id='h0001', faculty='ВМК', course=1, role='headman',
+        )
+        self.client.force_login(self.user)
+
+    def post_init(self, **params):
+        return self.client.post(reverse('chunked_upload_init'), {
+            'filename': 'lecture.mp4', 'size': len(self.CONTENT), 'chunk_size': self.CHUNK,
+            'sha256': hashlib.sha256(self.CONTENT).hexdigest(),
+            'name': 'Лекция 1', 'faculty': 'ВМК', 'course': 1, 'subject': 'Матанализ', 'type': 'video',
+            **params,
+        })
+
+    def init(self, sha256=None):
+        response = self.post_init(**({'sha256': sha256} if sha256 else {}))
+        self.assertEqual(response.status_code, 201)
+        return response.json()
+
+    def put_chunk(self, upload_id, index):
+        return self.client.put(
+            reverse('chunked_upload_chunk', args=[upload_id, index]),
+            data=self.CONTENT[index * self.CHUNK:(index + 1) * self.CHUNK],
+            content_type='application/octet-stream',
+        )
+
+    def finalize(self, upload_id):
+        return self.client.post(reverse('chunked_upload_finalize', args=[upload_id]))
+
+    def test_out_of_order_upload_with_resume(self):
+        state = self.init()
+        self.assertEqual(state['chunk_count'], 3)
+        upload_id = state['upload_id']
+
+        self.assertEqual(self.put_chunk(upload_id, 2).status_code, 200)
+        self.assertEqual(self.put_chunk(upload_id, 0).status_code, 200)
+        response = self.finalize(upload_id)
+        self.assertEqual(response.status_code, 409)
+
+        status = self.client.get(reverse('chunked_upload_status', args=[upload_id])).json()
+        self.assertEqual(status['missing'], [1])
+        self.put_chunk(upload_id, 1)
+
+        response = self.finalize(upload_id)
+        self.assertEqual(response.status_code, 201)
+        material = Material.objects.get(id=response.json()['material_id'])
+        with material.file.open('rb') as f:
+            self.assertEqual(f.read(), self.CONTENT)
+        self.assertFalse(ChunkedUpload.objects.exists())
+
+    @override_settings(CHUNKED_UPLOAD_MAX_SIZE=2 * ChunkedUpload.MIN_CHUNK_SIZE)
+    def test_size_and_chunk_size_limits(self):
+        self.assertEqual(self.post_init().status_code, 400)
+        self.assertEqual(self.post_init(size=self.CHUNK, chunk_size=1).status_code, 400)
+        self.assertFalse(ChunkedUpload.objects.exists())
+        self.assertEqual(self.post_init(size=self.CHUNK).status_code, 201)
+
+    def test_no_session_left_when_space_is_not_allocated(self):
+        with mock.patch('materials.views.open', side_effect=OSError('No space left on device'), create=True):
+            response = self.post_init()
+        self.assertEqual(response.status_code, 507)
+        self.assertFalse(ChunkedUpload.objects.exists())
+
+    def test_wrong_chunk_length_rejected(self):
+        upload_id = self.init()['upload_id']
+        response = self.client.put(
+            reverse('chunked_upload_chunk', args=[upload_id, 0]),
+            data=b'short', content_type='application/octet-stream',
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_finalize_moves_assembled_file(self):
+        upload_id = self.init()['upload_id']
+        for index in range(3):
+            self.put_chunk(upload_id, index)
+        part_inode = os.stat(ChunkedUpload.objects.get().part_path).st_ino
+
+        response = self.finalize(upload_id)
+        self.assertEqual(response.status_code, 201)
+        material = Material.objects.get(id=response.json()['material_id'])
+        self.assertEqual(os.stat(material.file.path).st_ino, part_inode)
+        self.assertEqual(material.size, len(self.CONTENT))
+        self.assertEqual(self.finalize(upload_id).status_code, 404)
+
+    def test_finalize_without_part_file_conflicts(self):
+        upload_id = self.init()['upload_id']
+        for index in range(3):
+            self.put_chunk(upload_id, index)
+        # Файл уже забрал параллельный finalize, а строка ещё не удалена
+        os.remove(ChunkedUpload.objects.get().part_path)
+        self.assertEqual(self.finalize(upload_id).status_code, 409)
+        self.assertFalse(Material.objects.exists())
+
+    def test_chunk_checksum_checked_on_arrival(self):
+        upload_id = self.init()['upload_id']
+        response = self.client.put(
+            reverse('chunked_upload_chunk', args=[upload_id, 0]),
+            data=self.CONTENT[:self.CHUNK], content_type='application/octet-stream',
+            headers={'X-Chunk-SHA256': '0' * 64},
+        )
+        self.assertEqual(response.status_code, 400)
+        status = self.client.get(reverse('chunked_upload_status', args=[upload_id])).json()
+        self.assertEqual(status['missing'], [0, 1, 2])
+
+    def test_checksum_mismatch(self):
+        upload_id = self.init(sha256='0' * 64)['upload_id']
+        for index in range(3):
+            self.put_chunk(upload_id, index)
+        self.assertEqual(self.finalize(upload_id).status_code, 400)
+        self.assertFalse(Material.objects.exists())
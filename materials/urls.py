@@ -5,6 +5,13 @@ urlpatterns = [
     # Главная страница материалов
     path('', views.materials_view, name='materials'),
 
+    # Раздел каталога одним ZIP-архивом
+    path('export/<str:faculty>/', views.export_materials, name='export_materials'),
+    path('export/<str:faculty>/<int:course>/', views.export_materials, name='export_materials'),
+    path('export/<str:faculty>/<int:course>/<str:subject>/', views.export_materials, name='export_materials'),
+    path('export/<str:faculty>/<int:course>/<str:subject>/<str:material_type>/',
+         views.export_materials, name='export_materials'),
+
     # Материалы по типу
     path('<str:faculty>/<int:course>/<str:subject>/<str:material_type>/',
          views.type_materials, name='type_materials'),
@@ -12,6 +19,17 @@ urlpatterns = [
     # Загрузка материала
     path('upload/', views.upload_material, name='upload_material'),
 
+    # Загрузка больших файлов по частям
+    path('upload/chunked/', views.chunked_upload_init, name='chunked_upload_init'),
+    path('upload/chunked/<uuid:upload_id>/', views.chunked_upload_status, name='chunked_upload_status'),
+    path('upload/chunked/<uuid:upload_id>/finalize/', views.chunked_upload_finalize,
+         name='chunked_upload_finalize'),
+    path('upload/chunked/<uuid:upload_id>/<int:index>/', views.chunked_upload_chunk, name='chunked_upload_chunk'),
+
+    # Папка материалов
+    path('folder/<int:folder_id>/', views.folder_view, name='folder_view'),
+    path('folder/<int:folder_id>/export/', views.export_folder, name='export_folder'),
+
     # Скачивание материала
     path('download/<int:material_id>/', views.download_material, name='download_material'),
 
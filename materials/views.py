@@ -1,107 +1,175 @@
+import hashlib
+import os
+from django.conf import settings
 from django.contrib import messages
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.http import HttpResponse, FileResponse
-from django.conf import settings
-import os
-from .models import Material, MaterialFolder
-from .forms import MaterialUploadForm
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse
+from django.urls import reverse
+from django.views.decorators.http import require_POST, require_http_methods
+from .models import Material, MaterialFolder, ChunkedUpload, UploadedChunk
+from .forms import MaterialUploadForm, MaterialFilterForm, ChunkedUploadForm
+from .facets import facet_children
+from .archive import archive_response, catalog_entries, folder_entries
+from .listing import DEFAULT_SORT, filter_materials, listing_page
+from main.downloads import serve_file
+from main.storage import HashedFile
+
+UPLOAD_READ_SIZE = 64 * 1024
 
 
 def is_headman_or_above(user):
     return user.role in ['headman', 'teacher', 'admin']
 
 
-@login_required
-def materials_view(request):
-    # Получаем все уникальные факультеты и курсы для навигации
-    faculties = Material.objects.values_list('faculty', flat=True).distinct()
-    courses = Material.objects.values_list('course', flat=True).distinct()
+def _navigation(faculty=None, course=None, subject=None):
+    """Списки для боковой навигации из индекса каталога (см. facets.py) - без запросов к Material"""
+    type_labels = dict(Material.TYPES)
+    context = {'faculties': facet_children()}
+    if faculty is not None:
+        context['courses'] = facet_children(faculty)
+    if course is not None:
+        context['subjects'] = facet_children(faculty, course)
+    if subject is not None:
+        context['material_types'] = [
+            (material_type, type_labels.get(material_type, material_type), count)
+            for material_type, count in facet_children(faculty, course, subject)
+        ]
+    return context
 
-    # Показываем материалы для факультета пользователя по умолчанию
-    user_faculty = request.user.faculty
-    materials = Material.objects.filter(faculty=user_faculty)
+
+def _material_listing(request, **path_filters):
+    """Одна страница списка материалов в HTML или JSON (?format=json).
+
+    Фильтры и сортировка берутся из MaterialFilterForm в GET, сегменты пути
+    важнее параметров запроса; без факультета показывается факультет пользователя.
+    """
+    form = MaterialFilterForm(request.GET)
+    as_json = request.GET.get('format') == 'json'
+    if not form.is_valid() and as_json:
+        return JsonResponse({'errors': form.errors}, status=400)
+
+    filters = {**form.cleaned_data, **path_filters}
+    filters['faculty'] = filters.get('faculty') or request.user.faculty
+    sort = form.cleaned_data.get('sort', DEFAULT_SORT)
+    materials = filter_materials(Material.objects.for_listing(), filters)
+    try:
+        page = listing_page(materials, sort, after=request.GET.get('after'), before=request.GET.get('before'))
+    except ValueError:
+        if as_json:
+            return JsonResponse({'error': 'Некорректный курсор'}, status=400)
+        # Испорченная ссылка в браузере - просто первая страница
+        page = listing_page(materials, sort)
+
+    if as_json:
+        results = [
+            {
+                'id': material.id,
+                'name': material.name,
+                'faculty': material.faculty,
+                'course': material.course,
+                'subject': material.subject,
+                'type': material.type,
+                'type_display': material.get_type_display(),
+                'size': material.size,
+                'upload_date': material.upload_date.isoformat(),
+                'uploaded_by': material.uploaded_by.get_full_name(),
+                'download_url': reverse('download_material', args=[material.id]) if material.file else None,
+            }
+            for material in page.items
+        ]
+        return JsonResponse({
+            'sort': sort,
+            'next': page.next_cursor,
+            'previous': page.previous_cursor,
+            'results': results,
+        }, json_dumps_params={'ensure_ascii': False})
 
     context = {
-        'materials': materials,
-        'faculties': faculties,
-        'courses': courses,
-        'current_faculty': user_faculty,
+        'materials': page.items,
+        'page': page,
+        'filter_form': form,
+        'current_faculty': filters['faculty'],
+        'current_course': path_filters.get('course'),
+        'current_subject': path_filters.get('subject'),
+        'current_type': path_filters.get('material_type'),
+        'export_url': reverse('export_materials', args=[
+            filters['faculty'],
+            *(path_filters[level] for level in ('course', 'subject', 'material_type') if level in path_filters),
+        ]),
+        **_navigation(filters['faculty'], path_filters.get('course'), path_filters.get('subject')),
     }
     return render(request, 'materials.html', context)
 
 
 @login_required
-def faculty_materials(request, faculty):
-    courses = Material.objects.filter(faculty=faculty).values_list('course', flat=True).distinct()
-    materials = Material.objects.filter(faculty=faculty)
+def materials_view(request):
+    # Показываем материалы для факультета пользователя по умолчанию
+    return _material_listing(request)
 
-    context = {
-        'materials': materials,
-        'faculties': Material.objects.values_list('faculty', flat=True).distinct(),
-        'courses': courses,
-        'current_faculty': faculty,
-    }
-    return render(request, 'materials.html', context)
+
+@login_required
+def faculty_materials(request, faculty):
+    return _material_listing(request, faculty=faculty)
 
 
 @login_required
 def course_materials(request, faculty, course):
-    subjects = Material.objects.filter(faculty=faculty, course=course).values_list('subject', flat=True).distinct()
-    materials = Material.objects.filter(faculty=faculty, course=course)
-
-    context = {
-        'materials': materials,
-        'faculties': Material.objects.values_list('faculty', flat=True).distinct(),
-        'courses': Material.objects.values_list('course', flat=True).distinct(),
-        'subjects': subjects,
-        'current_faculty': faculty,
-        'current_course': course,
-    }
-    return render(request, 'materials.html', context)
+    return _material_listing(request, faculty=faculty, course=course)
 
 
 @login_required
 def subject_materials(request, faculty, course, subject):
-    material_types = Material.objects.filter(
-        faculty=faculty,
-        course=course,
-        subject=subject
-    ).values_list('type', flat=True).distinct()
-
-    materials = Material.objects.filter(
-        faculty=faculty,
-        course=course,
-        subject=subject
-    )
-
-    context = {
-        'materials': materials,
-        'current_faculty': faculty,
-        'current_course': course,
-        'current_subject': subject,
-        'material_types': material_types,
-    }
-    return render(request, 'materials.html', context)
+    return _material_listing(request, faculty=faculty, course=course, subject=subject)
 
 
 @login_required
 def type_materials(request, faculty, course, subject, material_type):
-    materials = Material.objects.filter(
-        faculty=faculty,
-        course=course,
-        subject=subject,
-        type=material_type
-    )
+    return _material_listing(request, faculty=faculty, course=course, subject=subject, material_type=material_type)
+
+
+@login_required
+def folder_view(request, folder_id):
+    """Папка: хлебные крошки, вложенные папки с числом материалов и материалы страницами"""
+    folder = get_object_or_404(MaterialFolder.objects.with_material_counts(), id=folder_id)
+    form = MaterialFilterForm(request.GET)
+    form.is_valid()
+    sort = form.cleaned_data.get('sort', DEFAULT_SORT)
+    materials = Material.objects.for_listing().filter(folder=folder)
+    try:
+        page = listing_page(materials, sort, after=request.GET.get('after'), before=request.GET.get('before'))
+    except ValueError:
+        page = listing_page(materials, sort)
 
     context = {
-        'materials': materials,
-        'current_faculty': faculty,
-        'current_course': course,
-        'current_subject': subject,
-        'current_type': material_type,
+        'current_folder': folder,
+        'breadcrumbs': folder.ancestors(),
+        'subfolders': folder.materialfolder_set.with_material_counts().order_by('name'),
+        'materials': page.items,
+        'page': page,
+        'filter_form': form,
+        'current_faculty': folder.faculty,
+        'current_course': folder.course,
+        'current_subject': folder.subject,
+        **_navigation(folder.faculty, folder.course, folder.subject or None),
     }
-    return render(request, 'materials.html', context)
+    return render(request, 'folder_view.html', context)
+
+
+@login_required
+def export_materials(request, faculty, course=None, subject=None, material_type=None):
+    """Весь раздел каталога одним ZIP-архивом"""
+    entries = catalog_entries(faculty, course, subject, material_type)
+    filename = '-'.join(str(part) for part in (faculty, course, subject, material_type) if part is not None)
+    return archive_response(request, entries, f'{filename}.zip')
+
+
+@login_required
+def export_folder(request, folder_id):
+    """Папка со всеми вложенными одним ZIP-архивом"""
+    folder = get_object_or_404(MaterialFolder, id=folder_id)
+    return archive_response(request, folder_entries(folder), f'{folder.name}.zip')
 
 
 @login_required
@@ -152,12 +220,9 @@ def upload_material(request):
 @login_required
 def download_material(request, material_id):
     material = get_object_or_404(Material, id=material_id)
-    file_path = os.path.join(settings.MEDIA_ROOT, str(material.file))
 
     if material.file:
-        response = FileResponse(material.file.open(), as_attachment=True)
-        response['Content-Disposition'] = f'attachment; filename="{material.file.name}"'
-        return response
+        return serve_file(request, material.file)
     else:
         messages.error(request, "Файл не найден")
         return HttpResponse("Файл не найден", status=404)
@@ -166,10 +231,139 @@ def download_material(request, material_id):
 @user_passes_test(is_headman_or_above)
 def delete_material(request, material_id):
     material = get_object_or_404(Material, id=material_id)
-    print(material.file)
     if request.method == 'POST':
-        if os.path.isfile(f"media/{material.file}"):
-            os.remove(f"media/{material.file}")
         material.delete()
         messages.success(request, 'Домашка успешно удалена')
-    return redirect(f'/materials')
\ No newline at end of file
+    return redirect(f'/materials')
+
+def _upload_state(upload):
+    return {
+        'upload_id': str(upload.id),
+        'chunk_size': upload.chunk_size,
+        'chunk_count': upload.chunk_count,
+        'missing': upload.missing_chunks(),
+    }
+
+
+@login_required
+@user_passes_test(is_headman_or_above)
+@require_POST
+def chunked_upload_init(request):
+    """Начало загрузки по частям: создаёт сессию и заготовку файла нужного размера"""
+    form = ChunkedUploadForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+
+    upload = form.save(commit=False)
+    upload.owner = request.user
+
+    # Строка и заготовка файла появляются вместе: если место не выделилось, сессии не остаётся
+    os.makedirs(settings.CHUNKED_UPLOAD_ROOT, exist_ok=True)
+    try:
+        with transaction.atomic():
+            upload.save()
+            with open(upload.part_path, 'wb') as part:
+                part.truncate(upload.size)
+    except OSError:
+        if os.path.exists(upload.part_path):
+            os.remove(upload.part_path)
+        return JsonResponse({'error': 'Не удалось выделить место под файл'}, status=507)
+
+    return JsonResponse(_upload_state(upload), status=201)
+
+
+@login_required
+@user_passes_test(is_headman_or_above)
+@require_http_methods(['PUT'])
+def chunked_upload_chunk(request, upload_id, index):
+    """Приём одной части; части можно слать параллельно и повторять после обрыва"""
+    upload = get_object_or_404(ChunkedUpload, id=upload_id, owner=request.user)
+    if index >= upload.chunk_count:
+        return JsonResponse({'error': 'Нет части с таким номером'}, status=400)
+
+    expected = upload.expected_chunk_length(index)
+    if int(request.META.get('CONTENT_LENGTH') or 0) != expected:
+        return JsonResponse({'error': f'Часть {index} должна быть длиной {expected} байт'}, status=400)
+
+    # Пишем тело запроса сразу в файл, не собирая часть в памяти, и хэшируем по ходу записи
+    written = 0
+    sha256 = hashlib.sha256()
+    try:
+        with open(upload.part_path, 'r+b') as part:
+            part.seek(index * upload.chunk_size)
+            while written < expected:
+                data = request.read(min(UPLOAD_READ_SIZE, expected - written))
+                if not data:
+                    break
+                sha256.update(data)
+                part.write(data)
+                written += len(data)
+    except FileNotFoundError:
+        # Загрузку параллельно завершили или отменили
+        return JsonResponse({'error': 'Загрузка уже завершена или отменена'}, status=404)
+
+    if written != expected:
+        return JsonResponse({'error': 'Часть получена не полностью'}, status=400)
+    chunk_sha256 = request.headers.get('X-Chunk-SHA256')
+    if chunk_sha256 and chunk_sha256.lower() != sha256.hexdigest():
+        return JsonResponse({'error': f'Контрольная сумма части {index} не совпала'}, status=400)
+
+    UploadedChunk.objects.get_or_create(upload=upload, index=index)
+    return JsonResponse({'index': index, 'received': written})
+
+
+@login_required
+@user_passes_test(is_headman_or_above)
+@require_http_methods(['GET', 'DELETE'])
+def chunked_upload_status(request, upload_id):
+    """Какие части ещё не получены (для докачки); DELETE отменяет загрузку"""
+    upload = get_object_or_404(ChunkedUpload, id=upload_id, owner=request.user)
+    if request.method == 'DELETE':
+        upload.discard()
+        return JsonResponse({'deleted': True})
+    return JsonResponse(_upload_state(upload))
+
+
+@login_required
+@user_passes_test(is_headman_or_above)
+@require_POST
+@transaction.atomic
+def chunked_upload_finalize(request, upload_id):
+    """Проверяет контрольную сумму собранного файла и создаёт Material.
+
+    Строка загрузки заблокирована до конца транзакции: повторный finalize
+    дождётся первого и получит 404. Собранный файл читается один раз для
+    хэша и переносится в хранилище без копирования.
+    """
+    upload = get_object_or_404(ChunkedUpload.objects.select_for_update(), id=upload_id, owner=request.user)
+    missing = upload.missing_chunks()
+    if missing:
+        return JsonResponse({'error': 'Получены не все части', 'missing': missing}, status=409)
+
+    sha256 = hashlib.sha256()
+    try:
+        part = open(upload.part_path, 'rb')
+    except FileNotFoundError:
+        return JsonResponse({'error': 'Загрузка уже завершается'}, status=409)
+    with part:
+        for data in iter(lambda: part.read(UPLOAD_READ_SIZE), b''):
+            sha256.update(data)
+        verified = sha256.hexdigest() == upload.sha256
+        if verified:
+            material = Material(
+                name=upload.name,
+                faculty=upload.faculty,
+                course=upload.course,
+                subject=upload.subject,
+                type=upload.type,
+                folder=upload.folder,
+                uploaded_by=request.user,
+            )
+            # Ссылку на блоб и постобработку берут сигналы при сохранении
+            material.file = HashedFile(part, upload.sha256, name=upload.filename)
+            material.save()
+    upload.discard()
+    if not verified:
+        return JsonResponse({'error': 'Контрольная сумма не совпала, загрузите файл заново'}, status=400)
+
+    return JsonResponse({'material_id': material.id}, status=201)
@@ -2,6 +2,8 @@
 ASGI config for msu_portal project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Поток push-событий /events/ работает только под ASGI-сервером, например
+``uvicorn msu_portal.asgi:application`` (см. main/events.py).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -40,6 +40,9 @@ INSTALLED_APPS = [
     'main',
     'schedule',
     'materials',
+    'search',
+    'taskqueue',
+    'api',
 ]
 
 MIDDLEWARE = [
@@ -85,6 +88,28 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# Кэш расписания, ленты и каталога сбрасывают сигналы и команды (import_timetable,
+# generate_timetable, rebuild_material_facets, воркер run_tasks), которые работают
+# в других процессах, поэтому кэш должен быть общим для всех процессов сайта.
+# Файловый кэш общий на одной машине; для нескольких серверов - RedisCache
+# (django.core.cache.backends.redis.RedisCache, пакет redis) с LOCATION redis://...
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('DJANGO_CACHE_DIR', os.path.join(BASE_DIR, 'cache')),
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000,
+        },
+    }
+}
+
+# Тесты получают собственный кэш в памяти, чтобы не чистить кэш работающего сайта
+TEST_RUNNER = 'msu_portal.test_runner.TestRunner'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -139,4 +164,43 @@ AUTH_USER_MODEL = 'main.CustomUser'
 # Добавьте эти настройки
 LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = 'home'
-LOGIN_URL = 'login'
\ No newline at end of file
+LOGIN_URL = 'login'
+
+# Отдача скачиваемых файлов через фронтовой прокси:
+# None - Django отдаёт файл сам, 'nginx' - X-Accel-Redirect, 'apache' - X-Sendfile
+DOWNLOADS_SENDFILE = None
+# internal location в nginx, смотрящий на MEDIA_ROOT
+DOWNLOADS_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+
+# Куда складываются части файлов при загрузке по частям (вне MEDIA_ROOT,
+# чтобы недогруженные файлы не раздавались по /media/)
+CHUNKED_UPLOAD_ROOT = os.path.join(BASE_DIR, 'upload_chunks')
+# Наибольший размер файла, загружаемого по частям (место под него выделяется сразу при начале загрузки)
+CHUNKED_UPLOAD_MAX_SIZE = 4 * 1024 ** 3
+
+# Движок полнотекстового поиска: 'auto' (FTS5 на SQLite, tsvector на PostgreSQL,
+# иначе инвертированный индекс в памяти), 'sqlite_fts', 'postgres' или 'python'
+SEARCH_BACKEND = 'auto'
+
+# Число процессов для извлечения текста из загруженных файлов;
+# 0 - извлекать синхронно в том же процессе после коммита
+TEXT_EXTRACTION_WORKERS = 2
+
+# Процессов для перезапусков генератора расписания; None - по числу ядер
+TIMETABLE_SOLVER_WORKERS = None
+
+# Фоновые задачи (manage.py run_tasks): потоков в воркере, пауза опроса пустой
+# очереди, задержка перед повтором (удваивается с каждой попыткой) и время,
+# после которого задача упавшего воркера возвращается в очередь - всё в секундах
+TASKS_CONCURRENCY = 2
+TASKS_POLL_INTERVAL = 1.0
+TASKS_RETRY_BACKOFF = 10
+TASKS_RETRY_BACKOFF_MAX = 3600
+TASKS_LOCK_TIMEOUT = 30 * 60
+# Сколько хранить выполненные задачи, секунд; старые воркер удаляет сам, задачи с ошибкой остаются для разбора
+TASKS_DONE_RETENTION = 7 * 24 * 60 * 60
+
+# Брокер push-событий (/events/, см. main/events.py). Встроенный доставляет
+# события в пределах одного процесса - сайт должен работать под одним
+# ASGI-процессом (например, uvicorn msu_portal.asgi:application)
+EVENTS_BROKER = 'main.events.InProcessBroker'
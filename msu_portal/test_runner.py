@@ -0,0 +1,25 @@
+"""Раннер manage.py test: тесты получают собственный кэш в памяти.
+
+Кэш сайта общий для всех процессов (см. CACHES в settings.py), а тесты его
+чистят, поэтому на время прогона он подменяется LocMemCache. Другие
+раннеры (pytest-django и т.п.) запускаются с DJANGO_SETTINGS_MODULE=msu_portal.test_settings.
+"""
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._test_caches = override_settings(CACHES=TEST_CACHES)
+        self._test_caches.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._test_caches.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,5 @@
+"""Настройки для тестов под другими раннерами (pytest-django, coverage run -m pytest)"""
+from .settings import *  # noqa: F401,F403
+from .test_runner import TEST_CACHES
+
+CACHES = TEST_CACHES
@@ -18,10 +18,16 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from django.contrib.staticfiles.urls import staticfiles_urlpatterns
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('main.urls')),
     path('schedule/', include('schedule.urls')),
     path('materials/', include('materials.urls')),
+    path('search/', include('search.urls')),
+    path('api/v1/', include('api.urls')),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
+# runserver раздаёт статику сам, а под ASGI-сервером (uvicorn) в режиме DEBUG - эти маршруты
+urlpatterns += staticfiles_urlpatterns()
@@ -1,11 +1,107 @@
-from django.contrib import admin
-from .models import Schedule
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+
+from .forms import ScheduleAdminForm, TimetableGenerationForm, TimetableImportForm
+from .importer import TimetableImportError, import_timetable, read_table
+from .models import Classroom, Schedule, TeachingLoad
+from .tasks import generate_faculty_timetable
 
 
 @admin.register(Schedule)
 class ScheduleAdmin(admin.ModelAdmin):
-    list_display = ['subject', 'faculty', 'group', 'teacher_id', 'time', 'classroom', 'day']
-    list_filter = ['subject', 'faculty', 'group', 'teacher_id', 'time', 'classroom', 'day']
-    search_fields = ['subject', 'faculty', 'group', 'teacher_id', 'time', 'classroom', 'day']
+    form = ScheduleAdminForm
+    list_display = ['subject', 'faculty', 'group', 'teacher_id', 'day', 'lesson_number', 'time', 'classroom']
+    list_filter = ['faculty', 'group', 'teacher_id', 'day', 'classroom', 'subject']
+    search_fields = ['subject__name', 'faculty', 'group__name', 'teacher_id', 'classroom']
     readonly_fields = []
-    ordering = ['subject', 'faculty', 'group', 'teacher_id', 'time', 'classroom', 'day']
\ No newline at end of file
+    ordering = ['faculty', 'group', 'day', 'lesson_number']
+    change_list_template = 'admin/schedule/schedule/change_list.html'
+
+    def get_urls(self):
+        urls = [
+            path('import/', self.admin_site.admin_view(self.import_view), name='schedule_schedule_import'),
+        ]
+        return urls + super().get_urls()
+
+    def import_view(self, request):
+        """Загрузка расписания из файла: все ошибки показываются списком, запись - всё или ничего"""
+        if not self.has_add_permission(request) or not self.has_change_permission(request):
+            raise PermissionDenied
+        errors = []
+        form = TimetableImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                result = import_timetable(
+                    read_table(upload.read(), upload.name),
+                    replace=form.cleaned_data['replace'],
+                    dry_run=form.cleaned_data['dry_run'],
+                )
+            except TimetableImportError as exc:
+                errors = exc.errors
+            else:
+                summary = (
+                    f'создано пар: {result.created}, обновлено: {result.updated}, без изменений: {result.unchanged}, '
+                    f'удалено: {result.deleted}, новых предметов: {result.subjects_created}'
+                )
+                if form.cleaned_data['dry_run']:
+                    messages.info(request, f'Файл без ошибок, будет {summary}')
+                else:
+                    messages.success(request, f'Расписание загружено: {summary}')
+                    return redirect('admin:schedule_schedule_changelist')
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Импорт расписания',
+            'form': form,
+            'errors': errors,
+        }
+        return TemplateResponse(request, 'admin/schedule/import_timetable.html', context)
+
+
+@admin.register(Classroom)
+class ClassroomAdmin(admin.ModelAdmin):
+    list_display = ['name', 'capacity', 'faculty']
+    list_filter = ['faculty']
+    search_fields = ['name']
+
+
+@admin.register(TeachingLoad)
+class TeachingLoadAdmin(admin.ModelAdmin):
+    list_display = ['group', 'subject', 'lessons_per_week']
+    list_filter = ['group__faculty', 'group__course']
+    search_fields = ['group__name', 'subject__name']
+    list_select_related = ['group', 'subject']
+    change_list_template = 'admin/schedule/teachingload/change_list.html'
+
+    def get_urls(self):
+        urls = [
+            path('generate/', self.admin_site.admin_view(self.generate_view), name='schedule_teachingload_generate'),
+        ]
+        return urls + super().get_urls()
+
+    def generate_view(self, request):
+        """Ставит генерацию расписания факультета в фоновую очередь - решатель работает дольше запроса"""
+        if not request.user.has_perm('schedule.add_schedule') or not request.user.has_perm('schedule.delete_schedule'):
+            raise PermissionDenied
+        faculties = TeachingLoad.objects.values_list('group__faculty', flat=True).distinct().order_by('group__faculty')
+        form = TimetableGenerationForm(request.POST or None, faculties=faculties)
+        if request.method == 'POST' and form.is_valid():
+            queued = generate_faculty_timetable.enqueue(**form.cleaned_data)
+            messages.success(
+                request,
+                f'Генерация расписания факультета {form.cleaned_data["faculty"]} поставлена в очередь (задача #{queued.pk})',
+            )
+            return redirect('admin:schedule_teachingload_changelist')
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Генерация расписания',
+            'form': form,
+        }
+        return TemplateResponse(request, 'admin/schedule/generate_timetable.html', context)
@@ -0,0 +1,154 @@
+import uuid
+
+from django.core.cache import cache
+
+from .lessons import LESSON_VALUES, lesson_row
+from .models import Schedule, Homework
+
+# Расписание меняется редко, а инвалидация идёт через сигналы (см. signals.py),
+# поэтому таймаут нужен только как страховка от забытых ключей
+TIMETABLE_TIMEOUT = 60 * 60 * 24
+
+WEEKDAYS = {day for day, _ in Schedule.DAYS}
+
+
+def group_day_key(group_id, weekday):
+    return f'timetable:group:{group_id}:{weekday}'
+
+
+def teacher_day_key(teacher_id, weekday):
+    return f'timetable:teacher:{teacher_id}:{weekday}'
+
+
+def group_day_version_key(group_id, weekday):
+    return f'timetable:group:{group_id}:{weekday}:version'
+
+
+def feed_version_key(kind, value):
+    return f'ical:{kind}:{value}:version'
+
+
+def _version(key):
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.add(key, version, TIMETABLE_TIMEOUT)
+        # add не перезаписывает: если другой процесс успел первым, берём его метку
+        version = cache.get(key, version)
+    return version
+
+
+def group_day_version(group_id, weekday):
+    """Метка версии дня группы для ключей производных кэшей (фрагменты главной и т.п.)"""
+    return _version(group_day_version_key(group_id, weekday))
+
+
+def feed_version(kind, value):
+    """Метка версии календаря группы или преподавателя (kind - 'group' или 'teacher'), см. ical.py"""
+    return _version(feed_version_key(kind, value))
+
+
+def group_homework_key(group_id, due_date):
+    return f'homework:group:{group_id}:{due_date.isoformat()}'
+
+
+def _serialize_homework(homework):
+    return {
+        'id': homework.id,
+        'schedule_id': homework.schedule_id,
+        'content': homework.content,
+        'file_name': homework.file.name if homework.file else '',
+        'assigned_date': homework.assigned_date,
+        'due_date': homework.due_date,
+    }
+
+
+def _load_group_lessons(group_id, weekday):
+    if weekday not in WEEKDAYS:
+        return []
+    return [lesson_row(row) for row in Schedule.objects.for_group_day(group_id, weekday).values(*LESSON_VALUES)]
+
+
+def _load_teacher_lessons(teacher_id, weekday):
+    if weekday not in WEEKDAYS:
+        return []
+    return [lesson_row(row) for row in Schedule.objects.for_teacher_day(teacher_id, weekday).values(*LESSON_VALUES)]
+
+
+def _load_group_homework(group_id, due_date):
+    return [_serialize_homework(item) for item in Homework.objects.for_group_date(group_id, due_date)]
+
+
+def get_group_day(group_id, current_date):
+    """Пары и ДЗ группы на дату - одно обращение к кэшу в штатном режиме"""
+    weekday = current_date.weekday()
+    lessons_key = group_day_key(group_id, weekday)
+    homework_key = group_homework_key(group_id, current_date)
+
+    cached = cache.get_many([lessons_key, homework_key])
+    missing = {}
+    if lessons_key not in cached:
+        missing[lessons_key] = _load_group_lessons(group_id, weekday)
+    if homework_key not in cached:
+        missing[homework_key] = _load_group_homework(group_id, current_date)
+    if missing:
+        cache.set_many(missing, TIMETABLE_TIMEOUT)
+        cached.update(missing)
+
+    return cached[lessons_key], cached[homework_key]
+
+
+def get_teacher_day(teacher_id, current_date):
+    """Пары преподавателя и ДЗ к ним на дату.
+
+    ДЗ берётся из тех же групповых ключей, что и у студентов, поэтому
+    отдельной инвалидации для преподавателей не требуется.
+    """
+    weekday = current_date.weekday()
+    lessons_key = teacher_day_key(teacher_id, weekday)
+
+    lessons = cache.get(lessons_key)
+    if lessons is None:
+        lessons = _load_teacher_lessons(teacher_id, weekday)
+        cache.set(lessons_key, lessons, TIMETABLE_TIMEOUT)
+
+    group_ids = {lesson['group_id'] for lesson in lessons}
+    keys = {group_homework_key(group_id, current_date): group_id for group_id in group_ids}
+    cached = cache.get_many(keys)
+    missing = {
+        key: _load_group_homework(group_id, current_date)
+        for key, group_id in keys.items() if key not in cached
+    }
+    if missing:
+        cache.set_many(missing, TIMETABLE_TIMEOUT)
+        cached.update(missing)
+
+    lesson_ids = {lesson['id'] for lesson in lessons}
+    homework = [
+        item for items in cached.values() for item in items
+        if item['schedule_id'] in lesson_ids
+    ]
+    return lessons, homework
+
+
+def invalidate_lesson(group_id, day, teacher_id):
+    """Сбрасывает закэшированные дни, в которые входит пара"""
+    keys = [group_day_key(group_id, day), group_day_version_key(group_id, day), feed_version_key('group', group_id)]
+    if teacher_id:
+        keys += [teacher_day_key(teacher_id, day), feed_version_key('teacher', teacher_id)]
+    cache.delete_many(keys)
+
+
+def invalidate_lessons(queryset):
+    """Сбрасывает кэш для всех пар из queryset расписания"""
+    for group_id, day, teacher_id in queryset.values_list('group_id', 'day', 'teacher_id').distinct():
+        invalidate_lesson(group_id, day, teacher_id)
+
+
+def invalidate_homework(group_id, due_date, teacher_id=None):
+    """Сбрасывает ДЗ группы на дату и календари, в которые попадает срок сдачи"""
+    if group_id and due_date:
+        keys = [group_homework_key(group_id, due_date), feed_version_key('group', group_id)]
+        if teacher_id:
+            keys.append(feed_version_key('teacher', teacher_id))
+        cache.delete_many(keys)
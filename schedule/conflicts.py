@@ -0,0 +1,109 @@
+"""Поиск накладок в расписании: группа, преподаватель или аудитория в двух местах сразу.
+
+Пары раскладываются за один проход по трём хэш-индексам - (день, пара,
+группа), (день, пара, преподаватель) и (день, пара, аудитория), - после
+чего накладками оказываются корзины с несовместимым содержимым. Время
+линейное от числа пар, поэтому весь факультет проверяется целиком.
+
+Поток - один преподаватель в одной аудитории у нескольких групп сразу -
+накладкой не считается.
+"""
+from collections import defaultdict, namedtuple
+
+from django.db.models import Q
+
+from main.models import CustomUser
+
+from .models import Schedule
+
+# ref - чем пара обозначается в отчёте: id в базе или, например, строка файла импорта
+LessonSlot = namedtuple('LessonSlot', 'ref group_id day lesson_number teacher_id classroom')
+Conflict = namedtuple('Conflict', 'kind day lesson_number value lessons')
+
+SLOT_FIELDS = ('id', 'group_id', 'day', 'lesson_number', 'teacher_id', 'classroom')
+DAY_LABELS = dict(Schedule.DAYS)
+
+
+def lesson_slots(queryset):
+    """LessonSlot для пар queryset одним запросом без создания моделей"""
+    return [LessonSlot._make(row) for row in queryset.values_list(*SLOT_FIELDS).iterator()]
+
+
+def find_conflicts(lessons):
+    """Все накладки среди lessons, отсортированные по дню, паре и виду"""
+    by_group, by_teacher, by_room = defaultdict(list), defaultdict(list), defaultdict(list)
+    for lesson in lessons:
+        slot = (lesson.day, lesson.lesson_number)
+        by_group[slot + (lesson.group_id,)].append(lesson)
+        if lesson.teacher_id:
+            by_teacher[slot + (lesson.teacher_id,)].append(lesson)
+        if lesson.classroom:
+            by_room[slot + (lesson.classroom,)].append(lesson)
+
+    conflicts = []
+    for (day, number, group_id), found in by_group.items():
+        if len(found) > 1:
+            conflicts.append(Conflict('group', day, number, group_id, found))
+    for (day, number, teacher_id), found in by_teacher.items():
+        if len({lesson.classroom for lesson in found if lesson.classroom}) > 1:
+            conflicts.append(Conflict('teacher', day, number, teacher_id, found))
+    for (day, number, classroom), found in by_room.items():
+        if len({lesson.teacher_id for lesson in found if lesson.teacher_id}) > 1:
+            conflicts.append(Conflict('classroom', day, number, classroom, found))
+    conflicts.sort(key=lambda conflict: (conflict.day, conflict.lesson_number, conflict.kind, str(conflict.value)))
+    return conflicts
+
+
+def timetable_conflicts(faculty=None):
+    """Накладки во всём расписании или в расписании факультета"""
+    queryset = Schedule.objects.all()
+    if faculty:
+        queryset = queryset.filter(faculty=faculty)
+    return find_conflicts(lesson_slots(queryset))
+
+
+def lesson_conflicts(lesson):
+    """Накладки, в которые попадёт пара lesson (LessonSlot), если её сохранить.
+
+    Читаются только пары того же слота с той же группой, преподавателем или аудиторией.
+    """
+    match = Q(group_id=lesson.group_id) | Q(classroom=lesson.classroom)
+    if lesson.teacher_id:
+        match |= Q(teacher_id=lesson.teacher_id)
+    others = Schedule.objects.filter(match, day=lesson.day, lesson_number=lesson.lesson_number)
+    if lesson.ref is not None:
+        others = others.exclude(pk=lesson.ref)
+    return [
+        conflict for conflict in find_conflicts([lesson, *lesson_slots(others)])
+        if lesson in conflict.lessons
+    ]
+
+
+def teacher_labels(conflicts):
+    """Подписи преподавателей из накладок одним запросом: student_id -> 'Имя Фамилия (student_id)'"""
+    teacher_ids = {lesson.teacher_id for conflict in conflicts for lesson in conflict.lessons if lesson.teacher_id}
+    if not teacher_ids:
+        return {}
+    labels = {}
+    for teacher in CustomUser.objects.filter(student_id__in=teacher_ids).only('student_id', 'first_name', 'last_name'):
+        full_name = teacher.get_full_name()
+        labels[teacher.student_id] = f'{full_name} ({teacher.student_id})' if full_name else teacher.student_id
+    return labels
+
+
+def describe(conflict, ref_label=str, group_label=str, teacher_label=str):
+    """Текст накладки для людей.
+
+    ref_label, group_label и teacher_label превращают ref, id группы и id преподавателя в подписи.
+    """
+    when = f'{DAY_LABELS.get(conflict.day, conflict.day)}, {conflict.lesson_number} пара'
+    refs = ', '.join(ref_label(lesson.ref) for lesson in conflict.lessons)
+    if conflict.kind == 'group':
+        return f'{when}: у группы {group_label(conflict.value)} несколько пар ({refs})'
+    if conflict.kind == 'teacher':
+        places = ', '.join(f'{lesson.classroom} ({ref_label(lesson.ref)})' for lesson in conflict.lessons)
+        return f'{when}: преподаватель {teacher_label(conflict.value)} в разных аудиториях: {places}'
+    teachers = ', '.join(
+        f'{teacher_label(lesson.teacher_id)} ({ref_label(lesson.ref)})' for lesson in conflict.lessons
+    )
+    return f'{when}: в аудитории {conflict.value} разные преподаватели: {teachers}'
@@ -1,5 +1,6 @@
 from django import forms
-from .models import Homework
+from .conflicts import LessonSlot, describe, lesson_conflicts, teacher_labels
+from .models import Homework, Schedule
 
 
 class HomeworkForm(forms.ModelForm):
@@ -16,3 +17,58 @@ class HomeworkForm(forms.ModelForm):
             'file': 'Файл (необязательно)',
             'due_date': 'Срок сдачи',
         }
+
+
+class TimetableImportForm(forms.Form):
+    file = forms.FileField(label='Файл расписания (.csv или .xlsx)')
+    replace = forms.BooleanField(
+        required=False, label='Удалить пары этих групп, которых нет в файле',
+    )
+    dry_run = forms.BooleanField(required=False, label='Только проверить')
+
+    def clean_file(self):
+        file = self.cleaned_data['file']
+        if not file.name.lower().endswith(('.csv', '.xlsx')):
+            raise forms.ValidationError('Поддерживаются только CSV и XLSX')
+        return file
+
+
+class TimetableGenerationForm(forms.Form):
+    faculty = forms.ChoiceField(label='Факультет')
+    seed = forms.IntegerField(initial=0, label='Seed', help_text='С одним seed результат одинаковый')
+    restarts = forms.IntegerField(initial=4, min_value=1, max_value=64, label='Перезапусков решателя')
+
+    def __init__(self, *args, faculties=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['faculty'].choices = [(faculty, faculty) for faculty in faculties]
+
+
+class ScheduleAdminForm(forms.ModelForm):
+    """Пара в админке: не даёт сохранить накладку по группе, преподавателю или аудитории"""
+
+    class Meta:
+        model = Schedule
+        fields = '__all__'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        fields = ('group', 'day', 'lesson_number', 'classroom')
+        if any(cleaned_data.get(field) in (None, '') for field in fields):
+            return cleaned_data
+        lesson = LessonSlot(
+            self.instance.pk, cleaned_data['group'].pk, cleaned_data['day'], cleaned_data['lesson_number'],
+            cleaned_data.get('teacher_id'), cleaned_data['classroom'],
+        )
+        # Две пары у группы в одном слоте уже запрещает ограничение модели
+        conflicts = [conflict for conflict in lesson_conflicts(lesson) if conflict.kind != 'group']
+        if conflicts:
+            teacher_names = teacher_labels(conflicts)
+            raise forms.ValidationError([
+                describe(
+                    conflict,
+                    ref_label=lambda ref: 'эта пара' if ref == lesson.ref else f'пара #{ref}',
+                    teacher_label=lambda teacher_id: teacher_names.get(teacher_id, teacher_id),
+                )
+                for conflict in conflicts
+            ])
+        return cleaned_data
@@ -0,0 +1,200 @@
+"""Генерация расписания факультета по учебной нагрузке (TeachingLoad) и аудиториям.
+
+Здесь - только чтение исходных данных и запись результата; сама раскладка
+в solver.py. Пары других факультетов у тех же преподавателей и в тех же
+аудиториях передаются решателю как занятые слоты. Расписание групп
+заменяется в одной транзакции: прежняя пара той же группы, предмета и
+преподавателя переносится в новый слот, а не пересоздаётся, - её ДЗ
+остаются при своём предмете. Пары предметов, которых больше нет, удаляются
+вместе с ДЗ.
+Результат перед записью перепроверяется поиском накладок из conflicts.py.
+"""
+import os
+import time as clock
+from collections import defaultdict, namedtuple
+from datetime import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+
+from main.models import Group
+from . import solver
+from .cache import invalidate_lesson
+from .conflicts import LessonSlot, find_conflicts
+from .models import Classroom, Schedule, TeachingLoad
+
+BATCH_SIZE = 500
+UPDATE_FIELDS = ['day', 'lesson_number', 'faculty', 'classroom', 'start_time', 'end_time']
+
+# Звонки: номер пары -> (начало, конец)
+LESSON_TIMES = {
+    1: (time(9, 0), time(10, 30)),
+    2: (time(10, 45), time(12, 15)),
+    3: (time(12, 50), time(14, 20)),
+    4: (time(14, 40), time(16, 10)),
+    5: (time(16, 20), time(17, 50)),
+    6: (time(18, 0), time(19, 30)),
+}
+
+GenerationResult = namedtuple('GenerationResult', 'lessons unplaced cost seconds written')
+
+
+class TimetableGenerationError(Exception):
+    pass
+
+
+def default_workers():
+    return getattr(settings, 'TIMETABLE_SOLVER_WORKERS', None) or os.cpu_count() or 1
+
+
+def build_problem(faculty):
+    """Problem для solver: события - недельные пары из нагрузки групп факультета"""
+    loads = list(
+        TeachingLoad.objects.filter(group__faculty=faculty)
+        .select_related('subject__teacher')
+        .only('group_id', 'lessons_per_week', 'subject__id', 'subject__teacher__student_id')
+        .order_by('group_id', 'subject_id')
+    )
+    sizes = dict(
+        Group.objects.filter(faculty=faculty).annotate(
+            students=Count('customuser', filter=Q(customuser__role__in=['student', 'headman'])),
+        ).values_list('id', 'students')
+    )
+    rooms = [
+        solver.Room(name, capacity)
+        for name, capacity in Classroom.objects.filter(Q(faculty=faculty) | Q(faculty=''))
+        .order_by('name').values_list('name', 'capacity')
+    ]
+    events = []
+    for load in loads:
+        teacher_id = load.subject.teacher.student_id
+        for _ in range(load.lessons_per_week):
+            events.append(solver.Event(load.group_id, teacher_id, load.subject.pk, sizes.get(load.group_id, 0)))
+
+    teachers = {event.teacher for event in events}
+    room_index = {room.name: index for index, room in enumerate(rooms)}
+    outside = (
+        Schedule.objects.exclude(group_id__in={event.group for event in events})
+        .filter(Q(teacher_id__in=teachers) | Q(classroom__in=room_index), lesson_number__in=LESSON_TIMES)
+        .values_list('teacher_id', 'classroom', 'day', 'lesson_number')
+    )
+    busy = [
+        (teacher_id if teacher_id in teachers else None, room_index.get(classroom), day, number - 1)
+        for teacher_id, classroom, day, number in outside
+    ]
+    return solver.Problem(events, rooms, len(Schedule.DAYS), len(LESSON_TIMES), busy)
+
+
+def solution_lessons(problem, solution, faculty):
+    """Несохранённые Schedule для расставленных пар решения"""
+    lessons = []
+    for event, placement in zip(problem.events, solution.placements):
+        if placement is None:
+            continue
+        day, slot, room = placement
+        start_time, end_time = LESSON_TIMES[slot + 1]
+        lessons.append(Schedule(
+            faculty=faculty, group_id=event.group, day=day, lesson_number=slot + 1,
+            teacher_id=event.teacher, subject_id=event.subject, classroom=problem.rooms[room].name,
+            start_time=start_time, end_time=end_time,
+        ))
+    return lessons
+
+
+def generate_timetable(faculty, seed=0, restarts=4, iterations=solver.DEFAULT_ITERATIONS, workers=None,
+                       dry_run=False):
+    """Раскладывает нагрузку факультета и заменяет расписание его групп.
+
+    Если часть пар поставить некуда, расписание всё равно записывается - без
+    них; их число есть в результате. dry_run - только посчитать.
+    """
+    problem = build_problem(faculty)
+    if not problem.events:
+        raise TimetableGenerationError(f'Для факультета {faculty!r} не задана учебная нагрузка')
+    if not problem.rooms:
+        raise TimetableGenerationError(f'Для факультета {faculty!r} нет аудиторий')
+
+    started = clock.monotonic()
+    solution = solver.solve(
+        problem, seed=seed, restarts=restarts, iterations=iterations,
+        workers=default_workers() if workers is None else workers,
+    )
+    seconds = clock.monotonic() - started
+    lessons = solution_lessons(problem, solution, faculty)
+
+    # Решатель не должен давать накладок; если дал - это ошибка, и старое расписание не трогаем
+    conflicts = find_conflicts([
+        LessonSlot(index, lesson.group_id, lesson.day, lesson.lesson_number, lesson.teacher_id, lesson.classroom)
+        for index, lesson in enumerate(lessons)
+    ])
+    if conflicts:
+        raise TimetableGenerationError(f'Решатель выдал накладки: {len(conflicts)}')
+
+    result = GenerationResult(len(lessons), solution.unplaced, solution.cost, seconds, not dry_run)
+    if dry_run:
+        return result
+
+    group_ids = {event.group for event in problem.events}
+    with transaction.atomic():
+        existing = list(
+            Schedule.objects.filter(group_id__in=group_ids).select_for_update().order_by('day', 'lesson_number')
+        )
+        touched = {(lesson.group_id, lesson.day, lesson.teacher_id) for lesson in existing}
+        matched, to_create = _match_existing(existing, lessons)
+        leftover = {lesson.pk for lesson in existing} - {current.pk for current, _ in matched}
+        if leftover:
+            Schedule.objects.filter(pk__in=leftover).delete()
+        moved = [current for current, lesson in matched if _slot(current) != _slot(lesson)]
+        # Уникальность (группа, день, номер) проверяется построчно: переносимые пары
+        # сначала уводим на несуществующие номера -pk, иначе обмен слотами упрётся в ограничение
+        for current in moved:
+            current.lesson_number = -current.pk
+        Schedule.objects.bulk_update(moved, ['lesson_number'], batch_size=BATCH_SIZE)
+        for current, lesson in matched:
+            touched.add((lesson.group_id, lesson.day, lesson.teacher_id))
+            for field in UPDATE_FIELDS:
+                attname = Schedule._meta.get_field(field).attname
+                setattr(current, attname, getattr(lesson, attname))
+        Schedule.objects.bulk_update([current for current, _ in matched], UPDATE_FIELDS, batch_size=BATCH_SIZE)
+        touched.update((lesson.group_id, lesson.day, lesson.teacher_id) for lesson in to_create)
+        Schedule.objects.bulk_create(to_create, batch_size=BATCH_SIZE)
+        # bulk-операции не посылают сигналов - кэш дней сбрасываем сами
+        transaction.on_commit(lambda: _invalidate(touched))
+    return result
+
+
+def _slot(lesson):
+    return lesson.day, lesson.lesson_number
+
+
+def _match_existing(existing, lessons):
+    """Пары ([(строка, новая пара)], [новые пары без строки]).
+
+    Строка сопоставляется только паре той же группы, предмета и преподавателя -
+    вместе с ней переезжают её ДЗ. Сначала - оставшиеся в своём слоте.
+    """
+    by_slot = {(lesson.group_id, lesson.subject_id, lesson.teacher_id, *_slot(lesson)): lesson for lesson in existing}
+    matched, pending = [], []
+    for lesson in lessons:
+        current = by_slot.pop((lesson.group_id, lesson.subject_id, lesson.teacher_id, *_slot(lesson)), None)
+        if current is None:
+            pending.append(lesson)
+        else:
+            matched.append((current, lesson))
+    by_subject = defaultdict(list)
+    for current in by_slot.values():
+        by_subject[(current.group_id, current.subject_id, current.teacher_id)].append(current)
+    to_create = []
+    for lesson in pending:
+        candidates = by_subject.get((lesson.group_id, lesson.subject_id, lesson.teacher_id))
+        if candidates:
+            matched.append((candidates.pop(0), lesson))
+        else:
+            to_create.append(lesson)
+    return matched, to_create
+
+
+def _invalidate(keys):
+    for group_id, day, teacher_id in keys:
+        invalidate_lesson(group_id, day, teacher_id)
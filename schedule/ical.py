@@ -0,0 +1,180 @@
+"""Календарь расписания в формате iCalendar (RFC 5545) для подписки с телефона.
+
+Пары - еженедельно повторяющиеся события, сроки сдачи ДЗ - события на весь
+день. Ссылка содержит подписанный токен и работает без сессии: календарные
+приложения не умеют входить на сайт. Готовый файл лежит в кэше под меткой
+версии (cache.feed_version), которую сбрасывают те же сигналы, что и кэш
+дней расписания. Метка же служит ETag, поэтому опрос клиента раз в 15 минут
+стоит пары обращений к кэшу и ответа 304.
+"""
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from django.core import signing
+from django.core.cache import cache
+from django.http import Http404, HttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+from main.models import CustomUser, Group
+from .cache import TIMETABLE_TIMEOUT, feed_version
+from .models import Homework, Schedule
+
+FEED_SALT = 'schedule.ical'
+FEED_KINDS = ('user', 'group', 'teacher')
+FEED_MAX_AGE = 15 * 60
+# Сколько прошедших сроков сдачи оставлять в календаре
+HOMEWORK_HISTORY = timedelta(weeks=4)
+PRODID = '-//MSU Portal//Schedule//RU'
+UID_DOMAIN = 'msu-portal'
+
+
+def feed_token(kind, value):
+    return signing.Signer(salt=FEED_SALT).sign_object([kind, str(value)])
+
+
+def read_token(token):
+    """(вид, значение) из токена; BadSignature для поддельного или испорченного"""
+    try:
+        kind, value = signing.Signer(salt=FEED_SALT).unsign_object(token)
+    except (TypeError, ValueError) as exc:
+        raise signing.BadSignature(str(exc)) from exc
+    if kind not in FEED_KINDS:
+        raise signing.BadSignature(f'Unknown feed kind: {kind!r}')
+    return kind, value
+
+
+def feed_urls(user):
+    """Ссылки на календари для страницы расписания: личный и общий группы или преподавателя"""
+    urls = [('Моё расписание', reverse('calendar_feed', args=[feed_token('user', user.pk)]))]
+    if user.role == 'teacher':
+        urls.append(('Расписание преподавателя', reverse('calendar_feed', args=[feed_token('teacher', user.student_id)])))
+    elif user.group_id:
+        urls.append(('Расписание группы', reverse('calendar_feed', args=[feed_token('group', user.group_id)])))
+    return urls
+
+
+def resolve_scope(kind, value):
+    """Чьё расписание показывать: ('group', id) или ('teacher', student_id); None - показывать нечего.
+
+    Личный календарь смотрит на текущую роль и группу, поэтому после перевода
+    в другую группу ссылка менять не нужно.
+    """
+    if kind == 'group':
+        return ('group', int(value)) if value.isdigit() else None
+    if kind == 'teacher':
+        return kind, value
+    user = CustomUser.objects.filter(pk=value, is_active=True).values_list('role', 'group_id', 'student_id').first()
+    if user is None:
+        return None
+    role, group_id, student_id = user
+    if role == 'teacher':
+        return 'teacher', student_id
+    return ('group', group_id) if group_id else None
+
+
+def _escape(text):
+    return (
+        str(text).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def _fold(line):
+    """Переносит строку длиннее 75 октетов, не разрезая символы UTF-8"""
+    parts, current, size = [], '', 0
+    for char in line:
+        width = len(char.encode())
+        if size + width > 75:
+            parts.append(current)
+            current, size = ' ', 1
+        current += char
+        size += width
+    parts.append(current)
+    return '\r\n'.join(parts)
+
+
+def _event(uid, stamp, *properties):
+    return ['BEGIN:VEVENT', f'UID:{uid}@{UID_DOMAIN}', f'DTSTAMP:{stamp}', *properties, 'END:VEVENT']
+
+
+def render_feed(kind, value, week_start):
+    """Текст .ics; пары повторяются еженедельно начиная с недели week_start"""
+    lessons = Schedule.objects.filter(**{'group_id' if kind == 'group' else 'teacher_id': value}).with_subject()
+    homework = (
+        Homework.objects.filter(due_date__gte=week_start - HOMEWORK_HISTORY)
+        .select_related('subject')
+        .only('id', 'content', 'due_date', 'group_id', 'subject__name')
+        .order_by('due_date', 'id')
+    )
+    if kind == 'group':
+        homework = homework.filter(group_id=value)
+        title = Group.objects.filter(pk=value).values_list('name', flat=True).first() or ''
+    else:
+        homework = homework.filter(schedule__teacher_id=value)
+        title = value
+    lessons, homework = list(lessons), list(homework)
+    group_names = {}
+    if kind == 'teacher':
+        group_ids = {lesson.group_id for lesson in lessons} | {item.group_id for item in homework}
+        group_names = dict(Group.objects.filter(pk__in=group_ids).values_list('id', 'name'))
+
+    stamp = datetime.now(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    lines = [
+        'BEGIN:VCALENDAR', 'VERSION:2.0', f'PRODID:{PRODID}', 'CALSCALE:GREGORIAN', 'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_escape(f"Расписание {title}")}',
+        'REFRESH-INTERVAL;VALUE=DURATION:PT15M', 'X-PUBLISHED-TTL:PT15M',
+    ]
+    for lesson in lessons:
+        if not lesson.start_time or not lesson.end_time:
+            continue
+        day = week_start + timedelta(days=lesson.day)
+        # Время "плавающее", без часового пояса: пара в 9:00 идёт в 9:00 по местному времени
+        summary = lesson.subject.name
+        if kind == 'teacher':
+            summary = f'{summary}, {group_names.get(lesson.group_id, "")}'
+        lines += _event(
+            f'lesson-{lesson.id}', stamp,
+            f'DTSTART:{datetime.combine(day, lesson.start_time):%Y%m%dT%H%M%S}',
+            f'DTEND:{datetime.combine(day, lesson.end_time):%Y%m%dT%H%M%S}',
+            'RRULE:FREQ=WEEKLY',
+            f'SUMMARY:{_escape(summary)}',
+            f'LOCATION:{_escape(lesson.classroom)}',
+            f'DESCRIPTION:{_escape(lesson.subject.teacher.get_full_name())}',
+        )
+    for item in homework:
+        summary = f'ДЗ: {item.subject.name}' if item.subject else 'ДЗ'
+        if kind == 'teacher':
+            summary = f'{summary}, {group_names.get(item.group_id, "")}'
+        lines += _event(
+            f'homework-{item.id}', stamp,
+            f'DTSTART;VALUE=DATE:{item.due_date:%Y%m%d}',
+            f'DTEND;VALUE=DATE:{item.due_date + timedelta(days=1):%Y%m%d}',
+            f'SUMMARY:{_escape(summary)}',
+            f'DESCRIPTION:{_escape(item.content)}',
+        )
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(map(_fold, lines)) + '\r\n'
+
+
+def feed_response(request, kind, value):
+    """Ответ с календарём или 304; файл собирается заново только после изменения пар или ДЗ"""
+    scope = resolve_scope(kind, value)
+    if scope is None:
+        raise Http404('Календарь недоступен')
+    today = date.today()
+    week_start = today - timedelta(days=today.weekday())
+    version = feed_version(*scope)
+    etag = f'"{version}-{week_start:%Y%m%d}"'
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        key = f'ical:{scope[0]}:{scope[1]}:{version}:{week_start:%Y%m%d}'
+        body = cache.get(key)
+        if body is None:
+            body = render_feed(*scope, week_start)
+            cache.set(key, body, TIMETABLE_TIMEOUT)
+        response = HttpResponse(body, content_type='text/calendar; charset=utf-8')
+        response['Content-Disposition'] = 'inline; filename="schedule.ics"'
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, max_age=FEED_MAX_AGE)
+    return response
@@ -0,0 +1,321 @@
+"""Импорт расписания семестра из CSV или XLSX.
+
+Файл разбирается целиком: группы, преподаватели, предметы и уже
+существующие пары загружаются в словари несколькими запросами, ошибки
+собираются по всем строкам сразу, а не по одной за запуск. Запись идёт
+через bulk_create/bulk_update в одной транзакции - загружается либо весь
+файл, либо ничего. Накладки ищет conflicts.py по расписанию, каким оно
+станет после импорта, включая пары групп, которых нет в файле.
+
+Пара определяется слотом (группа, день, номер пары): строка файла
+обновляет пару в этом слоте или создаёт новую. С replace=True пары
+упомянутых в файле групп, которых нет в файле, удаляются.
+"""
+import csv
+import io
+import zipfile
+from collections import namedtuple
+from datetime import time
+from xml.etree import ElementTree
+
+from django.db import transaction
+
+from main.models import CustomUser, Group
+from .cache import invalidate_lesson
+from .conflicts import LessonSlot, describe, find_conflicts, lesson_slots, teacher_labels
+from .models import Schedule, Subject
+
+BATCH_SIZE = 500
+
+# Поле -> допустимые заголовки столбца (без учёта регистра)
+COLUMNS = {
+    'group': ('группа', 'group'),
+    'day': ('день', 'день недели', 'day'),
+    'lesson_number': ('пара', 'номер пары', 'lesson_number', 'lesson'),
+    'start_time': ('начало', 'start_time', 'start'),
+    'end_time': ('конец', 'окончание', 'end_time', 'end'),
+    'subject': ('предмет', 'subject'),
+    'teacher_id': ('преподаватель', 'id преподавателя', 'teacher_id', 'teacher'),
+    'classroom': ('аудитория', 'classroom', 'room'),
+}
+REQUIRED_COLUMNS = ('group', 'day', 'lesson_number', 'subject', 'teacher_id', 'classroom')
+UPDATE_FIELDS = ['faculty', 'teacher_id', 'start_time', 'end_time', 'subject', 'classroom']
+
+DAY_NAMES = {label.lower(): day for day, label in Schedule.DAYS}
+DAY_NAMES.update(zip(('пн', 'вт', 'ср', 'чт', 'пт', 'сб'), range(6)))
+
+SHEET_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+
+ImportResult = namedtuple('ImportResult', 'created updated unchanged deleted subjects_created')
+
+
+class TimetableImportError(Exception):
+    """Файл не загружен; в errors - все найденные ошибки с номерами строк"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(f'Ошибок в файле расписания: {len(errors)}')
+
+
+def _csv_rows(data):
+    try:
+        text = data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        text = data.decode('cp1251')
+    # Excel с русской локалью сохраняет CSV через точку с запятой
+    first_line = text.split('\n', 1)[0]
+    delimiter = max(',;\t', key=first_line.count)
+    return list(enumerate(csv.reader(io.StringIO(text), delimiter=delimiter), start=1))
+
+
+def _column_index(reference):
+    """'AB12' -> 27"""
+    index = 0
+    for char in reference:
+        if not char.isalpha():
+            break
+        index = index * 26 + ord(char.upper()) - ord('A') + 1
+    return index - 1
+
+
+def _xlsx_rows(data):
+    """Строки первого листа книги через zipfile и ElementTree, без сторонних библиотек"""
+    try:
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            shared = []
+            if 'xl/sharedStrings.xml' in archive.namelist():
+                root = ElementTree.fromstring(archive.read('xl/sharedStrings.xml'))
+                shared = [''.join(node.text or '' for node in item.iter(f'{SHEET_NS}t'))
+                          for item in root.iter(f'{SHEET_NS}si')]
+            sheet = ElementTree.fromstring(archive.read('xl/worksheets/sheet1.xml'))
+    except (zipfile.BadZipFile, KeyError, ElementTree.ParseError) as exc:
+        raise TimetableImportError([f'Не удалось прочитать XLSX: {exc}']) from exc
+
+    rows = []
+    for number, row in enumerate(sheet.iter(f'{SHEET_NS}row'), start=1):
+        values = []
+        for cell in row.iter(f'{SHEET_NS}c'):
+            reference = cell.get('r')
+            index = _column_index(reference) if reference else len(values)
+            if cell.get('t') == 'inlineStr':
+                value = ''.join(node.text or '' for node in cell.iter(f'{SHEET_NS}t'))
+            else:
+                node = cell.find(f'{SHEET_NS}v')
+                value = node.text or '' if node is not None else ''
+                if cell.get('t') == 's' and value:
+                    value = shared[int(value)]
+            values.extend([''] * (index - len(values)))
+            values[index:index + 1] = [value]
+        rows.append((int(row.get('r', number)), values))
+    return rows
+
+
+def read_table(data, filename):
+    """Строки файла как (номер строки, [значения]); первая строка - заголовок"""
+    if filename.lower().endswith('.xlsx'):
+        return _xlsx_rows(data)
+    return _csv_rows(data)
+
+
+def _parse_int(value, what):
+    try:
+        number = float(value)
+        # inf и 1e400 дают OverflowError, nan - ValueError
+        integer = int(number)
+    except (ValueError, OverflowError):
+        raise ValueError(f'{what}: ожидается число, а не {value!r}') from None
+    if number != integer:
+        raise ValueError(f'{what}: ожидается целое число, а не {value!r}')
+    return integer
+
+
+def _parse_day(value):
+    day = DAY_NAMES.get(value.lower())
+    if day is None and value.isdigit():
+        day = int(value)
+    if day not in dict(Schedule.DAYS):
+        raise ValueError(f'неизвестный день недели {value!r}')
+    return day
+
+
+def _parse_time(value, what):
+    if not value:
+        return None
+    try:
+        if ':' in value:
+            hours, minutes = value.split(':')[:2]
+            return time(int(hours), int(minutes))
+        # Excel хранит время как долю суток
+        fraction = float(value)
+        if not 0 <= fraction < 1:
+            raise ValueError
+        minutes = round(fraction * 24 * 60)
+        return time(minutes // 60, minutes % 60)
+    except ValueError:
+        raise ValueError(f'{what}: не удалось разобрать время {value!r}') from None
+
+
+def parse_rows(rows):
+    """Строки таблицы -> (словари полей, ошибки); ошибки копятся, а не прерывают разбор"""
+    if not rows:
+        raise TimetableImportError(['Файл пуст'])
+    (_, header), body = rows[0], rows[1:]
+    aliases = {alias: field for field, names in COLUMNS.items() for alias in names}
+    positions = {}
+    for index, title in enumerate(header):
+        field = aliases.get(title.strip().lower())
+        if field and field not in positions:
+            positions[field] = index
+    missing = [COLUMNS[field][0] for field in REQUIRED_COLUMNS if field not in positions]
+    if missing:
+        raise TimetableImportError([f'Нет столбцов: {", ".join(missing)}'])
+
+    parsed, errors = [], []
+    for line, values in body:
+        raw = {field: values[index].strip() if index < len(values) else '' for field, index in positions.items()}
+        if not any(raw.values()):
+            continue
+        empty = [COLUMNS[field][0] for field in REQUIRED_COLUMNS if not raw[field]]
+        if empty:
+            errors.append(f'Строка {line}: не заполнено: {", ".join(empty)}')
+            continue
+        try:
+            parsed.append({
+                'line': line,
+                'group': raw['group'],
+                'day': _parse_day(raw['day']),
+                'lesson_number': _parse_int(raw['lesson_number'], 'номер пары'),
+                'start_time': _parse_time(raw.get('start_time', ''), 'начало'),
+                'end_time': _parse_time(raw.get('end_time', ''), 'конец'),
+                'subject': raw['subject'],
+                'teacher_id': raw['teacher_id'],
+                'classroom': raw['classroom'],
+            })
+        except ValueError as exc:
+            errors.append(f'Строка {line}: {exc}')
+    return parsed, errors
+
+
+def _conflicts(rows, groups, existing, replace):
+    """Накладки расписания, каким оно станет после импорта, с участием строк файла"""
+    incoming = [
+        LessonSlot(f'строка {row["line"]}', groups[row['group']][0].pk, row['day'], row['lesson_number'],
+                   row['teacher_id'], row['classroom'])
+        for row in rows
+    ]
+    # Пары групп из файла остаются, только если их слот не перезаписывается и они не удаляются
+    replaced = {(lesson.group_id, lesson.day, lesson.lesson_number) for lesson in incoming}
+    kept = [] if replace else [
+        LessonSlot(lesson.pk, lesson.group_id, lesson.day, lesson.lesson_number, lesson.teacher_id, lesson.classroom)
+        for slot, lesson in existing.items() if slot not in replaced
+    ]
+    others = lesson_slots(Schedule.objects.exclude(group_id__in={lesson.group_id for lesson in incoming}))
+
+    conflicts = [
+        conflict for conflict in find_conflicts(incoming + kept + others)
+        if any(isinstance(lesson.ref, str) for lesson in conflict.lessons)
+    ]
+    group_names = {matches[0].pk: name for name, matches in groups.items() if len(matches) == 1}
+    teacher_names = teacher_labels(conflicts)
+    return [
+        describe(
+            conflict,
+            ref_label=_ref_label,
+            group_label=lambda pk: group_names.get(pk, pk),
+            teacher_label=lambda teacher_id: teacher_names.get(teacher_id, teacher_id),
+        )
+        for conflict in conflicts
+    ]
+
+
+def _ref_label(ref):
+    return ref if isinstance(ref, str) else f'пара #{ref} в базе'
+
+
+def import_timetable(rows, replace=False, dry_run=False):
+    """Проверяет и записывает строки read_table; при любой ошибке - TimetableImportError"""
+    parsed, errors = parse_rows(rows)
+
+    groups = {}
+    for group in Group.objects.filter(name__in={row['group'] for row in parsed}):
+        groups.setdefault(group.name, []).append(group)
+    teachers = {
+        teacher.student_id: teacher
+        for teacher in CustomUser.objects.filter(
+            student_id__in={row['teacher_id'] for row in parsed}, role='teacher',
+        ).only('id', 'student_id')
+    }
+    subjects = {}
+    for subject in Subject.objects.filter(name__in={row['subject'] for row in parsed}).order_by('-id'):
+        subjects[(subject.name, subject.teacher_id)] = subject
+
+    resolved = []
+    for row in parsed:
+        matches = groups.get(row['group'], [])
+        if len(matches) != 1:
+            problem = 'неизвестная группа' if not matches else 'несколько групп с названием'
+            errors.append(f'Строка {row["line"]}: {problem} {row["group"]!r}')
+        elif row['teacher_id'] not in teachers:
+            errors.append(f'Строка {row["line"]}: нет преподавателя с ID {row["teacher_id"]!r}')
+        else:
+            resolved.append(row)
+
+    group_ids = {matches[0].pk for matches in groups.values() if len(matches) == 1}
+    existing = {
+        (lesson.group_id, lesson.day, lesson.lesson_number): lesson
+        for lesson in Schedule.objects.filter(group_id__in=group_ids)
+    }
+    errors += _conflicts(resolved, groups, existing, replace)
+    if errors:
+        raise TimetableImportError(errors)
+
+    new_subjects, to_create, to_update, touched = [], [], [], set()
+    unchanged = 0
+    for row in resolved:
+        group = groups[row['group']][0]
+        teacher = teachers[row['teacher_id']]
+        subject = subjects.get((row['subject'], teacher.pk))
+        if subject is None:
+            subject = subjects[(row['subject'], teacher.pk)] = Subject(name=row['subject'], teacher=teacher)
+            new_subjects.append(subject)
+        values = {
+            'faculty': group.faculty,
+            'teacher_id': row['teacher_id'],
+            'start_time': row['start_time'],
+            'end_time': row['end_time'],
+            'subject': subject,
+            'classroom': row['classroom'],
+        }
+        lesson = existing.pop((group.pk, row['day'], row['lesson_number']), None)
+        if lesson is None:
+            to_create.append(Schedule(group=group, day=row['day'], lesson_number=row['lesson_number'], **values))
+        elif subject.pk != lesson.subject_id or any(
+            getattr(lesson, field) != value for field, value in values.items() if field != 'subject'
+        ):
+            touched.add((lesson.group_id, lesson.day, lesson.teacher_id))
+            for field, value in values.items():
+                setattr(lesson, field, value)
+            to_update.append(lesson)
+        else:
+            unchanged += 1
+    to_delete = list(existing.values()) if replace else []
+    result = ImportResult(len(to_create), len(to_update), unchanged, len(to_delete), len(new_subjects))
+    if dry_run:
+        return result
+
+    touched.update((lesson.group_id, lesson.day, lesson.teacher_id) for lesson in to_create + to_update)
+    touched.update((lesson.group_id, lesson.day, lesson.teacher_id) for lesson in to_delete)
+    with transaction.atomic():
+        Subject.objects.bulk_create(new_subjects, batch_size=BATCH_SIZE)
+        Schedule.objects.bulk_create(to_create, batch_size=BATCH_SIZE)
+        Schedule.objects.bulk_update(to_update, UPDATE_FIELDS, batch_size=BATCH_SIZE)
+        if to_delete:
+            Schedule.objects.filter(pk__in=[lesson.pk for lesson in to_delete]).delete()
+        # bulk-операции не посылают сигналов - кэш дней сбрасываем сами
+        transaction.on_commit(lambda: _invalidate(touched))
+    return result
+
+
+def _invalidate(keys):
+    for group_id, day, teacher_id in keys:
+        invalidate_lesson(group_id, day, teacher_id)
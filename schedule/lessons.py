@@ -0,0 +1,30 @@
+"""Пара расписания из строки values() - один формат для кэша дня, недели и JSON.
+
+Пары читаются через values(*LESSON_VALUES) без создания моделей, а время
+пары и имя преподавателя собираются здесь, чтобы страница дня, неделя,
+старый JSON и API показывали их одинаково.
+"""
+from .models import format_lesson_time
+
+LESSON_VALUES = (
+    'id', 'group_id', 'day', 'lesson_number', 'start_time', 'end_time', 'classroom',
+    'subject__name', 'subject__teacher__first_name', 'subject__teacher__last_name',
+)
+
+
+def full_name(first_name, last_name):
+    # Как AbstractUser.get_full_name, но по полям из values()
+    return f'{first_name} {last_name}'.strip()
+
+
+def lesson_row(row):
+    """Словарь пары из строки values(*LESSON_VALUES); ключи те же у кэша дня и недели"""
+    return {
+        'id': row['id'],
+        'group_id': row['group_id'],
+        'lesson_number': row['lesson_number'],
+        'time': format_lesson_time(row['start_time'], row['end_time']),
+        'classroom': row['classroom'],
+        'subject_name': row['subject__name'],
+        'teacher_name': full_name(row['subject__teacher__first_name'], row['subject__teacher__last_name']),
+    }
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from schedule.generator import default_workers
+from schedule.solver import DEFAULT_ITERATIONS, solve, synthetic_problem
+
+# Синтетические факультеты: название -> число групп
+SIZES = {
+    'small': 20,
+    'medium': 120,
+    'large': 400,
+}
+
+
+class Command(BaseCommand):
+    help = 'Замеряет генератор расписания на синтетических факультетах, база не нужна'
+
+    def add_arguments(self, parser):
+        # Без choices: argparse сверяет с ними и значение по умолчанию, и пустой список, см. handle
+        parser.add_argument('sizes', nargs='*', help=f'Размеры факультетов: {", ".join(SIZES)}; по умолчанию все')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--restarts', type=int, default=4)
+        parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS)
+        parser.add_argument('--workers', type=int)
+
+    def handle(self, *args, sizes, seed, restarts, iterations, workers, **options):
+        sizes = sizes or list(SIZES)
+        unknown = [size for size in sizes if size not in SIZES]
+        if unknown:
+            raise CommandError(f'Неизвестные размеры: {", ".join(unknown)}; доступны: {", ".join(SIZES)}')
+        workers = default_workers() if workers is None else workers
+        self.stdout.write(f'{"факультет":<10} {"групп":>6} {"пар":>6} {"аудит.":>6} {"штраф":>7} {"не пост.":>8} {"сек":>7}')
+        for size in sizes:
+            problem = synthetic_problem(SIZES[size], seed=seed)
+            started = time.monotonic()
+            solution = solve(problem, seed=seed, restarts=restarts, iterations=iterations, workers=workers)
+            seconds = time.monotonic() - started
+            self.stdout.write(
+                f'{size:<10} {SIZES[size]:>6} {len(problem.events):>6} {len(problem.rooms):>6} '
+                f'{solution.cost:>7} {solution.unplaced:>8} {seconds:>7.2f}'
+            )
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from main.models import Group
+from schedule.conflicts import describe, teacher_labels, timetable_conflicts
+
+
+class Command(BaseCommand):
+    help = 'Ищет накладки в расписании: группа, преподаватель или аудитория в двух местах в одно время'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--faculty', help='Проверить только один факультет')
+
+    def handle(self, *args, faculty=None, **options):
+        conflicts = timetable_conflicts(faculty)
+        if not conflicts:
+            self.stdout.write(self.style.SUCCESS('Накладок нет'))
+            return
+
+        group_names = dict(Group.objects.values_list('id', 'name'))
+        teacher_names = teacher_labels(conflicts)
+        for conflict in conflicts:
+            self.stdout.write(describe(
+                conflict,
+                ref_label=lambda ref: f'#{ref}',
+                group_label=lambda group_id: group_names.get(group_id, group_id),
+                teacher_label=lambda teacher_id: teacher_names.get(teacher_id, teacher_id),
+            ))
+        raise CommandError(f'Накладок: {len(conflicts)}')
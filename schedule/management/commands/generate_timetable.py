@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from schedule.generator import TimetableGenerationError, default_workers, generate_timetable
+from schedule.solver import DEFAULT_ITERATIONS
+
+
+class Command(BaseCommand):
+    help = 'Составляет расписание факультета по учебной нагрузке и аудиториям и заменяет текущее'
+
+    def add_arguments(self, parser):
+        parser.add_argument('faculty')
+        parser.add_argument('--seed', type=int, default=0, help='С одним seed результат одинаковый')
+        parser.add_argument('--restarts', type=int, default=4, help='Независимых перезапусков решателя')
+        parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS,
+                            help='Шагов локального поиска на перезапуск')
+        parser.add_argument('--workers', type=int, help='Процессов (по умолчанию TIMETABLE_SOLVER_WORKERS)')
+        parser.add_argument('--dry-run', action='store_true', help='Только посчитать, ничего не записывать')
+
+    def handle(self, *args, faculty, seed, restarts, iterations, workers, dry_run, **options):
+        workers = default_workers() if workers is None else workers
+        try:
+            result = generate_timetable(
+                faculty, seed=seed, restarts=restarts, iterations=iterations, workers=workers, dry_run=dry_run,
+            )
+        except TimetableGenerationError as exc:
+            raise CommandError(str(exc)) from exc
+
+        self.stdout.write(
+            f'Пар: {result.lessons}, штраф: {result.cost}, {result.seconds:.1f} с '
+            f'({restarts} перезапусков, процессов: {workers})'
+        )
+        if result.unplaced:
+            self.stdout.write(self.style.WARNING(f'Не удалось поставить пар: {result.unplaced}'))
+        if result.written:
+            self.stdout.write(self.style.SUCCESS('Расписание записано'))
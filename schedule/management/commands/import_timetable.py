@@ -0,0 +1,34 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from schedule.importer import TimetableImportError, import_timetable, read_table
+
+
+class Command(BaseCommand):
+    help = 'Загружает расписание из CSV или XLSX (столбцы: группа, день, пара, начало, конец, предмет, преподаватель, аудитория)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл .csv или .xlsx')
+        parser.add_argument('--replace', action='store_true',
+                            help='Удалить пары упомянутых в файле групп, которых нет в файле')
+        parser.add_argument('--dry-run', action='store_true', help='Только проверить файл, ничего не записывая')
+
+    def handle(self, *args, path, replace, dry_run, **options):
+        try:
+            with open(path, 'rb') as file:
+                rows = read_table(file.read(), os.path.basename(path))
+            result = import_timetable(rows, replace=replace, dry_run=dry_run)
+        except OSError as exc:
+            raise CommandError(exc)
+        except TimetableImportError as exc:
+            for error in exc.errors:
+                self.stderr.write(error)
+            raise CommandError(str(exc))
+
+        prefix = 'Проверка: ' if dry_run else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix}создано пар: {result.created}, обновлено: {result.updated}, '
+            f'без изменений: {result.unchanged}, удалено: {result.deleted}, '
+            f'новых предметов: {result.subjects_created}'
+        ))
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0004_news_news_published_feed_idx'),
+        ('schedule', '0011_alter_schedule_day'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='homework',
+            index=models.Index(fields=['group', 'due_date'], name='homework_group_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['teacher_id', 'day', 'lesson_number'], name='schedule_teacher_day_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='schedule',
+            constraint=models.UniqueConstraint(fields=('group', 'day', 'lesson_number'), name='schedule_unique_group_lesson'),
+        ),
+    ]
@@ -0,0 +1,81 @@
+from datetime import datetime
+
+from django.db import migrations, models
+
+DAY_NAMES = ['Понедельник', 'Вторник', 'Среда', 'Четверг', 'Пятница', 'Суббота']
+# Значения из самой первой версии модели
+OLD_DAY_NAMES = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday']
+
+
+def parse_time(value):
+    try:
+        start, end = value.replace('—', '-').replace('–', '-').split('-')
+        return (
+            datetime.strptime(start.strip(), '%H:%M').time(),
+            datetime.strptime(end.strip(), '%H:%M').time(),
+        )
+    except ValueError:
+        return None, None
+
+
+def forwards(apps, schema_editor):
+    Schedule = apps.get_model('schedule', 'Schedule')
+    for lesson in Schedule.objects.all():
+        if lesson.day in DAY_NAMES:
+            weekday = DAY_NAMES.index(lesson.day)
+        elif lesson.day in OLD_DAY_NAMES:
+            weekday = OLD_DAY_NAMES.index(lesson.day)
+        else:
+            raise ValueError(f'Неизвестный день недели у пары {lesson.pk}: {lesson.day!r}')
+        lesson.day = str(weekday)
+        lesson.start_time, lesson.end_time = parse_time(lesson.time)
+        lesson.save(update_fields=['day', 'start_time', 'end_time'])
+
+
+def backwards(apps, schema_editor):
+    Schedule = apps.get_model('schedule', 'Schedule')
+    for lesson in Schedule.objects.all():
+        lesson.day = DAY_NAMES[int(lesson.day)]
+        if lesson.start_time and lesson.end_time:
+            lesson.time = (
+                f'{lesson.start_time.hour}:{lesson.start_time.minute:02d}-'
+                f'{lesson.end_time.hour}:{lesson.end_time.minute:02d}'
+            )
+        lesson.save(update_fields=['day', 'time'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule', '0012_homework_homework_group_due_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedule',
+            name='start_time',
+            field=models.TimeField(null=True, verbose_name='Начало'),
+        ),
+        migrations.AddField(
+            model_name='schedule',
+            name='end_time',
+            field=models.TimeField(null=True, verbose_name='Конец'),
+        ),
+        # Пока day ещё строка, записываем в неё номер дня, а затем меняем тип колонки
+        migrations.RunPython(forwards, backwards),
+        migrations.AlterField(
+            model_name='schedule',
+            name='day',
+            field=models.SmallIntegerField(choices=[(0, 'Понедельник'), (1, 'Вторник'), (2, 'Среда'), (3, 'Четверг'), (4, 'Пятница'), (5, 'Суббота')], verbose_name='День недели'),
+        ),
+        # default нужен только для отката: колонка time пересоздаётся до заполнения
+        migrations.AlterField(
+            model_name='schedule',
+            name='time',
+            field=models.CharField(default='', max_length=20, verbose_name='Время'),
+        ),
+        migrations.RemoveField(
+            model_name='schedule',
+            name='time',
+        ),
+    ]
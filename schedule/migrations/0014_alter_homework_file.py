@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:15
+
+import main.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule', '0013_schedule_day_weekday_start_end_time'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='homework',
+            name='file',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=main.storage.ContentAddressedStorage(), upload_to='homework/%Y/%m/%d/', verbose_name='Файл задания'),
+        ),
+    ]
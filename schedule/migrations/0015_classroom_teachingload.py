@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0006_news_feed_cursor_index'),
+        ('schedule', '0014_alter_homework_file'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Classroom',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Аудитория')),
+                ('capacity', models.PositiveIntegerField(verbose_name='Мест')),
+                ('faculty', models.CharField(blank=True, help_text='Пусто - аудитория доступна всем факультетам', max_length=100, verbose_name='Факультет')),
+            ],
+            options={
+                'verbose_name': 'Аудитория',
+                'verbose_name_plural': 'Аудитории',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TeachingLoad',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lessons_per_week', models.PositiveSmallIntegerField(default=1, verbose_name='Пар в неделю')),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='main.group', verbose_name='Группа')),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='schedule.subject', verbose_name='Предмет')),
+            ],
+            options={
+                'verbose_name': 'Учебная нагрузка',
+                'verbose_name_plural': 'Учебная нагрузка',
+                'constraints': [models.UniqueConstraint(fields=('group', 'subject'), name='teaching_load_unique_group_subject')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0006_news_feed_cursor_index'),
+        ('schedule', '0015_classroom_teachingload'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['day', 'start_time'], name='schedule_day_start_idx'),
+        ),
+    ]
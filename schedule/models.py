@@ -1,5 +1,6 @@
 from django.db import models
 from main.models import Group, CustomUser
+from main.storage import blob_storage
 from datetime import date
 
 
@@ -11,11 +12,20 @@ class Subject(models.Model):
         return self.name
 
 
+class HomeworkQuerySet(models.QuerySet):
+    def for_group_date(self, group, due_date):
+        """ДЗ группы со сроком сдачи на дату"""
+        return self.filter(group=group, due_date=due_date).only(
+            'id', 'schedule_id', 'content', 'file', 'assigned_date', 'due_date', 'group_id',
+        )
+
+
 class Homework(models.Model):
     """Отдельная модель для домашних заданий, привязанных к датам"""
     schedule = models.ForeignKey('Schedule', on_delete=models.CASCADE, related_name='homework_assignments')
     content = models.TextField(verbose_name='Текст задания')
-    file = models.FileField(upload_to='homework/%Y/%m/%d/', blank=True, null=True, verbose_name='Файл задания')
+    file = models.FileField(upload_to='homework/%Y/%m/%d/', storage=blob_storage, max_length=255,
+                            blank=True, null=True, verbose_name='Файл задания')
     assigned_date = models.DateField(default=date.today, verbose_name='Дата задания')
     due_date = models.DateField(blank=True, null=True, verbose_name='Срок сдачи')
     created_by = models.ForeignKey(CustomUser, on_delete=models.CASCADE, verbose_name='Кем задано')
@@ -23,28 +33,64 @@ class Homework(models.Model):
     group = models.ForeignKey(Group, null=True, on_delete=models.CASCADE, verbose_name='Группа')
     subject = models.ForeignKey(Subject, null=True, on_delete=models.CASCADE, verbose_name='Предмет')
 
+    objects = HomeworkQuerySet.as_manager()
+
     class Meta:
         ordering = ['-assigned_date']
         verbose_name = 'Домашнее задание'
         verbose_name_plural = 'Домашние задания'
+        indexes = [
+            models.Index(fields=['group', 'due_date'], name='homework_group_due_idx'),
+        ]
 
     def __str__(self):
         return f"ДЗ для {self.schedule} от {self.assigned_date}"
 
 
+def format_lesson_time(start_time, end_time):
+    if not start_time or not end_time:
+        return ''
+    return f"{start_time.hour}:{start_time.minute:02d}-{end_time.hour}:{end_time.minute:02d}"
+
+
+class ScheduleQuerySet(models.QuerySet):
+    def with_subject(self):
+        """Подтягивает предмет и преподавателя одним JOIN вместо запроса на каждую пару"""
+        return self.select_related('subject__teacher').only(
+            'id', 'group_id', 'day', 'lesson_number', 'teacher_id', 'start_time', 'end_time',
+            'classroom', 'faculty',
+            'subject__name', 'subject__teacher__first_name', 'subject__teacher__last_name',
+        )
+
+    def for_group_day(self, group, day):
+        return self.filter(group=group, day=day).with_subject().order_by('lesson_number')
+
+    def for_teacher_day(self, teacher_id, day):
+        return self.filter(teacher_id=teacher_id, day=day).with_subject().order_by('lesson_number')
+
+    def in_progress(self, moment):
+        """Пары, которые идут в момент moment (datetime в локальном времени)"""
+        return self.filter(
+            day=moment.weekday(),
+            start_time__lte=moment.time(),
+            end_time__gt=moment.time(),
+        )
+
+
 class Schedule(models.Model):
+    # Номер дня совпадает с date.weekday()
     DAYS = [
-    ('Понедельник', 'Понедельник'),
-    ('Вторник', 'Вторник'),
-    ('Среда', 'Среда'),
-    ('Четверг', 'Четверг'),
-    ('Пятница', 'Пятница'),
-    ('Суббота', 'Суббота'),
-]
+        (0, 'Понедельник'),
+        (1, 'Вторник'),
+        (2, 'Среда'),
+        (3, 'Четверг'),
+        (4, 'Пятница'),
+        (5, 'Суббота'),
+    ]
 
     faculty = models.CharField(max_length=100, null=True, verbose_name='Факультет')
     group = models.ForeignKey(Group, on_delete=models.CASCADE, verbose_name='Группа')
-    day = models.CharField(max_length=15, choices=DAYS, verbose_name='День недели')
+    day = models.SmallIntegerField(choices=DAYS, verbose_name='День недели')
     lesson_number = models.IntegerField(verbose_name='Номер пары')
     teacher_id = models.CharField(
         max_length=50,
@@ -52,18 +98,67 @@ class Schedule(models.Model):
         unique=False,
         verbose_name='ID Преподавателя'
     )
-    time = models.CharField(max_length=20, verbose_name='Время')
+    start_time = models.TimeField(null=True, verbose_name='Начало')
+    end_time = models.TimeField(null=True, verbose_name='Конец')
     subject = models.ForeignKey(Subject, on_delete=models.CASCADE, verbose_name='Предмет')
     classroom = models.CharField(max_length=50, verbose_name='Аудитория')
 
+    objects = ScheduleQuerySet.as_manager()
+
     class Meta:
         ordering = ['day', 'lesson_number']
         verbose_name = 'Расписание'
         verbose_name_plural = 'Расписание'
+        indexes = [
+            models.Index(fields=['teacher_id', 'day', 'lesson_number'], name='schedule_teacher_day_idx'),
+            # Пары, идущие сейчас (in_progress): равенство по дню и диапазон по началу
+            models.Index(fields=['day', 'start_time'], name='schedule_day_start_idx'),
+        ]
+        constraints = [
+            # Индекс этого ограничения обслуживает и выборку пар группы на день
+            models.UniqueConstraint(fields=['group', 'day', 'lesson_number'], name='schedule_unique_group_lesson'),
+        ]
 
     def __str__(self):
         return f"{self.group} - {self.get_day_display()} - {self.lesson_number} пара"
 
+    @property
+    def time(self):
+        """Время пары для отображения, например '9:00-10:30'"""
+        return format_lesson_time(self.start_time, self.end_time)
+
     def get_homework_for_date(self, target_date):
         """Получить ДЗ для конкретной даты"""
-        return self.homework_assignments.filter(assigned_date=target_date).first()
\ No newline at end of file
+        return self.homework_assignments.filter(assigned_date=target_date).first()
+
+class Classroom(models.Model):
+    """Аудитория, которую генератор расписания может занять"""
+    name = models.CharField(max_length=50, unique=True, verbose_name='Аудитория')
+    capacity = models.PositiveIntegerField(verbose_name='Мест')
+    faculty = models.CharField(max_length=100, blank=True, verbose_name='Факультет',
+                               help_text='Пусто - аудитория доступна всем факультетам')
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = 'Аудитория'
+        verbose_name_plural = 'Аудитории'
+
+    def __str__(self):
+        return f"{self.name} ({self.capacity} мест)"
+
+
+class TeachingLoad(models.Model):
+    """Сколько пар предмета в неделю у группы - исходные данные генератора расписания"""
+    group = models.ForeignKey(Group, on_delete=models.CASCADE, verbose_name='Группа')
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, verbose_name='Предмет')
+    lessons_per_week = models.PositiveSmallIntegerField(default=1, verbose_name='Пар в неделю')
+
+    class Meta:
+        verbose_name = 'Учебная нагрузка'
+        verbose_name_plural = 'Учебная нагрузка'
+        constraints = [
+            models.UniqueConstraint(fields=['group', 'subject'], name='teaching_load_unique_group_subject'),
+        ]
+
+    def __str__(self):
+        return f"{self.group} - {self.subject}: {self.lessons_per_week} в неделю"
@@ -0,0 +1,73 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from main.events import group_channel, publish, teacher_channel
+from main.models import CustomUser
+from main.storage import track_blob_references
+from taskqueue.queue import track_uploads
+from .cache import invalidate_lesson, invalidate_lessons, invalidate_homework
+from .models import Schedule, Subject, Homework
+
+
+track_blob_references(Homework)
+track_uploads(Homework)
+
+
+@receiver(pre_save, sender=Schedule)
+def invalidate_previous_lesson(sender, instance, **kwargs):
+    """При переносе пары сбрасываем и старый день/группу/преподавателя"""
+    if instance.pk:
+        invalidate_lessons(Schedule.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Schedule)
+@receiver(post_delete, sender=Schedule)
+def invalidate_schedule(sender, instance, **kwargs):
+    invalidate_lesson(instance.group_id, instance.day, instance.teacher_id)
+
+
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+def invalidate_subject(sender, instance, **kwargs):
+    # Название предмета и преподаватель хранятся в кэше уже готовыми строками
+    invalidate_lessons(Schedule.objects.filter(subject=instance))
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_teacher(sender, instance, update_fields=None, **kwargs):
+    # При каждом входе сохраняется last_login - на расписание это не влияет
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    invalidate_lessons(Schedule.objects.filter(subject__teacher=instance))
+
+
+@receiver(pre_save, sender=Homework)
+def invalidate_previous_homework(sender, instance, **kwargs):
+    if instance.pk:
+        previous = Homework.objects.filter(pk=instance.pk).values_list('group_id', 'due_date', 'schedule__teacher_id')
+        for group_id, due_date, teacher_id in previous:
+            invalidate_homework(group_id, due_date, teacher_id)
+
+
+@receiver(post_save, sender=Homework)
+@receiver(post_delete, sender=Homework)
+def invalidate_homework_day(sender, instance, signal, created=False, **kwargs):
+    teacher_id = None
+    # Срок сдачи есть и в календаре преподавателя пары, о новом ДЗ сообщаем и ему. Удаление
+    # ДЗ без срока уходит только группе - каскадное удаление пар не стоит запроса на каждое ДЗ
+    if instance.due_date or created:
+        teacher_id = Schedule.objects.filter(pk=instance.schedule_id).values_list('teacher_id', flat=True).first()
+    invalidate_homework(instance.group_id, instance.due_date, teacher_id)
+    if created or signal is post_delete:
+        channels = [group_channel(instance.group_id)] if instance.group_id else []
+        if teacher_id:
+            channels.append(teacher_channel(teacher_id))
+        publish(channels, {
+            'type': 'homework',
+            'action': 'deleted' if signal is post_delete else 'added',
+            'id': instance.pk,
+            'group_id': instance.group_id,
+            'schedule_id': instance.schedule_id,
+            'due_date': instance.due_date,
+        })
@@ -0,0 +1,16 @@
+import logging
+
+from taskqueue.queue import task
+from .generator import generate_timetable
+
+logger = logging.getLogger(__name__)
+
+
+@task(max_attempts=1, concurrency=1)
+def generate_faculty_timetable(faculty, seed=0, restarts=4):
+    """Генерация расписания из админки: решатель занимает процессы, поэтому одна задача за раз"""
+    result = generate_timetable(faculty, seed=seed, restarts=restarts)
+    logger.info(
+        'Расписание факультета %s: пар %d, не поставлено %d, штраф %d, %.1f с',
+        faculty, result.lessons, result.unplaced, result.cost, result.seconds,
+    )
@@ -1,3 +1,645 @@
+import io
+import itertools
+import zipfile
+from datetime import date, datetime, time, timedelta
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from main.models import CustomUser, Group
+from main.testing import QueryBudgetMixin, QueryPlanMixin
+from taskqueue.models import Task
+from . import solver
+from .cache import get_group_day
+from .conflicts import LessonSlot, find_conflicts, lesson_conflicts, timetable_conflicts
+from .generator import TimetableGenerationError, generate_timetable
+from .ical import feed_token
+from .importer import TimetableImportError, import_timetable, read_table
+from .models import Classroom, Schedule, Subject, Homework, TeachingLoad
+from .week import week_timetable
+
+
+class TimetableCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.group = Group.objects.create(name='ВМК-101', faculty='ВМК', course=1)
+        self.teacher = CustomUser.objects.create_user(
+            username='teacher1', password='pass', student_id='t0001',
+            first_name='Сергей', last_name='Преподавателев',
+            faculty='ВМК', course=0, role='teacher',
+        )
+        self.student = CustomUser.objects.create_user(
+            username='student1', password='pass', student_id='s0001',
+            faculty='ВМК', course=1, role='student', group=self.group,
+        )
+        self.subject = Subject.objects.create(name='Программирование', teacher=self.teacher)
+        self.lesson = Schedule.objects.create(
+            faculty='ВМК', group=self.group, day=0, lesson_number=1,
+            teacher_id=self.teacher.student_id, start_time=time(9, 0), end_time=time(10, 30),
+            subject=self.subject, classroom='505',
+        )
+        # Ближайший понедельник, чтобы пара гарантированно попала в выдачу
+        today = date.today()
+        self.monday = today - timedelta(days=today.weekday())
+        self.url = f"{reverse('schedule')}?date={self.monday.isoformat()}"
+
+    def schedule_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        tables = ('schedule_schedule', 'schedule_homework', 'schedule_subject')
+        return response, [q['sql'] for q in ctx.captured_queries if any(t in q['sql'] for t in tables)]
+
+    def test_day_cache_and_week_share_lesson_format(self):
+        lessons, _ = get_group_day(self.group.pk, self.monday)
+        week_lesson = dict(week_timetable(self.monday, group_id=self.group.pk)[0]['lessons'][0])
+        week_lesson.pop('homework')
+        self.assertEqual(lessons, [week_lesson])
+        self.assertEqual(week_lesson['teacher_name'], 'Сергей Преподавателев')
+        self.assertEqual(week_lesson['time'], '9:00-10:30')
+
+    def test_second_view_uses_no_schedule_queries(self):
+        self.client.force_login(self.student)
+        response, queries = self.schedule_queries()
+        self.assertContains(response, 'Программирование')
+        self.assertContains(response, '9:00-10:30')
+        self.assertTrue(queries)
+
+        response, queries = self.schedule_queries()
+        self.assertContains(response, 'Сергей Преподавателев')
+        self.assertEqual(queries, [])
+
+    def test_teacher_view_is_cached(self):
+        self.client.force_login(self.teacher)
+        self.schedule_queries()
+        response, queries = self.schedule_queries()
+        self.assertContains(response, '505')
+        self.assertEqual(queries, [])
+
+    def test_subject_rename_invalidates_cache(self):
+        self.client.force_login(self.student)
+        self.client.get(self.url)
+        self.subject.name = 'Алгоритмы'
+        self.subject.save()
+        self.assertContains(self.client.get(self.url), 'Алгоритмы')
+
+    def test_teacher_rename_invalidates_cache(self):
+        self.client.force_login(self.student)
+        self.client.get(self.url)
+        self.teacher.first_name = 'Иван'
+        self.teacher.save()
+        self.assertContains(self.client.get(self.url), 'Иван Преподавателев')
+
+    def test_moved_lesson_leaves_old_day(self):
+        self.client.force_login(self.student)
+        self.client.get(self.url)
+        self.lesson.day = 1
+        self.lesson.save()
+        self.assertNotContains(self.client.get(self.url), 'Программирование')
+
+    def test_homework_invalidates_cache(self):
+        self.client.force_login(self.student)
+        self.client.get(self.url)
+        Homework.objects.create(
+            schedule=self.lesson, content='Решить задачи 1-10', due_date=self.monday,
+            created_by=self.teacher, group=self.group, subject=self.subject,
+        )
+        self.assertContains(self.client.get(self.url), 'Решить задачи 1-10')
+
+
+class ScheduleWeekdayTests(TestCase):
+    def setUp(self):
+        self.group = Group.objects.create(name='ВМК-101', faculty='ВМК', course=1)
+        teacher = CustomUser.objects.create(username='teacher1', student_id='t0001', faculty='ВМК', course=0)
+        self.subject = Subject.objects.create(name='Программирование', teacher=teacher)
+
+    def add_lesson(self, day, number, start, end):
+        return Schedule.objects.create(
+            faculty='ВМК', group=self.group, day=day, lesson_number=number,
+            start_time=start, end_time=end, subject=self.subject, classroom='505',
+        )
+
+    def test_ordering_follows_weekdays(self):
+        # По алфавиту 'Вторник' < 'Понедельник', по номеру дня - наоборот
+        self.add_lesson(1, 1, time(9, 0), time(10, 30))
+        self.add_lesson(0, 2, time(10, 45), time(12, 15))
+        self.add_lesson(0, 1, time(9, 0), time(10, 30))
+        self.assertEqual(
+            [(lesson.get_day_display(), lesson.lesson_number) for lesson in Schedule.objects.all()],
+            [('Понедельник', 1), ('Понедельник', 2), ('Вторник', 1)],
+        )
+
+    def test_in_progress(self):
+        lesson = self.add_lesson(2, 2, time(10, 45), time(12, 15))
+        wednesday = datetime(2025, 10, 1, 11, 0)
+        self.assertEqual(list(Schedule.objects.in_progress(wednesday)), [lesson])
+        self.assertFalse(Schedule.objects.in_progress(wednesday.replace(hour=12, minute=15)).exists())
+        self.assertEqual(lesson.time, '10:45-12:15')
+
+
+class ScheduleIndexTests(QueryPlanMixin, TestCase):
+    def test_group_day_uses_index(self):
+        # SQLite хранит индекс уникального ограничения под своим именем (sqlite_autoindex_*)
+        self.assertUsesIndex(Schedule.objects.for_group_day(1, 0))
+
+    def test_teacher_day_uses_index(self):
+        self.assertUsesIndex(Schedule.objects.for_teacher_day('t0001', 0), 'schedule_teacher_day_idx')
+
+    def test_in_progress_uses_index(self):
+        self.assertUsesIndex(Schedule.objects.in_progress(datetime(2025, 9, 3, 11, 0)), 'schedule_day_start_idx')
+
+    def test_group_homework_uses_index(self):
+        self.assertUsesIndex(Homework.objects.for_group_date(1, date.today()), 'homework_group_due_idx')
+
+
+class TimetableImportTests(QueryBudgetMixin, TestCase):
+    HEADER = 'Группа;День;Пара;Начало;Конец;Предмет;Преподаватель;Аудитория\n'
+
+    def setUp(self):
+        cache.clear()
+        self.teacher = CustomUser.objects.create(
+            username='teacher1', student_id='t0001', faculty='ВМК', course=0, role='teacher',
+        )
+        for i in range(2, 21):
+            CustomUser.objects.create(
+                username=f'teacher{i}', student_id=f't{i:04d}', faculty='ВМК', course=0, role='teacher',
+            )
+        self.groups = [Group.objects.create(name=f'ВМК-1{i:02d}', faculty='ВМК', course=1) for i in range(1, 21)]
+
+    def rows(self, text):
+        return read_table((self.HEADER + text).encode('utf-8'), 'timetable.csv')
+
+    def full_timetable(self):
+        # 20 групп по 4 пары: у каждой группы свои аудитория и преподаватель
+        return ''.join(
+            f'{group.name};{day};{number};9:00;10:30;Предмет {number};t{index + 1:04d};{500 + index}\n'
+            for index, group in enumerate(self.groups) for day, number in [('Пн', 1), ('Вт', 2), ('Ср', 3), ('Чт', 4)]
+        )
+
+    def test_import_uses_constant_number_of_queries(self):
+        rows = self.rows(self.full_timetable())
+        # группы, преподаватели, предметы, пары этих групп и остальных, вставка предметов и пар, транзакция
+        with self.assertQueryBudget(10):
+            result = import_timetable(rows)
+        self.assertEqual((result.created, result.subjects_created), (80, 80))
+        lesson = Schedule.objects.get(group=self.groups[1], day=0, lesson_number=1)
+        self.assertEqual((lesson.faculty, lesson.teacher_id, lesson.classroom), ('ВМК', 't0002', '501'))
+        self.assertEqual(lesson.subject.teacher, CustomUser.objects.get(student_id='t0002'))
+        self.assertEqual(lesson.start_time, time(9, 0))
+
+        result = import_timetable(rows)
+        self.assertEqual((result.created, result.updated, result.unchanged), (0, 0, 80))
+
+        # Повторный импорт с изменёнными аудиториями - те же запросы, только UPDATE вместо INSERT
+        moved = self.rows(self.full_timetable().replace(';5', ';6'))
+        with self.assertQueryBudget(10):
+            result = import_timetable(moved)
+        self.assertEqual((result.created, result.updated), (0, 80))
+        self.assertEqual(Schedule.objects.get(group=self.groups[1], day=0, lesson_number=1).classroom, '601')
+
+    def test_update_and_replace(self):
+        import_timetable(self.rows(self.full_timetable()))
+        group = self.groups[0].name
+        result = import_timetable(self.rows(f'{group};Пн;1;9:00;10:30;Алгебра;t0001;101\n'), replace=True)
+        self.assertEqual((result.updated, result.deleted, result.subjects_created), (1, 3, 1))
+        self.assertEqual(list(Schedule.objects.filter(group=self.groups[0]).values_list('classroom', flat=True)), ['101'])
+        self.assertEqual(Schedule.objects.count(), 77)
+
+    def test_errors_are_collected_and_nothing_is_written(self):
+        rows = self.rows(
+            'ВМК-101;Пн;1;9:00;10:30;Алгебра;t0001;101\n'
+            'ВМК-999;Пн;1;9:00;10:30;Алгебра;t0001;101\n'
+            'ВМК-102;Воскресенье;1;9:00;10:30;Алгебра;t0001;101\n'
+            'ВМК-103;Пн;1;9:00;10:30;Алгебра;t0001;202\n'
+            'ВМК-104;Пн;1;9:00;10:30;Физика;t0002;101\n'
+            'ВМК-105;Пн;1;9:00;10:30;Алгебра;t0001;101\n'
+            'ВМК-106;Пн;1;9:00;10:30;Алгебра;t9999;303\n'
+        )
+        with self.assertRaises(TimetableImportError) as raised:
+            import_timetable(rows)
+        errors = '\n'.join(raised.exception.errors)
+        self.assertEqual(len(raised.exception.errors), 5, errors)
+        self.assertIn("Строка 3: неизвестная группа 'ВМК-999'", errors)
+        self.assertIn("Строка 4: неизвестный день недели 'Воскресенье'", errors)
+        self.assertIn('Понедельник, 1 пара: преподаватель t0001 в разных аудиториях: 101 (строка 2), 202 (строка 5)', errors)
+        self.assertIn('Понедельник, 1 пара: в аудитории 101 разные преподаватели: t0001 (строка 2), t0002 (строка 6)', errors)
+        self.assertIn("Строка 8: нет преподавателя с ID 't9999'", errors)
+        self.assertFalse(Schedule.objects.exists())
+
+    def test_non_finite_lesson_number_is_a_row_error(self):
+        rows = self.rows(
+            'ВМК-101;Пн;inf;9:00;10:30;Алгебра;t0001;101\n'
+            'ВМК-102;Пн;1e400;9:00;10:30;Алгебра;t0001;102\n'
+            'ВМК-103;Пн;nan;9:00;10:30;Алгебра;t0001;103\n'
+        )
+        with self.assertRaises(TimetableImportError) as raised:
+            import_timetable(rows)
+        self.assertEqual(raised.exception.errors, [
+            "Строка 2: номер пары: ожидается число, а не 'inf'",
+            "Строка 3: номер пары: ожидается число, а не '1e400'",
+            "Строка 4: номер пары: ожидается число, а не 'nan'",
+        ])
+
+    def test_xlsx(self):
+        shared = ['Группа', 'День', 'Пара', 'Начало', 'Предмет', 'Преподаватель', 'Аудитория', 'ВМК-101', 'Алгебра']
+        strings = ''.join(f'<si><t>{value}</t></si>' for value in shared)
+        header = ''.join(f'<c r="{column}1" t="s"><v>{index}</v></c>' for index, column in enumerate('ABCDEFG'))
+        row = (
+            '<c r="A2" t="s"><v>7</v></c><c r="B2"><v>0</v></c><c r="C2"><v>1</v></c>'
+            '<c r="D2"><v>0.375</v></c><c r="E2" t="s"><v>8</v></c>'
+            '<c r="F2" t="inlineStr"><is><t>t0001</t></is></c><c r="G2"><v>505</v></c>'
+        )
+        namespace = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            archive.writestr('xl/sharedStrings.xml', f'<sst xmlns="{namespace}">{strings}</sst>')
+            archive.writestr(
+                'xl/worksheets/sheet1.xml',
+                f'<worksheet xmlns="{namespace}"><sheetData><row r="1">{header}</row>'
+                f'<row r="2">{row}</row></sheetData></worksheet>',
+            )
+        import_timetable(read_table(buffer.getvalue(), 'timetable.xlsx'))
+        lesson = Schedule.objects.get()
+        self.assertEqual((lesson.day, lesson.start_time, lesson.classroom), (0, time(9, 0), '505'))
+
+    def test_import_invalidates_cached_days(self):
+        student = CustomUser.objects.create_user(
+            username='student1', password='pass', student_id='s0001', faculty='ВМК', course=1, group=self.groups[0],
+        )
+        today = date.today()
+        monday = today - timedelta(days=today.weekday())
+        url = f"{reverse('schedule')}?date={monday.isoformat()}"
+        self.client.force_login(student)
+        self.assertNotContains(self.client.get(url), 'Алгебра')
+        with self.captureOnCommitCallbacks(execute=True):
+            import_timetable(self.rows(f'{self.groups[0].name};Пн;1;9:00;10:30;Алгебра;t0001;101\n'))
+        self.assertContains(self.client.get(url), 'Алгебра')
+
+    def test_admin_import_view(self):
+        admin = CustomUser.objects.create_superuser(
+            username='root', password='pass', student_id='a0001', faculty='ВМК', course=0,
+        )
+        self.client.force_login(admin)
+        url = reverse('admin:schedule_schedule_import')
+        self.assertContains(self.client.get(reverse('admin:schedule_schedule_changelist')), url)
+        upload = SimpleUploadedFile('timetable.csv', (self.HEADER + 'ВМК-101;Пн;1;;;Алгебра;t0001;101\n').encode())
+        response = self.client.post(url, {'file': upload})
+        self.assertRedirects(response, reverse('admin:schedule_schedule_changelist'))
+        self.assertEqual(Schedule.objects.count(), 1)
+
+        upload = SimpleUploadedFile('timetable.csv', (self.HEADER + 'ВМК-999;Пн;1;;;Алгебра;t0001;101\n').encode())
+        self.assertContains(self.client.post(url, {'file': upload}), 'неизвестная группа')
+
+
+class TimetableConflictTests(TestCase):
+    def setUp(self):
+        self.group = Group.objects.create(name='ВМК-101', faculty='ВМК', course=1)
+        self.other_group = Group.objects.create(name='ВМК-102', faculty='ВМК', course=1)
+        self.teacher = CustomUser.objects.create(
+            username='teacher1', student_id='t0001', faculty='ВМК', course=0, role='teacher',
+            first_name='Иван', last_name='Петров',
+        )
+        self.subject = Subject.objects.create(name='Программирование', teacher=self.teacher)
+        self.lesson = Schedule.objects.create(
+            faculty='ВМК', group=self.group, day=0, lesson_number=1, teacher_id='t0001',
+            subject=self.subject, classroom='505',
+        )
+
+    def test_linear_pass_finds_every_conflict(self):
+        # 500 групп x 6 дней x 8 пар = 24000 пар без накладок: у группы свои преподаватель и аудитория
+        slots = itertools.product(range(500), range(6), range(1, 9))
+        lessons = [
+            LessonSlot(ref, group, day, number, f't{group}', str(group))
+            for ref, (group, day, number) in enumerate(slots)
+        ]
+        self.assertEqual(find_conflicts(lessons), [])
+
+        lessons += [
+            LessonSlot('поток', 600, 0, 1, 't0', '0'),
+            LessonSlot('аудитория', 601, 0, 2, 't900', '3'),
+            LessonSlot('преподаватель', 602, 0, 3, 't4', '900'),
+        ]
+        conflicts = find_conflicts(lessons)
+        self.assertEqual([(conflict.kind, conflict.value) for conflict in conflicts], [('classroom', '3'), ('teacher', 't4')])
+        self.assertEqual([lesson.ref for lesson in conflicts[0].lessons], [3 * 48 + 1, 'аудитория'])
+
+    def test_lesson_conflicts_for_new_lesson(self):
+        stream = LessonSlot(None, self.other_group.pk, 0, 1, 't0001', '505')
+        self.assertEqual(lesson_conflicts(stream), [])
+        elsewhere = LessonSlot(None, self.other_group.pk, 0, 1, 't0001', '606')
+        [conflict] = lesson_conflicts(elsewhere)
+        self.assertEqual(conflict.kind, 'teacher')
+        moved = LessonSlot(self.lesson.pk, self.group.pk, 0, 1, 't0001', '606')
+        self.assertEqual(lesson_conflicts(moved), [])
+
+    def test_admin_rejects_double_booking(self):
+        admin = CustomUser.objects.create_superuser(
+            username='root', password='pass', student_id='a0001', faculty='ВМК', course=0,
+        )
+        self.client.force_login(admin)
+        data = {
+            'faculty': 'ВМК', 'group': self.other_group.pk, 'day': 0, 'lesson_number': 1, 'teacher_id': 't0002',
+            'subject': self.subject.pk, 'classroom': '505', 'start_time': '09:00', 'end_time': '10:30',
+        }
+        response = self.client.post(reverse('admin:schedule_schedule_add'), data)
+        self.assertContains(response, f't0002 (эта пара), Иван Петров (t0001) (пара #{self.lesson.pk})')
+        self.assertEqual(Schedule.objects.count(), 1)
+
+        data['classroom'] = '606'
+        self.client.post(reverse('admin:schedule_schedule_add'), data)
+        self.assertEqual(Schedule.objects.count(), 2)
+
+    def test_command(self):
+        call_command('check_timetable', stdout=io.StringIO())
+        Schedule.objects.create(
+            faculty='ВМК', group=self.other_group, day=0, lesson_number=1, teacher_id='t0001',
+            subject=self.subject, classroom='606',
+        )
+        out = io.StringIO()
+        with self.assertRaises(CommandError):
+            call_command('check_timetable', '--faculty', 'ВМК', stdout=out)
+        self.assertIn('преподаватель Иван Петров (t0001) в разных аудиториях', out.getvalue())
+
+
+class TimetableSolverTests(TestCase):
+    def assertFeasible(self, problem, solution):
+        seen = set()
+        for event, (day, slot, room) in zip(problem.events, solution.placements):
+            for key in (('group', event.group), ('teacher', event.teacher), ('room', room)):
+                self.assertNotIn((key, day, slot), seen)
+                seen.add((key, day, slot))
+            self.assertGreaterEqual(problem.rooms[room].capacity, event.size)
+
+    def test_synthetic_faculty_is_feasible_and_cost_is_exact(self):
+        problem = solver.synthetic_problem(40, seed=1)
+        solution = solver.solve(problem, seed=1, restarts=2, iterations=5000)
+        self.assertEqual(solution.unplaced, 0)
+        self.assertFeasible(problem, solution)
+
+        days = {}
+        for event, (day, slot, _) in zip(problem.events, solution.placements):
+            days.setdefault((event.group, day), []).append((slot, event.subject))
+        expected = sum(solver.day_cost(*zip(*lessons)) for lessons in days.values())
+        self.assertEqual(solution.cost, expected)
+
+    def test_seed_determines_result_regardless_of_workers(self):
+        problem = solver.synthetic_problem(20, seed=2)
+        serial = solver.solve(problem, seed=7, restarts=2, iterations=3000)
+        self.assertEqual(solver.solve(problem, seed=7, restarts=2, iterations=3000), serial)
+        self.assertEqual(solver.solve(problem, seed=7, restarts=2, iterations=3000, workers=2), serial)
+
+    def test_busy_slots_and_missing_rooms(self):
+        events = [solver.Event(1, 't1', 's1', 25), solver.Event(2, 't2', 's2', 50)]
+        rooms = [solver.Room('505', 30)]
+        # Преподаватель t1 занят на другом факультете всю неделю, кроме вторника, первой пары
+        busy = [('t1', None, day, slot) for day in range(6) for slot in range(6) if (day, slot) != (1, 0)]
+        solution = solver.solve(solver.Problem(events, rooms, 6, 6, busy), iterations=100)
+        self.assertEqual(solution.placements, [(1, 0, 0), None])
+        self.assertEqual(solution.unplaced, 1)
+
+
+    def test_benchmark_command(self):
+        options = ('--restarts', '1', '--iterations', '100', '--workers', '1')
+        out = io.StringIO()
+        call_command('benchmark_timetable', 'small', *options, stdout=out)
+        self.assertEqual([line.split()[0] for line in out.getvalue().splitlines()[1:]], ['small'])
+
+        # Без аргументов - все размеры по очереди
+        out = io.StringIO()
+        call_command('benchmark_timetable', *options, stdout=out)
+        self.assertEqual([line.split()[0] for line in out.getvalue().splitlines()[1:]], ['small', 'medium', 'large'])
+
+        with self.assertRaises(CommandError):
+            call_command('benchmark_timetable', 'huge', stdout=io.StringIO())
+
+class TimetableGeneratorTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.groups = [Group.objects.create(name=f'ВМК-10{index}', faculty='ВМК', course=1) for index in range(3)]
+        teachers = [
+            CustomUser.objects.create_user(
+                username=f'teacher{index}', password='pass', student_id=f't000{index}',
+                faculty='ВМК', course=0, role='teacher',
+            )
+            for index in range(2)
+        ]
+        self.subjects = [
+            Subject.objects.create(name=name, teacher=teacher)
+            for name, teacher in [('Алгебра', teachers[0]), ('Анализ', teachers[1]), ('Физика', teachers[0])]
+        ]
+        for group in self.groups:
+            for subject in self.subjects:
+                TeachingLoad.objects.create(group=group, subject=subject, lessons_per_week=2)
+        for name in ('505', '506'):
+            Classroom.objects.create(name=name, capacity=30)
+
+    def test_generates_and_replaces_timetable(self):
+        teacher = self.subjects[0].teacher
+        kept = Schedule.objects.create(
+            faculty='ВМК', group=self.groups[0], day=5, lesson_number=6, teacher_id='t0000',
+            subject=self.subjects[0], classroom='505',
+        )
+        history = Subject.objects.create(name='История', teacher=teacher)
+        dropped = Schedule.objects.create(
+            faculty='ВМК', group=self.groups[0], day=0, lesson_number=1, teacher_id='t0000',
+            subject=history, classroom='505',
+        )
+        for lesson in (kept, dropped):
+            Homework.objects.create(
+                schedule=lesson, content=lesson.subject.name, created_by=teacher, group=self.groups[0],
+                subject=lesson.subject, due_date=date(2025, 9, 8),
+            )
+        result = generate_timetable('ВМК', seed=3, restarts=2, iterations=2000, workers=1)
+        self.assertEqual((result.lessons, result.unplaced), (18, 0))
+        self.assertEqual(Schedule.objects.count(), 18)
+        self.assertEqual(timetable_conflicts('ВМК'), [])
+        first = Schedule.objects.order_by('group', 'day', 'lesson_number').first()
+        self.assertEqual(first.time, '9:00-10:30')
+        # Пара того же предмета переезжает в новый слот вместе с ДЗ, пара снятого предмета удаляется с ДЗ
+        kept.refresh_from_db()
+        self.assertEqual((kept.subject_id, kept.teacher_id), (self.subjects[0].pk, 't0000'))
+        self.assertNotEqual((kept.day, kept.lesson_number), (5, 6))
+        self.assertFalse(Schedule.objects.filter(pk=dropped.pk).exists())
+        self.assertEqual(
+            list(Homework.objects.values_list('content', 'schedule__subject__name')), [('Алгебра', 'Алгебра')],
+        )
+
+        again = generate_timetable('ВМК', seed=3, restarts=2, iterations=2000, workers=1, dry_run=True)
+        self.assertEqual((again.cost, again.written), (result.cost, False))
+
+    def test_regeneration_keeps_homework_with_subject(self):
+        generate_timetable('ВМК', seed=1, restarts=1, iterations=500, workers=1)
+        teacher = self.subjects[0].teacher
+        for lesson in Schedule.objects.filter(group=self.groups[0]):
+            Homework.objects.create(
+                schedule=lesson, content=lesson.subject.name, created_by=teacher, group=self.groups[0],
+                subject=lesson.subject, due_date=date(2025, 9, 8),
+            )
+        before = {(lesson.day, lesson.lesson_number): lesson.subject_id for lesson in Schedule.objects.all()}
+        generate_timetable('ВМК', seed=2, restarts=1, iterations=500, workers=1)
+        after = {(lesson.day, lesson.lesson_number): lesson.subject_id for lesson in Schedule.objects.all()}
+        self.assertNotEqual(before, after)
+        self.assertEqual(Homework.objects.count(), 6)
+        for content, subject in Homework.objects.values_list('content', 'schedule__subject__name'):
+            self.assertEqual(content, subject)
+
+    def test_requires_rooms(self):
+        Classroom.objects.all().delete()
+        with self.assertRaises(TimetableGenerationError):
+            generate_timetable('ВМК', workers=1)
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command('generate_timetable', 'ВМК', '--iterations', '500', '--restarts', '1', stdout=out)
+        self.assertIn('Расписание записано', out.getvalue())
+        self.assertEqual(Schedule.objects.filter(faculty='ВМК').count(), 18)
+        with self.assertRaises(CommandError):
+            call_command('generate_timetable', 'ФизФак', stdout=io.StringIO())
+
+    def test_admin_enqueues_generation(self):
+        admin = CustomUser.objects.create_superuser(
+            username='root', password='pass', student_id='a0001', faculty='ВМК', course=0,
+        )
+        self.client.force_login(admin)
+        url = reverse('admin:schedule_teachingload_generate')
+        self.assertContains(self.client.get(url), 'Сгенерировать')
+        response = self.client.post(url, {'faculty': 'ВМК', 'seed': 5, 'restarts': 2})
+        self.assertRedirects(response, reverse('admin:schedule_teachingload_changelist'))
+        task = Task.objects.get()
+        self.assertEqual(task.kwargs, {'faculty': 'ВМК', 'seed': 5, 'restarts': 2})
+
+
+class CalendarFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.group = Group.objects.create(name='ВМК-101', faculty='ВМК', course=1)
+        self.teacher = CustomUser.objects.create_user(
+            username='teacher1', password='pass', student_id='t0001',
+            first_name='Сергей', last_name='Преподавателев', faculty='ВМК', course=0, role='teacher',
+        )
+        self.student = CustomUser.objects.create_user(
+            username='student1', password='pass', student_id='s0001',
+            faculty='ВМК', course=1, role='student', group=self.group,
+        )
+        self.subject = Subject.objects.create(name='Программирование', teacher=self.teacher)
+        self.lesson = Schedule.objects.create(
+            faculty='ВМК', group=self.group, day=2, lesson_number=1, teacher_id='t0001',
+            subject=self.subject, classroom='505', start_time=time(9, 0), end_time=time(10, 30),
+        )
+        self.homework = Homework.objects.create(
+            schedule=self.lesson, content='Задачи 1-5; ' + 'очень длинное условие ' * 10, created_by=self.teacher,
+            group=self.group, subject=self.subject, due_date=date.today() + timedelta(days=3),
+        )
+
+    def feed_url(self, kind, value):
+        return reverse('calendar_feed', args=[feed_token(kind, value)])
+
+    def test_group_feed_without_session(self):
+        response = self.client.get(self.feed_url('group', self.group.pk))
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        body = response.content.decode()
+        monday = date.today() - timedelta(days=date.today().weekday())
+        wednesday = monday + timedelta(days=2)
+        self.assertIn(f'DTSTART:{wednesday:%Y%m%d}T090000\r\nDTEND:{wednesday:%Y%m%d}T103000\r\nRRULE:FREQ=WEEKLY', body)
+        self.assertIn('SUMMARY:Программирование\r\nLOCATION:505', body)
+        self.assertIn(f'DTSTART;VALUE=DATE:{self.homework.due_date:%Y%m%d}', body)
+        self.assertIn('Задачи 1-5\\;', body)
+        self.assertTrue(all(len(line.encode()) <= 75 for line in body.split('\r\n')))
+
+    def test_user_feed_follows_role(self):
+        student_feed = self.client.get(self.feed_url('user', self.student.pk))
+        self.assertIn('X-WR-CALNAME:Расписание ВМК-101', student_feed.content.decode())
+        teacher_feed = self.client.get(self.feed_url('user', self.teacher.pk)).content.decode()
+        self.assertIn('SUMMARY:Программирование\\, ВМК-101', teacher_feed)
+        self.assertIn('SUMMARY:ДЗ: Программирование\\, ВМК-101', teacher_feed)
+
+    def test_forged_token(self):
+        token = feed_token('group', self.group.pk)
+        self.assertEqual(self.client.get(reverse('calendar_feed', args=[token + 'x'])).status_code, 404)
+        other = self.feed_url('user', self.student.pk).replace(str(self.student.pk), '999')
+        self.assertEqual(self.client.get(other).status_code, 404)
+
+    def test_conditional_get_and_invalidation(self):
+        url = self.feed_url('group', self.group.pk)
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.lesson.classroom = '606'
+        self.lesson.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('LOCATION:606', response.content.decode())
+
+        etag = response['ETag']
+        self.homework.due_date += timedelta(days=1)
+        self.homework.save()
+        self.assertNotEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        teacher_url = self.feed_url('teacher', 't0001')
+        etag = self.client.get(teacher_url)['ETag']
+        Homework.objects.create(
+            schedule=self.lesson, content='Ещё', created_by=self.teacher,
+            group=self.group, subject=self.subject, due_date=date.today(),
+        )
+        self.assertEqual(self.client.get(teacher_url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class WeekScheduleTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.group = Group.objects.create(name='ВМК-101', faculty='ВМК', course=1)
+        self.teacher = CustomUser.objects.create_user(
+            username='teacher1', password='pass', student_id='t0001',
+            first_name='Сергей', last_name='Преподавателев', faculty='ВМК', course=0, role='teacher',
+        )
+        self.student = CustomUser.objects.create_user(
+            username='student1', password='pass', student_id='s0001',
+            faculty='ВМК', course=1, role='student', group=self.group,
+        )
+        subject = Subject.objects.create(name='Программирование', teacher=self.teacher)
+        self.lessons = {
+            (day, number): Schedule.objects.create(
+                faculty='ВМК', group=self.group, day=day, lesson_number=number, teacher_id='t0001',
+                subject=subject, classroom='505', start_time=time(9, 0), end_time=time(10, 30),
+            )
+            for day in range(6) for number in (1, 2)
+        }
+        self.monday = date(2025, 9, 1)
+        monday_lesson = self.lessons[(0, 1)]
+        for due_date, content in [(self.monday, 'К сроку'), (self.monday + timedelta(days=7), 'Через неделю')]:
+            Homework.objects.create(
+                schedule=monday_lesson, content=content, created_by=self.teacher,
+                group=self.group, subject=subject, due_date=due_date,
+            )
+
+    def test_whole_week_in_two_queries(self):
+        self.client.force_login(self.student)
+        url = reverse('week_schedule')
+        # Сессия и пользователь, затем пары и ДЗ
+        with self.assertQueryBudget(4):
+            data = self.client.get(url, {'date': '2025-09-03', 'format': 'json'}).json()
+        self.assertEqual(data['week_start'], '2025-09-01')
+        self.assertEqual([len(day['lessons']) for day in data['days']], [2] * 6)
+        first = data['days'][0]['lessons'][0]
+        self.assertEqual((first['subject_name'], first['teacher_name'], first['time']),
+                         ('Программирование', 'Сергей Преподавателев', '9:00-10:30'))
+        self.assertEqual([item['content'] for item in first['homework']], ['К сроку'])
+        self.assertEqual(data['days'][0]['lessons'][1]['homework'], [])
+
+        # В HTML ещё название группы в заголовке
+        with self.assertQueryBudget(5):
+            response = self.client.get(url, {'date': '2025-09-08'})
+        self.assertContains(response, 'Через неделю')
+        self.assertNotContains(response, 'К сроку')
+        self.assertContains(response, 'data-bs-target="#day-5"')
 
-# Create your tests here.
+    def test_teacher_week(self):
+        self.client.force_login(self.teacher)
+        data = self.client.get(reverse('week_schedule'), {'date': '2025-09-01', 'format': 'json'}).json()
+        self.assertEqual(sum(len(day['lessons']) for day in data['days']), 12)
+        self.assertEqual(data['days'][0]['lessons'][0]['homework'][0]['content'], 'К сроку')
@@ -3,9 +3,11 @@ from . import views
 
 urlpatterns = [
     path('', views.schedule_view, name='schedule'),
+    path('week/', views.week_schedule, name='week_schedule'),
+    path('calendar/<str:token>.ics', views.calendar_feed, name='calendar_feed'),
     path('<str:day>/', views.day_schedule, name='day_schedule'),  # Для обратной совместимости
     path('add-homework/<int:schedule_id>/', views.add_homework, name='add_homework'),
-    path('download-homework/<int:schedule_id>/', views.download_homework_file, name='download_homework_file'),
+    path('download-homework/<int:homework_id>/', views.download_homework_file, name='download_homework_file'),
     path('api/schedule/', views.schedule_json, name='schedule_json'),
     path('api/schedule/<str:day>/', views.schedule_json, name='schedule_json_day'),
     path('<int:schedule_id>/', views.schedule_detail, name='schedule_detail'),
@@ -1,12 +1,23 @@
-import os
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-from django.http import JsonResponse, FileResponse
+from django.core import signing
+from django.http import Http404, JsonResponse
+from django.db.models import OuterRef, Subquery
+from django.urls import reverse
 from django.utils import timezone
 from datetime import datetime, timedelta, date
 from .models import Schedule, Subject, Homework
+from .cache import get_group_day, get_teacher_day
+from .lessons import LESSON_VALUES, lesson_row
+from main.downloads import serve_file
 from .forms import HomeworkForm
+from .ical import feed_response, feed_urls, read_token
+from .week import week_start, week_timetable
+
+
+# 'Понедельник' -> 0 и т.д., для адресов со старыми названиями дней
+DAY_NUMBERS = {name: number for number, name in Schedule.DAYS}
 
 
 def is_headman_or_above(user):
@@ -15,7 +26,7 @@ def is_headman_or_above(user):
 
 @login_required
 def schedule_view(request):
-    user_group = request.user.group
+    user_group = request.user.group_id
 
     if not user_group and request.user.role != "teacher":
         context = {
@@ -41,27 +52,11 @@ def schedule_view(request):
     previous_week = (current_date - timedelta(days=7)).isoformat()
     next_week = (current_date + timedelta(days=7)).isoformat()
 
-    # Получаем день недели для текущей даты
-    days_map = {
-        0: 'Понедельник', 1: 'Вторник', 2: 'Среда',
-        3: 'Четверг', 4: 'Пятница', 5: 'Суббота'
-    }
-    current_day = days_map.get(current_date.weekday(), 'monday')
-    # Расписание на текущий день
-    print(request.user.faculty)
+    # Пары и ДЗ на день берутся из кэша (см. schedule/cache.py)
     if request.user.role != "teacher":
-        schedule = Schedule.objects.filter(
-            faculty=request.user.faculty,
-            group=user_group,
-            day=current_day
-        ).order_by('lesson_number')
-        homework = Homework.objects.filter(due_date=current_date, group=user_group)
+        schedule, homework = get_group_day(user_group, current_date)
     else:
-        schedule = Schedule.objects.filter(
-            teacher_id=request.user.student_id,
-            day=current_day
-        ).order_by('lesson_number')
-        homework = Homework.objects.filter(due_date=current_date)
+        schedule, homework = get_teacher_day(request.user.student_id, current_date)
 
     context = {
         'schedule': schedule,
@@ -72,25 +67,64 @@ def schedule_view(request):
         'next_week': next_week,
         'homework': homework,
         'form': HomeworkForm(),
+        'calendar_feeds': feed_urls(request.user),
     }
     return render(request, 'schedule.html', context)
 
 
+def calendar_feed(request, token):
+    """Календарь .ics по подписанной ссылке - без входа на сайт"""
+    try:
+        kind, value = read_token(token)
+    except signing.BadSignature:
+        raise Http404('Календарь недоступен')
+    return feed_response(request, kind, value)
+
+
 @login_required
-def day_schedule(request, day):
-    """Старая функция для обратной совместимости - перенаправляет на новую систему с датами"""
-    # Маппинг старых названий дней на даты текущей недели
-    day_mapping = {
-        'Понедельник': 0, 'Вторник': 1, 'Среда': 2,
-        'Четверг': 3, 'Пятница': 4, 'Суббота': 5
+def week_schedule(request):
+    """Вся неделя одним ответом: HTML с переключением дней на клиенте или JSON (?format=json)"""
+    as_json = request.GET.get('format') == 'json'
+    is_teacher = request.user.role == 'teacher'
+    if not request.user.group_id and not is_teacher:
+        if as_json:
+            return JsonResponse({'error': 'Group not assigned'}, status=400)
+        return redirect('schedule')
+
+    try:
+        current_date = date.fromisoformat(request.GET.get('date', ''))
+    except ValueError:
+        current_date = date.today()
+    start = week_start(current_date)
+    if is_teacher:
+        days = week_timetable(start, teacher_id=request.user.student_id)
+    else:
+        days = week_timetable(start, group_id=request.user.group_id)
+
+    if as_json:
+        return JsonResponse({'week_start': start, 'days': days}, json_dumps_params={'ensure_ascii': False})
+
+    context = {
+        'days': days,
+        'current_date': current_date,
+        'week_end': days[-1]['date'],
+        # В воскресенье пар нет - открываем субботу
+        'active_day': min(current_date.weekday(), days[-1]['day']),
+        'previous_week': (start - timedelta(days=7)).isoformat(),
+        'next_week': (start + timedelta(days=7)).isoformat(),
     }
+    return render(request, 'week_schedule.html', context)
+
 
-    if day not in day_mapping:
+@login_required
+def day_schedule(request, day):
+    """Старая функция для обратной совместимости - перенаправляет на новую систему с датами"""
+    if day not in DAY_NUMBERS:
         return redirect('schedule')
 
     # Вычисляем дату для запрошенного дня
     today = date.today()
-    days_difference = day_mapping[day] - today.weekday()
+    days_difference = DAY_NUMBERS[day] - today.weekday()
     target_date = today + timedelta(days=days_difference)
 
     return redirect(f'/schedule/?date={target_date.isoformat()}')
@@ -125,12 +159,10 @@ def add_homework(request, schedule_id):
     })
 
 @login_required
-def download_homework_file(request, schedule_id):
-    schedule_item = get_object_or_404(Schedule, id=schedule_id)
-    if schedule_item.homework_file:
-        response = FileResponse(schedule_item.homework_file.open(), as_attachment=True)
-        response['Content-Disposition'] = f'attachment; filename="{schedule_item.homework_file.name}"'
-        return response
+def download_homework_file(request, homework_id):
+    homework = get_object_or_404(Homework, id=homework_id)
+    if homework.file:
+        return serve_file(request, homework.file)
     else:
         messages.error(request, "Файл не найден")
         return redirect('schedule')
@@ -138,28 +170,48 @@ def download_homework_file(request, schedule_id):
 
 @login_required
 def schedule_json(request, day=None):
-    user_group = request.user.group
+    """Старый формат для прежних клиентов; новые используют /api/v1/timetable/ и /api/v1/homework/.
+
+    ДЗ у пары - последнее выданное задание: его id выбирает подзапрос в том же
+    SELECT, что и пары, а вторым запросом читаются только эти задания.
+    """
+    user_group = request.user.group_id
 
     if not user_group:
         return JsonResponse({'error': 'Group not assigned'}, status=400)
 
+    newest_homework = Homework.objects.filter(schedule_id=OuterRef('id')).order_by('-assigned_date', '-id')
+    lessons = Schedule.objects.filter(group_id=user_group)
     if day:
-        schedule = Schedule.objects.filter(group=user_group, day=day)
-    else:
-        schedule = Schedule.objects.filter(group=user_group)
-
+        lessons = lessons.filter(day=int(day) if day.isdigit() else DAY_NUMBERS.get(day))
+    lessons = lessons.annotate(homework_id=Subquery(newest_homework.values('id')[:1]))
+    lessons = list(lessons.order_by('day', 'lesson_number').values(*LESSON_VALUES, 'homework_id'))
+
+    homework_ids = [lesson['homework_id'] for lesson in lessons if lesson['homework_id']]
+    latest_homework = {
+        assignment['schedule_id']: assignment
+        for assignment in Homework.objects.filter(id__in=homework_ids).values(
+            'id', 'schedule_id', 'content', 'file', 'assigned_date',
+        )
+    } if homework_ids else {}
+
+    day_names = dict(Schedule.DAYS)
     schedule_data = []
-    for item in schedule.order_by('day', 'lesson_number'):
+    for item in lessons:
+        lesson = lesson_row(item)
+        homework = latest_homework.get(item['id'])
         schedule_data.append({
-            'day': item.get_day_display(),
-            'lesson_number': item.lesson_number,
-            'time': item.time,
-            'subject': item.subject.name,
-            'teacher': item.subject.teacher.get_full_name(),
-            'classroom': item.classroom,
-            'homework': item.homework,
-            'homework_file': item.homework_file.url if item.homework_file else None,
-            'homework_date': item.homework_date.isoformat() if item.homework_date else None
+            'day': day_names.get(item['day'], item['day']),
+            'lesson_number': lesson['lesson_number'],
+            'time': lesson['time'],
+            'subject': lesson['subject_name'],
+            'teacher': lesson['teacher_name'],
+            'classroom': lesson['classroom'],
+            'homework': homework['content'] if homework else None,
+            'homework_file': (
+                reverse('download_homework_file', args=[homework['id']]) if homework and homework['file'] else None
+            ),
+            'homework_date': homework['assigned_date'].isoformat() if homework else None,
         })
 
     return JsonResponse({'schedule': schedule_data})
@@ -181,8 +233,6 @@ def delete_homework(request, schedule_id):
     print(schedule.due_date)
     print(schedule.file)
     if request.method == 'POST':
-        if os.path.isfile(f"media/{schedule.file}"):
-            os.remove(f"media/{schedule.file}")
         schedule.delete()
         messages.success(request, 'Домашка успешно удалена')
     return redirect(f'/schedule/?date={schedule.due_date}')
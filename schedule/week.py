@@ -0,0 +1,55 @@
+"""Неделя расписания целиком: пары всех шести дней и ДЗ со сроком сдачи на этой неделе.
+
+Данные читаются двумя запросами через values() и раскладываются по дням в
+Python - день -> пара -> ДЗ, - так что страница переключает дни на клиенте,
+не обращаясь к серверу. Ключи словарей пар и ДЗ те же, что в кэше дней
+(cache.py), поэтому шаблоны показывают их одинаково.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from .lessons import LESSON_VALUES, lesson_row
+from .models import Homework, Schedule
+
+HOMEWORK_FIELDS = ('id', 'schedule_id', 'content', 'file', 'assigned_date', 'due_date')
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def week_timetable(start, group_id=None, teacher_id=None):
+    """Дни недели, начинающейся в понедельник start, для группы или преподавателя.
+
+    ДЗ показывается у пары, к которой оно выдано, в день своего срока сдачи - как на странице дня.
+    """
+    if teacher_id:
+        lessons = Schedule.objects.filter(teacher_id=teacher_id)
+        homework = Homework.objects.filter(schedule__teacher_id=teacher_id)
+    else:
+        lessons = Schedule.objects.filter(group_id=group_id)
+        homework = Homework.objects.filter(group_id=group_id)
+    end = start + timedelta(days=len(Schedule.DAYS) - 1)
+
+    by_lesson = defaultdict(list)
+    for item in homework.filter(due_date__range=(start, end)).order_by('id').values(*HOMEWORK_FIELDS):
+        by_lesson[(item['schedule_id'], item['due_date'])].append({
+            'id': item['id'],
+            'schedule_id': item['schedule_id'],
+            'content': item['content'],
+            'file_name': item['file'] or '',
+            'assigned_date': item['assigned_date'],
+            'due_date': item['due_date'],
+        })
+
+    days = [
+        {'day': day, 'name': name, 'date': start + timedelta(days=day), 'lessons': []}
+        for day, name in Schedule.DAYS
+    ]
+    for lesson in lessons.order_by('day', 'lesson_number').values(*LESSON_VALUES):
+        day = days[lesson['day']]
+        day['lessons'].append({
+            **lesson_row(lesson),
+            'homework': by_lesson.get((lesson['id'], day['date']), []),
+        })
+    return days
@@ -0,0 +1,16 @@
+from django.contrib import admin
+from .models import ExtractedText, SearchDocument
+
+
+@admin.register(SearchDocument)
+class SearchDocumentAdmin(admin.ModelAdmin):
+    list_display = ['title', 'kind', 'object_id', 'group', 'updated_at']
+    list_filter = ['kind']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(ExtractedText)
+class ExtractedTextAdmin(admin.ModelAdmin):
+    list_display = ['source_name', 'digest', 'error', 'extractor_version', 'extracted_at']
+    search_fields = ['source_name', 'digest']
+    readonly_fields = ['extracted_at']
@@ -0,0 +1,204 @@
+"""Движки полнотекстового поиска по SearchDocument.
+
+Все движки работают с уже нормализованным текстом (основы слов из
+stemmer.py), поэтому русская морфология одинакова для SQLite, PostgreSQL
+и запасного индекса в памяти.
+"""
+import bisect
+import math
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Max
+
+from .models import SearchDocument
+
+# Совпадение в заголовке весит больше, чем в тексте
+TITLE_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+
+FTS_TABLE = 'search_fts'
+PG_VECTOR = (
+    "setweight(to_tsvector('simple', title_stems), 'A') || "
+    "setweight(to_tsvector('simple', body_stems), 'B')"
+)
+
+
+def _group_condition(restrict_group, group_id, params):
+    """SQL-условие видимости: ДЗ других групп студенту не показываем"""
+    if not restrict_group:
+        return ''
+    if group_id is None:
+        return ' AND d.group_id IS NULL'
+    params.append(group_id)
+    return ' AND (d.group_id IS NULL OR d.group_id = %s)'
+
+
+class SQLiteFTSBackend:
+    """Виртуальная таблица FTS5, rowid совпадает с id документа"""
+
+    def index(self, document):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [document.id])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (%s, %s, %s)',
+                [document.id, document.title_stems, document.body_stems],
+            )
+
+    def remove(self, document_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [document_id])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    def search(self, stems, restrict_group, group_id, limit, offset):
+        # Каждое слово - префиксный поиск, слова объединяются через AND
+        params = [' '.join(f'"{stem}"*' for stem in stems)]
+        sql = (
+            f'SELECT d.id, bm25({FTS_TABLE}, %s, %s) AS rank '
+            f'FROM {FTS_TABLE} JOIN search_searchdocument d ON d.id = {FTS_TABLE}.rowid '
+            f'WHERE {FTS_TABLE} MATCH %s'
+        )
+        params = [TITLE_WEIGHT, BODY_WEIGHT] + params
+        sql += _group_condition(restrict_group, group_id, params)
+        sql += ' ORDER BY rank LIMIT %s OFFSET %s'
+        params += [limit, offset]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            # bm25 в SQLite отрицательный: чем меньше, тем лучше
+            return [(document_id, -rank) for document_id, rank in cursor.fetchall()]
+
+
+class PostgresBackend:
+    """tsvector по выражению с GIN-индексом (см. миграцию), поддерживать его вручную не нужно"""
+
+    def index(self, document):
+        pass
+
+    def remove(self, document_id):
+        pass
+
+    def clear(self):
+        pass
+
+    def search(self, stems, restrict_group, group_id, limit, offset):
+        params = [' & '.join(f'{stem}:*' for stem in stems)]
+        sql = (
+            f'SELECT d.id, ts_rank({PG_VECTOR}, q) AS rank '
+            f"FROM search_searchdocument d, to_tsquery('simple', %s) q "
+            f'WHERE {PG_VECTOR} @@ q'
+        )
+        sql += _group_condition(restrict_group, group_id, params)
+        sql += ' ORDER BY rank DESC LIMIT %s OFFSET %s'
+        params += [limit, offset]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+
+class PythonBackend:
+    """Инвертированный индекс в памяти процесса для баз без полнотекстового поиска.
+
+    Строится из SearchDocument при первом поиске и перестраивается, когда
+    в таблице меняется число документов или время последнего обновления -
+    так изменения из других процессов тоже подхватываются.
+    """
+
+    def __init__(self):
+        self._postings = None
+        self._vocabulary = []
+        self._groups = {}
+        self._signature = None
+
+    def index(self, document):
+        self._postings = None
+
+    def remove(self, document_id):
+        self._postings = None
+
+    def clear(self):
+        self._postings = None
+
+    def _ensure_index(self):
+        signature = SearchDocument.objects.aggregate(count=Count('id'), updated=Max('updated_at'))
+        if self._postings is not None and signature == self._signature:
+            return
+        postings = defaultdict(lambda: defaultdict(float))
+        groups = {}
+        documents = SearchDocument.objects.values_list('id', 'group_id', 'title_stems', 'body_stems')
+        for document_id, group_id, title_stems, body_stems in documents.iterator():
+            groups[document_id] = group_id
+            for stem in title_stems.split():
+                postings[stem][document_id] += TITLE_WEIGHT
+            for stem in body_stems.split():
+                postings[stem][document_id] += BODY_WEIGHT
+        self._postings = postings
+        self._vocabulary = sorted(postings)
+        self._groups = groups
+        self._signature = signature
+
+    def _prefix_matches(self, prefix):
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        for term in self._vocabulary[start:]:
+            if not term.startswith(prefix):
+                break
+            yield term
+
+    def search(self, stems, restrict_group, group_id, limit, offset):
+        self._ensure_index()
+        total = len(self._groups) or 1
+        scores = None
+        for stem in stems:
+            term_scores = defaultdict(float)
+            for term in self._prefix_matches(stem):
+                documents = self._postings[term]
+                idf = math.log(1 + total / len(documents))
+                for document_id, weight in documents.items():
+                    term_scores[document_id] += weight * idf
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {doc: score + term_scores[doc] for doc, score in scores.items() if doc in term_scores}
+            if not scores:
+                return []
+
+        if restrict_group:
+            scores = {
+                doc: score for doc, score in scores.items()
+                if self._groups.get(doc) is None or self._groups.get(doc) == group_id
+            }
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[offset:offset + limit]
+
+
+@lru_cache(maxsize=1)
+def fts5_available():
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return any(option == 'ENABLE_FTS5' for (option,) in cursor.fetchall())
+
+
+BACKENDS = {
+    'sqlite_fts': SQLiteFTSBackend,
+    'postgres': PostgresBackend,
+    'python': PythonBackend,
+}
+
+
+@lru_cache(maxsize=1)
+def get_backend():
+    name = getattr(settings, 'SEARCH_BACKEND', 'auto')
+    if name == 'auto':
+        if connection.vendor == 'postgresql':
+            name = 'postgres'
+        elif fts5_available():
+            name = 'sqlite_fts'
+        else:
+            name = 'python'
+    return BACKENDS[name]()
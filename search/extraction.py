@@ -0,0 +1,76 @@
+"""Извлечение текста из файлов материалов, новостей и ДЗ.
+
+Запускается фоновой задачей после загрузки (см. tasks.py): разбор файла
+идёт в пуле процессов, результат сохраняется в ExtractedText, а документы
+поиска с этим файлом переиндексируются. Один и тот же блоб разбирается один раз.
+"""
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db.models import Q
+
+from main.storage import CAS_PREFIX, blob_digest
+from .extractors import EXTRACTOR_VERSION, extract_file
+from .index import INDEXED_MODELS, index_instance
+from .models import ExtractedText
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        # spawn: воркерам не нужен Django, а fork многопоточного процесса небезопасен
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.TEXT_EXTRACTION_WORKERS,
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+    return _executor
+
+
+def is_extracted(name, digest=None):
+    """Есть ли актуальный текст для файла с таким именем или содержимым"""
+    digest = digest or blob_digest(name)
+    lookup = Q(digest=digest) if digest else Q(source_name=name)
+    return ExtractedText.objects.filter(lookup, extractor_version=EXTRACTOR_VERSION).exists()
+
+
+def run_extraction(path, name):
+    """extract_file в пуле процессов - CPU-ёмкий разбор PDF не держит GIL воркера"""
+    if not settings.TEXT_EXTRACTION_WORKERS:
+        return extract_file(path, name, blob_digest(name))
+    return get_executor().submit(extract_file, path, name, blob_digest(name)).result()
+
+
+def store_result(result):
+    """Сохраняет результат extract_file и переиндексирует документы с этим файлом"""
+    if result['digest'] is None:
+        logger.warning('Text extraction skipped for %s: %s', result['name'], result['error'])
+        return
+    if result['error']:
+        logger.warning('Text extraction error for %s: %s', result['name'], result['error'])
+    ExtractedText.objects.update_or_create(
+        digest=result['digest'],
+        defaults={
+            'source_name': result['name'],
+            'text': result['text'],
+            'error': result['error'],
+            'extractor_version': EXTRACTOR_VERSION,
+        },
+    )
+    if not blob_digest(result['name']):
+        # Файл со старым именем перезаписан: прежний текст больше не нужен
+        ExtractedText.objects.filter(source_name=result['name']).exclude(digest=result['digest']).delete()
+    for instance in objects_with_file(result['name'], result['digest']):
+        index_instance(instance)
+
+
+def objects_with_file(name, digest):
+    """Все индексируемые объекты, ссылающиеся на этот файл или блоб"""
+    for model in INDEXED_MODELS:
+        queryset = model.objects.filter(Q(file=name) | Q(file__startswith=f'{CAS_PREFIX}{digest}/'))
+        yield from queryset.order_by('pk')
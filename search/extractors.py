@@ -0,0 +1,122 @@
+"""Извлечение текста из загруженных файлов.
+
+Модуль не импортирует Django: extract_file выполняется в дочерних процессах
+пула (см. extraction.py) и получает только путь к файлу.
+"""
+import hashlib
+import os
+import re
+import zipfile
+from xml.etree import ElementTree
+
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+
+# Увеличивается при изменении извлечения - extract_texts тогда обработает файлы заново
+EXTRACTOR_VERSION = 1
+MAX_TEXT_LENGTH = 1_000_000
+READ_SIZE = 64 * 1024
+
+WORD_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+DRAWING_NS = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+
+CODE_EXTENSIONS = {
+    '.txt', '.md', '.rst', '.tex', '.csv', '.json', '.xml', '.yaml', '.yml',
+    '.py', '.ipynb', '.c', '.h', '.cpp', '.hpp', '.cc', '.java', '.kt', '.cs',
+    '.go', '.rs', '.js', '.ts', '.html', '.css', '.sql', '.sh', '.m', '.r', '.pas', '.hs',
+}
+
+
+def file_sha256(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(READ_SIZE), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def _pdf_text(path):
+    if PdfReader is None:
+        raise RuntimeError('pypdf не установлен')
+    parts = []
+    length = 0
+    for page in PdfReader(path).pages:
+        text = page.extract_text() or ''
+        parts.append(text)
+        length += len(text)
+        if length >= MAX_TEXT_LENGTH:
+            break
+    return '\n'.join(parts)
+
+
+def _paragraphs(root, paragraph_tag, text_tag):
+    for paragraph in root.iter(paragraph_tag):
+        text = ''.join(node.text or '' for node in paragraph.iter(text_tag))
+        if text:
+            yield text
+
+
+def _docx_text(path):
+    with zipfile.ZipFile(path) as archive:
+        root = ElementTree.fromstring(archive.read('word/document.xml'))
+    return '\n'.join(_paragraphs(root, f'{WORD_NS}p', f'{WORD_NS}t'))
+
+
+def _pptx_text(path):
+    slide_name = re.compile(r'ppt/slides/slide(\d+)\.xml$')
+    with zipfile.ZipFile(path) as archive:
+        slides = sorted(
+            (int(match.group(1)), name)
+            for name in archive.namelist()
+            if (match := slide_name.match(name))
+        )
+        parts = []
+        for _, name in slides:
+            root = ElementTree.fromstring(archive.read(name))
+            parts.extend(_paragraphs(root, f'{DRAWING_NS}p', f'{DRAWING_NS}t'))
+    return '\n'.join(parts)
+
+
+def _plain_text(path):
+    with open(path, 'rb') as file:
+        data = file.read(MAX_TEXT_LENGTH * 2)
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        # Старые файлы с кафедральных машин часто в cp1251
+        return data.decode('cp1251', errors='replace')
+
+
+def _extractor(name):
+    extension = os.path.splitext(name)[1].lower()
+    if extension == '.pdf':
+        return _pdf_text
+    if extension == '.docx':
+        return _docx_text
+    if extension == '.pptx':
+        return _pptx_text
+    if extension in CODE_EXTENSIONS:
+        return _plain_text
+    return None
+
+
+def extract_file(path, name, digest=None):
+    """Текст файла для поискового индекса.
+
+    Возвращает dict(name, digest, text, error); digest считается, если не
+    передан. Ошибки разбора не пробрасываются, а возвращаются в error, чтобы
+    один битый файл не ронял весь пул.
+    """
+    result = {'name': name, 'digest': digest, 'text': '', 'error': ''}
+    try:
+        if result['digest'] is None:
+            result['digest'] = file_sha256(path)
+        extractor = _extractor(name)
+        if extractor is not None:
+            text = extractor(path).replace('\x00', '')
+            result['text'] = text[:MAX_TEXT_LENGTH]
+    except Exception as exc:
+        result['error'] = f'{type(exc).__name__}: {exc}'[:255]
+    return result
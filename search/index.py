@@ -0,0 +1,97 @@
+from materials.models import Material
+from main.models import News
+from main.storage import blob_digest
+from schedule.models import Homework
+from .backends import get_backend
+from .models import ExtractedText, SearchDocument
+from .stemmer import stem_text, tokenize, stem
+
+
+def _material_fields(material):
+    return {'title': material.name, 'body': material.subject, 'group_id': None}
+
+
+def _news_fields(news):
+    if not news.is_published:
+        return None
+    return {'title': news.title, 'body': news.content, 'group_id': None}
+
+
+def _homework_fields(homework):
+    subject = homework.subject.name if homework.subject_id else ''
+    return {'title': f"ДЗ: {subject}".strip(), 'body': homework.content, 'group_id': homework.group_id}
+
+
+# Модель -> (тип документа, функция, возвращающая поля документа или None)
+INDEXED_MODELS = {
+    Material: ('material', _material_fields),
+    News: ('news', _news_fields),
+    Homework: ('homework', _homework_fields),
+}
+
+
+def file_text(name):
+    """Извлечённый из файла текст (см. extraction.py) или пустая строка, пока его нет"""
+    if not name:
+        return ''
+    digest = blob_digest(name)
+    lookup = {'digest': digest} if digest else {'source_name': name}
+    return ExtractedText.objects.filter(**lookup).values_list('text', flat=True).first() or ''
+
+
+def index_instance(instance):
+    """Добавляет или обновляет документ объекта; скрытые объекты убираются из индекса"""
+    kind, build_fields = INDEXED_MODELS[type(instance)]
+    fields = build_fields(instance)
+    if fields is None:
+        remove_instance(instance)
+        return None
+    document, _ = SearchDocument.objects.update_or_create(
+        kind=kind,
+        object_id=instance.pk,
+        defaults={
+            'title': fields['title'][:255],
+            'body': fields['body'],
+            'title_stems': stem_text(fields['title']),
+            # Текст файла ищется наравне с описанием, но в выдачу не попадает
+            'body_stems': stem_text(f"{fields['body']}\n{file_text(instance.file.name)}"),
+            'group_id': fields['group_id'],
+        },
+    )
+    get_backend().index(document)
+    return document
+
+
+def remove_instance(instance):
+    kind, _ = INDEXED_MODELS[type(instance)]
+    for document_id in SearchDocument.objects.filter(kind=kind, object_id=instance.pk).values_list('id', flat=True):
+        get_backend().remove(document_id)
+        SearchDocument.objects.filter(id=document_id).delete()
+
+
+def rebuild_index():
+    """Полная переиндексация всех моделей; возвращает число документов"""
+    backend = get_backend()
+    backend.clear()
+    SearchDocument.objects.all().delete()
+    count = 0
+    for model in INDEXED_MODELS:
+        queryset = model.objects.all()
+        if model is Homework:
+            queryset = queryset.select_related('subject')
+        for instance in queryset.iterator():
+            if index_instance(instance) is not None:
+                count += 1
+    return count
+
+
+def search_documents(query, user, limit, offset=0):
+    """Документы, подходящие под запрос, по убыванию релевантности: [(SearchDocument, rank)]"""
+    stems = [stem(token) for token in tokenize(query)]
+    if not stems:
+        return []
+    # Преподаватели и администраторы видят ДЗ всех групп
+    restrict_group = user.role not in ['teacher', 'admin']
+    ranked = get_backend().search(stems, restrict_group, user.group_id, limit, offset)
+    documents = SearchDocument.objects.in_bulk([document_id for document_id, _ in ranked])
+    return [(documents[document_id], rank) for document_id, rank in ranked if document_id in documents]
@@ -0,0 +1,65 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from main.storage import blob_digest
+from search.extraction import store_result
+from search.extractors import EXTRACTOR_VERSION, extract_file, file_sha256
+from search.index import INDEXED_MODELS
+from search.models import ExtractedText
+
+
+class Command(BaseCommand):
+    help = (
+        'Извлекает текст из уже загруженных файлов для поиска. '
+        'Обрабатываются только файлы, для содержимого которых текста ещё нет'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Извлечь текст заново из всех файлов')
+        parser.add_argument('--workers', type=int, default=settings.TEXT_EXTRACTION_WORKERS or 1,
+                            help='Число процессов')
+
+    def collect_jobs(self, force):
+        """Файлы, которые нужно разобрать: {digest: (path, name)}"""
+        extracted = set()
+        if not force:
+            # Файлы с ошибкой пробуем снова: например, pypdf могли доустановить
+            extracted = set(
+                ExtractedText.objects.filter(extractor_version=EXTRACTOR_VERSION, error='')
+                .values_list('digest', flat=True)
+            )
+        jobs = {}
+        for model in INDEXED_MODELS:
+            field_file = model._meta.get_field('file')
+            names = model.objects.exclude(file='').exclude(file__isnull=True).values_list('file', flat=True)
+            for name in names.distinct().iterator():
+                path = field_file.storage.path(name)
+                if not os.path.exists(path):
+                    self.stderr.write(f'Файл не найден: {name}')
+                    continue
+                # У старых файлов имя не содержит хэша - изменилось ли содержимое, узнаём по самому файлу
+                digest = blob_digest(name) or file_sha256(path)
+                if digest not in extracted:
+                    jobs.setdefault(digest, (path, name))
+        return jobs
+
+    def handle(self, *args, **options):
+        jobs = self.collect_jobs(options['force'])
+        if not jobs:
+            self.stdout.write('Новых файлов нет')
+            return
+
+        failed = 0
+        with ProcessPoolExecutor(max_workers=max(options['workers'], 1)) as executor:
+            futures = [executor.submit(extract_file, path, name, digest) for digest, (path, name) in jobs.items()]
+            for future in futures:
+                result = future.result()
+                store_result(result)
+                if result['error']:
+                    failed += 1
+                    self.stderr.write(f"{result['name']}: {result['error']}")
+
+        self.stdout.write(self.style.SUCCESS(f'Обработано файлов: {len(jobs)}, с ошибками: {failed}'))
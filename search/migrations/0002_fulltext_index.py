@@ -0,0 +1,39 @@
+from django.db import migrations
+
+PG_VECTOR = (
+    "setweight(to_tsvector('simple', title_stems), 'A') || "
+    "setweight(to_tsvector('simple', body_stems), 'B')"
+)
+
+
+def fts5_available(schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return any(option == 'ENABLE_FTS5' for (option,) in cursor.fetchall())
+
+
+def create_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite' and fts5_available(schema_editor):
+        schema_editor.execute("CREATE VIRTUAL TABLE search_fts USING fts5(title, body, tokenize='unicode61')")
+    elif vendor == 'postgresql':
+        schema_editor.execute(f'CREATE INDEX search_document_fts_idx ON search_searchdocument USING GIN (({PG_VECTOR}))')
+
+
+def drop_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS search_fts')
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS search_document_fts_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
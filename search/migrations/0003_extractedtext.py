@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0002_fulltext_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExtractedText',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=64, unique=True, verbose_name='SHA-256')),
+                ('source_name', models.CharField(db_index=True, max_length=255, verbose_name='Файл')),
+                ('text', models.TextField(blank=True, verbose_name='Текст')),
+                ('error', models.CharField(blank=True, max_length=255, verbose_name='Ошибка')),
+                ('extractor_version', models.PositiveSmallIntegerField(default=0, verbose_name='Версия извлечения')),
+                ('extracted_at', models.DateTimeField(auto_now=True, verbose_name='Дата извлечения')),
+            ],
+            options={
+                'verbose_name': 'Извлечённый текст',
+                'verbose_name_plural': 'Извлечённые тексты',
+            },
+        ),
+    ]
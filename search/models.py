@@ -0,0 +1,50 @@
+from django.db import models
+from main.models import Group
+
+
+class SearchDocument(models.Model):
+    """Запись поискового индекса: нормализованный текст одного материала, новости или ДЗ"""
+    KINDS = [
+        ('material', 'Материал'),
+        ('news', 'Новость'),
+        ('homework', 'Домашнее задание'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KINDS, verbose_name='Тип')
+    object_id = models.PositiveBigIntegerField(verbose_name='ID объекта')
+    title = models.CharField(max_length=255, verbose_name='Заголовок')
+    body = models.TextField(blank=True, verbose_name='Текст')
+    # Основы слов (см. stemmer.py) - по ним и идёт поиск
+    title_stems = models.TextField(blank=True)
+    body_stems = models.TextField(blank=True)
+    # ДЗ видно только своей группе, материалы и новости - всем
+    group = models.ForeignKey(Group, on_delete=models.CASCADE, null=True, blank=True, verbose_name='Группа')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата обновления')
+
+    class Meta:
+        verbose_name = 'Документ поиска'
+        verbose_name_plural = 'Документы поиска'
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='search_document_unique_object'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.title}"
+
+
+class ExtractedText(models.Model):
+    """Текст, извлечённый из загруженного файла; один на содержимое (SHA-256)"""
+    digest = models.CharField(max_length=64, unique=True, verbose_name='SHA-256')
+    # Имя файла в поле модели - по нему ищется текст файлов, загруженных до блобов
+    source_name = models.CharField(max_length=255, db_index=True, verbose_name='Файл')
+    text = models.TextField(blank=True, verbose_name='Текст')
+    error = models.CharField(max_length=255, blank=True, verbose_name='Ошибка')
+    extractor_version = models.PositiveSmallIntegerField(default=0, verbose_name='Версия извлечения')
+    extracted_at = models.DateTimeField(auto_now=True, verbose_name='Дата извлечения')
+
+    class Meta:
+        verbose_name = 'Извлечённый текст'
+        verbose_name_plural = 'Извлечённые тексты'
+
+    def __str__(self):
+        return self.source_name
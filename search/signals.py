@@ -0,0 +1,25 @@
+from django.core.signals import setting_changed
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .backends import get_backend
+from .index import INDEXED_MODELS, index_instance, remove_instance
+
+
+def update_document(sender, instance, **kwargs):
+    index_instance(instance)
+
+
+def delete_document(sender, instance, **kwargs):
+    remove_instance(instance)
+
+
+for model in INDEXED_MODELS:
+    post_save.connect(update_document, sender=model, dispatch_uid=f'search_update_{model._meta.label_lower}')
+    post_delete.connect(delete_document, sender=model, dispatch_uid=f'search_delete_{model._meta.label_lower}')
+
+
+@receiver(setting_changed)
+def reset_backend(setting, **kwargs):
+    if setting == 'SEARCH_BACKEND':
+        get_backend.cache_clear()
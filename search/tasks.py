@@ -0,0 +1,18 @@
+from django.apps import apps
+
+from taskqueue.queue import on_upload, task
+from .extraction import is_extracted, run_extraction, store_result
+from .index import INDEXED_MODELS
+
+
+@on_upload(*[model._meta.label for model in INDEXED_MODELS])
+@task(max_attempts=3, concurrency=2)
+def extract_upload_text(model, pk, field='file'):
+    """Извлекает текст из файла объекта для поиска; повторная загрузка того же содержимого ничего не стоит"""
+    instance = apps.get_model(model).objects.filter(pk=pk).first()
+    field_file = getattr(instance, field, None)
+    if not field_file:
+        return
+    if is_extracted(field_file.name):
+        return
+    store_result(run_extraction(field_file.path, field_file.name))
@@ -0,0 +1,242 @@
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+from datetime import date, time
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from main.models import CustomUser, Group, News
+from main.testing import pdf_file
+from taskqueue.queue import work_off
+from materials.models import Material
+from schedule.models import Homework, Schedule, Subject
+from .extractors import extract_file
+from .index import rebuild_index, search_documents
+from .models import ExtractedText, SearchDocument
+from .stemmer import stem, stem_text
+
+
+class StemmerTests(TestCase):
+    def test_word_forms_share_stem(self):
+        self.assertEqual(stem('теорема'), stem('теоремы'))
+        self.assertEqual(stem('лекции'), stem('лекция'))
+        self.assertEqual(stem_text('Лекции по АЛГЕБРЕ!'), 'лекц по алгебр')
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.group = Group.objects.create(name='ВМК-101', faculty='ВМК', course=1)
+        self.other_group = Group.objects.create(name='ВМК-102', faculty='ВМК', course=1)
+        self.teacher = CustomUser.objects.create_user(
+            username='teacher1', password='pass', student_id='t0001',
+            faculty='ВМК', course=0, role='teacher',
+        )
+        self.student = CustomUser.objects.create_user(
+            username='student1', password='pass', student_id='s0001',
+            faculty='ВМК', course=1, role='student', group=self.group,
+        )
+        self.subject = Subject.objects.create(name='Алгебра', teacher=self.teacher)
+        self.material = Material.objects.create(
+            name='Лекции по теории групп', file='lectures.pdf', type='lecture',
+            faculty='ВМК', course=1, subject='Алгебра', uploaded_by=self.teacher,
+        )
+        self.news = News.objects.create(
+            title='Консультация перед экзаменом', content='Теоремы о группах разберём в среду',
+            author=self.teacher,
+        )
+
+    def add_homework(self, group, content):
+        lesson = Schedule.objects.create(
+            faculty='ВМК', group=group, day=0, lesson_number=1,
+            start_time=time(9, 0), end_time=time(10, 30), subject=self.subject, classroom='505',
+        )
+        return Homework.objects.create(
+            schedule=lesson, content=content, due_date=date.today(), created_by=self.teacher,
+            group=group, subject=self.subject,
+        )
+
+    def titles(self, query, user=None):
+        return [document.title for document, _ in search_documents(query, user or self.student, 10)]
+
+    def test_matches_other_word_forms(self):
+        self.assertEqual(self.titles('теорема'), ['Консультация перед экзаменом'])
+        self.assertEqual(self.titles('лекция групп'), ['Лекции по теории групп'])
+
+    def test_title_match_ranks_first(self):
+        self.assertEqual(self.titles('группы'), ['Лекции по теории групп', 'Консультация перед экзаменом'])
+
+    def test_prefix_query(self):
+        self.assertEqual(self.titles('консул'), ['Консультация перед экзаменом'])
+
+    def test_homework_visible_only_to_own_group(self):
+        self.add_homework(self.group, 'Вычислить определитель матрицы')
+        self.add_homework(self.other_group, 'Найти определитель оператора')
+        self.assertEqual(len(self.titles('определитель')), 1)
+        self.assertEqual(len(self.titles('определитель', self.teacher)), 2)
+
+    def test_unpublished_news_removed_from_index(self):
+        self.news.is_published = False
+        self.news.save()
+        self.assertEqual(self.titles('консультация'), [])
+
+    def test_deleted_material_removed_from_index(self):
+        self.material.delete()
+        self.assertEqual(self.titles('лекции'), [])
+        self.assertFalse(SearchDocument.objects.filter(kind='material').exists())
+
+    def test_rebuild_index(self):
+        SearchDocument.objects.all().delete()
+        self.assertEqual(rebuild_index(), 2)
+        self.assertEqual(self.titles('экзамен'), ['Консультация перед экзаменом'])
+
+    @override_settings(SEARCH_BACKEND='python')
+    def test_python_backend(self):
+        self.add_homework(self.other_group, 'Теоремы Силова')
+        self.assertEqual(self.titles('группы'), ['Лекции по теории групп', 'Консультация перед экзаменом'])
+        self.assertEqual(self.titles('теоремы'), ['Консультация перед экзаменом'])
+        self.news.delete()
+        self.assertEqual(self.titles('теоремы'), [])
+
+    def test_json_response(self):
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('search'), {'q': 'лекции', 'format': 'json'})
+        data = response.json()
+        self.assertEqual([result['title'] for result in data['results']], ['Лекции по теории групп'])
+        self.assertEqual(data['results'][0]['url'], reverse('download_material', args=[self.material.id]))
+        self.assertFalse(data['has_next'])
+
+    def test_html_response(self):
+        self.client.force_login(self.student)
+        self.assertContains(self.client.get(reverse('search'), {'q': 'экзамен'}), 'Консультация перед экзаменом')
+
+
+def office_file(entries):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, xml in entries.items():
+            archive.writestr(name, xml)
+    return buffer.getvalue()
+
+
+DOCX_XML = (
+    '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+    '<w:p><w:r><w:t>Теорема </w:t></w:r><w:r><w:t>Лагранжа</w:t></w:r></w:p>'
+    '<w:p><w:r><w:t>Доказательство</w:t></w:r></w:p>'
+    '</w:body></w:document>'
+)
+SLIDE_XML = (
+    '<p:sld xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main" '
+    'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main"><p:cSld><p:spTree>'
+    '<p:sp><p:txBody><a:p><a:r><a:t>{}</a:t></a:r></a:p></p:txBody></p:sp>'
+    '</p:spTree></p:cSld></p:sld>'
+)
+
+
+class ExtractorTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+
+    def extract(self, name, content):
+        path = os.path.join(self.dir, name)
+        with open(path, 'wb') as file:
+            file.write(content)
+        return extract_file(path, name)
+
+    def test_docx(self):
+        result = self.extract('notes.docx', office_file({'word/document.xml': DOCX_XML}))
+        self.assertEqual(result['text'], 'Теорема Лагранжа\nДоказательство')
+        self.assertEqual(len(result['digest']), 64)
+
+    def test_pdf_pages(self):
+        result = self.extract('lecture.pdf', pdf_file('Gaussian elimination', 'Pivoting'))
+        self.assertEqual(result['error'], '')
+        self.assertEqual(result['text'], 'Gaussian elimination\nPivoting')
+
+    def test_pptx_slides_in_order(self):
+        result = self.extract('slides.pptx', office_file({
+            'ppt/slides/slide10.xml': SLIDE_XML.format('Десятый'),
+            'ppt/slides/slide2.xml': SLIDE_XML.format('Второй'),
+        }))
+        self.assertEqual(result['text'], 'Второй\nДесятый')
+
+    def test_source_code_in_cp1251(self):
+        result = self.extract('main.c', '// Сортировка слиянием'.encode('cp1251'))
+        self.assertEqual(result['text'], '// Сортировка слиянием')
+
+    def test_broken_file_reports_error(self):
+        result = self.extract('broken.docx', b'not a zip')
+        self.assertEqual(result['text'], '')
+        self.assertIn('BadZipFile', result['error'])
+
+    def test_unknown_type_is_skipped(self):
+        result = self.extract('photo.jpg', b'\xff\xd8')
+        self.assertEqual((result['text'], result['error']), ('', ''))
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, TEXT_EXTRACTION_WORKERS=0)
+class ExtractionPipelineTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.teacher = CustomUser.objects.create_user(
+            username='teacher1', password='pass', student_id='t0001',
+            faculty='ВМК', course=0, role='teacher',
+        )
+
+    def upload(self, name, content, title='Конспект'):
+        material = Material.objects.create(
+            name=title, file=SimpleUploadedFile(name, content), type='lecture',
+            faculty='ВМК', course=1, subject='Алгебра', uploaded_by=self.teacher,
+        )
+        return material
+
+    def found(self, query):
+        return [document.object_id for document, _ in search_documents(query, self.teacher, 10)]
+
+    def test_file_contents_are_searchable(self):
+        material = self.upload('notes.docx', office_file({'word/document.xml': DOCX_XML}))
+        self.assertEqual(self.found('лагранж'), [])
+        self.assertEqual(work_off('test'), 1)
+        self.assertEqual(self.found('лагранж'), [material.id])
+        document = SearchDocument.objects.get(kind='material', object_id=material.id)
+        self.assertEqual(document.body, 'Алгебра')
+
+    def test_pdf_contents_are_searchable(self):
+        material = self.upload('lecture.pdf', pdf_file('Gaussian elimination'))
+        work_off('test')
+        self.assertEqual(self.found('gaussian'), [material.id])
+        self.assertEqual(ExtractedText.objects.get().error, '')
+
+    def test_same_content_extracted_once(self):
+        first = self.upload('a.txt', 'Метод Гаусса'.encode())
+        work_off('test')
+        # Блоб уже разобран: текст попадает в индекс сразу, задача ничего не делает
+        second = self.upload('b.txt', 'Метод Гаусса'.encode(), title='Копия')
+        self.assertEqual(sorted(self.found('гаусс')), [first.id, second.id])
+        work_off('test')
+        self.assertEqual(ExtractedText.objects.count(), 1)
+
+    def test_backfill_command_skips_unchanged_files(self):
+        material = self.upload('algo.py', b'def quicksort(items): pass')
+        self.assertEqual(self.found('quicksort'), [])
+
+        out = io.StringIO()
+        call_command('extract_texts', workers=1, stdout=out)
+        self.assertIn('Обработано файлов: 1', out.getvalue())
+        self.assertEqual(self.found('quicksort'), [material.id])
+
+        out = io.StringIO()
+        call_command('extract_texts', stdout=out)
+        self.assertIn('Новых файлов нет', out.getvalue())
@@ -0,0 +1,73 @@
+import time
+
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.shortcuts import render
+from django.urls import reverse
+
+from schedule.models import Homework
+from .index import search_documents
+
+SEARCH_PAGE_SIZE = 20
+
+
+def _result_urls(documents):
+    """Ссылка на каждый найденный объект; для ДЗ - на день расписания со сроком сдачи"""
+    homework_ids = [document.object_id for document in documents if document.kind == 'homework']
+    due_dates = dict(Homework.objects.filter(id__in=homework_ids).values_list('id', 'due_date'))
+
+    urls = {}
+    for document in documents:
+        if document.kind == 'material':
+            urls[document.id] = reverse('download_material', args=[document.object_id])
+        elif document.kind == 'news':
+            urls[document.id] = reverse('home')
+        else:
+            due_date = due_dates.get(document.object_id)
+            urls[document.id] = reverse('schedule') + (f'?date={due_date.isoformat()}' if due_date else '')
+    return urls
+
+
+@login_required
+def search_view(request):
+    query = request.GET.get('q', '').strip()
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        page = 1
+
+    started = time.perf_counter()
+    # Берём на одну запись больше, чтобы узнать о следующей странице без COUNT(*)
+    found = search_documents(query, request.user, SEARCH_PAGE_SIZE + 1, (page - 1) * SEARCH_PAGE_SIZE)
+    has_next = len(found) > SEARCH_PAGE_SIZE
+    found = found[:SEARCH_PAGE_SIZE]
+    urls = _result_urls([document for document, _ in found])
+    results = [
+        {
+            'kind': document.kind,
+            'kind_display': document.get_kind_display(),
+            'title': document.title,
+            'snippet': document.body[:200],
+            'url': urls[document.id],
+            'rank': round(rank, 4),
+        }
+        for document, rank in found
+    ]
+    took_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'query': query,
+            'page': page,
+            'has_next': has_next,
+            'took_ms': took_ms,
+            'results': results,
+        }, json_dumps_params={'ensure_ascii': False})
+
+    return render(request, 'search.html', {
+        'query': query,
+        'page': page,
+        'has_next': has_next,
+        'took_ms': took_ms,
+        'results': results,
+    })
@@ -0,0 +1,99 @@
+import os
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from taskqueue.queue import claim_next, purge_finished, requeue_stale, run_task, work_off
+
+# Как часто воркер возвращает в очередь задачи упавших воркеров, секунд
+REQUEUE_INTERVAL = 60
+# Как часто удаляются старые выполненные задачи, секунд
+PURGE_INTERVAL = 60 * 60
+
+
+def _run_in_thread(task):
+    try:
+        run_task(task)
+    finally:
+        # У каждого потока своё соединение - не оставляем его открытым
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Воркер фоновых задач: забирает задачи из очереди в базе данных и выполняет их'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=settings.TASKS_CONCURRENCY,
+                            help='Сколько задач выполнять одновременно')
+        parser.add_argument('--poll-interval', type=float, default=settings.TASKS_POLL_INTERVAL,
+                            help='Пауза между опросами пустой очереди, секунд')
+        parser.add_argument('--burst', action='store_true',
+                            help='Выполнить всё, что есть в очереди, и завершиться')
+
+    def handle(self, *args, **options):
+        worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        concurrency = max(options['concurrency'], 1)
+        self.next_requeue = self.next_purge = 0
+        self.maintain()
+        self.stdout.write(f'Воркер {worker_id} запущен, потоков: {concurrency}')
+
+        try:
+            if concurrency == 1:
+                self.run_serial(worker_id, options['burst'], options['poll_interval'])
+            else:
+                self.run_threaded(worker_id, concurrency, options['burst'], options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Воркер остановлен')
+
+    def maintain(self):
+        """Обслуживание очереди между задачами; каждая часть - не чаще своего интервала"""
+        self.requeue_if_due()
+        self.purge_if_due()
+
+    def requeue_if_due(self):
+        """Зависшие задачи возвращаются не только при запуске: упасть может и соседний воркер"""
+        now = time.monotonic()
+        if now < self.next_requeue:
+            return
+        self.next_requeue = now + REQUEUE_INTERVAL
+        requeued = requeue_stale()
+        if requeued:
+            self.stdout.write(f'Возвращено в очередь зависших задач: {requeued}')
+
+    def purge_if_due(self):
+        """Выполненные задачи копятся с каждой загрузкой - старые удаляем, чтобы таблица не росла"""
+        now = time.monotonic()
+        if now < self.next_purge:
+            return
+        self.next_purge = now + PURGE_INTERVAL
+        purged = purge_finished()
+        if purged:
+            self.stdout.write(f'Удалено выполненных задач: {purged}')
+
+    def run_serial(self, worker_id, burst, poll_interval):
+        while True:
+            self.maintain()
+            if not work_off(worker_id) and burst:
+                return
+            if not burst:
+                time.sleep(poll_interval)
+
+    def run_threaded(self, worker_id, concurrency, burst, poll_interval):
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            running = set()
+            while True:
+                self.maintain()
+                task = claim_next(worker_id) if len(running) < concurrency else None
+                if task is not None:
+                    running.add(pool.submit(_run_in_thread, task))
+                    continue
+                if burst and not running:
+                    return
+                if running:
+                    _, running = wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                else:
+                    time.sleep(poll_interval)
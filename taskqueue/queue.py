@@ -0,0 +1,223 @@
+"""Очередь фоновых задач в базе данных.
+
+Задача - функция, зарегистрированная декоратором @task в модуле tasks.py
+приложения. Постановка в очередь - один INSERT, выполняет задачи воркер
+(manage.py run_tasks). Неудачные попытки повторяются с экспоненциальной
+задержкой, для отдельных задач можно ограничить число одновременных запусков.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, F
+from django.db.models.signals import post_save, pre_save
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+CLAIM_BATCH = 10
+# Сколько выполненных задач удаляется одним запросом, см. purge_finished
+PURGE_BATCH = 1000
+
+_registry = {}
+_upload_tasks = []
+
+
+class TaskDefinition:
+    def __init__(self, func, name, priority, max_attempts, concurrency):
+        self.func = func
+        self.name = name
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.concurrency = concurrency
+
+    def __call__(self, **kwargs):
+        return self.func(**kwargs)
+
+    def build(self, priority=None, delay=None, **kwargs):
+        task = Task(
+            name=self.name,
+            kwargs=kwargs,
+            priority=self.priority if priority is None else priority,
+            max_attempts=self.max_attempts,
+        )
+        if delay is not None:
+            task.run_at = timezone.now() + delay
+        return task
+
+    def enqueue(self, priority=None, delay=None, **kwargs):
+        """Ставит задачу в очередь; аргументы должны сериализоваться в JSON"""
+        task = self.build(priority=priority, delay=delay, **kwargs)
+        task.save()
+        return task
+
+
+def task(name=None, priority=0, max_attempts=5, concurrency=None):
+    """Регистрирует функцию как фоновую задачу.
+
+    concurrency - сколько экземпляров задачи могут выполняться одновременно
+    во всех воркерах (None - без ограничения).
+    """
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__name__}'
+        definition = TaskDefinition(func, task_name, priority, max_attempts, concurrency)
+        _registry[task_name] = definition
+        return definition
+    return decorator
+
+
+def on_upload(*labels):
+    """Задача вызывается с (model, pk, field) для каждого загруженного файла, см. after_upload.
+
+    labels - модели ('app.Model'), для которых задача нужна; без них - для всех.
+    """
+    def decorator(definition):
+        _upload_tasks.append((definition, set(labels)))
+        return definition
+    return decorator
+
+
+def after_upload(instance, field_name='file'):
+    """Постобработка загруженного файла: все задачи on_upload ставятся одним INSERT"""
+    if not getattr(instance, field_name):
+        return
+    label = instance._meta.label
+    Task.objects.bulk_create([
+        definition.build(model=label, pk=instance.pk, field=field_name)
+        for definition, labels in _upload_tasks
+        if not labels or label in labels
+    ])
+
+
+def track_uploads(model, field_name='file'):
+    """Вызывает after_upload при каждом сохранении модели с новым файлом в поле - из views, админки и shell.
+
+    Новый файл узнаём без запроса: до сохранения поля FieldFile ещё не записан
+    в хранилище (_committed=False), а после FileField.pre_save - уже записан.
+    """
+    uid = f'upload_tasks_{model._meta.label_lower}_{field_name}'
+
+    def remember_upload(sender, instance, **kwargs):
+        field_file = getattr(instance, field_name)
+        pending = getattr(instance, '_pending_uploads', set())
+        if field_file and not field_file._committed:
+            pending.add(field_name)
+        instance._pending_uploads = pending
+
+    def queue_upload(sender, instance, **kwargs):
+        pending = getattr(instance, '_pending_uploads', set())
+        if field_name in pending:
+            pending.discard(field_name)
+            after_upload(instance, field_name)
+
+    pre_save.connect(remember_upload, sender=model, weak=False, dispatch_uid=uid)
+    post_save.connect(queue_upload, sender=model, weak=False, dispatch_uid=uid)
+
+
+def get_task(name):
+    return _registry.get(name)
+
+
+def backoff(attempts):
+    """Задержка перед следующей попыткой: 10 с, 20 с, 40 с... но не больше часа"""
+    seconds = settings.TASKS_RETRY_BACKOFF * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(seconds, settings.TASKS_RETRY_BACKOFF_MAX))
+
+
+def _busy_names():
+    """Задачи, у которых исчерпан лимит одновременных запусков"""
+    limits = {name: definition.concurrency for name, definition in _registry.items() if definition.concurrency}
+    if not limits:
+        return set()
+    running = (
+        Task.objects.filter(status=Task.RUNNING, name__in=limits)
+        .values('name').annotate(count=Count('id'))
+    )
+    return {row['name'] for row in running if row['count'] >= limits[row['name']]}
+
+
+def claim_next(worker_id):
+    """Забирает следующую задачу в работу или возвращает None.
+
+    Захват - условный UPDATE по статусу, поэтому два воркера не получат одну
+    задачу ни на SQLite, ни на PostgreSQL.
+    """
+    now = timezone.now()
+    candidates = (
+        Task.objects.filter(status=Task.PENDING, run_at__lte=now)
+        .exclude(name__in=_busy_names())
+        .order_by('-priority', 'run_at', 'id')
+        .values_list('pk', flat=True)[:CLAIM_BATCH]
+    )
+    for pk in candidates:
+        claimed = Task.objects.filter(pk=pk, status=Task.PENDING).update(
+            status=Task.RUNNING, locked_by=worker_id, locked_at=now, attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Task.objects.get(pk=pk)
+    return None
+
+
+def run_task(task):
+    """Выполняет захваченную задачу и записывает результат"""
+    definition = get_task(task.name)
+    try:
+        if definition is None:
+            raise LookupError(f'Unknown task: {task.name}')
+        definition(**task.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception('Task %s #%s failed (attempt %s)', task.name, task.pk, task.attempts)
+        now = timezone.now()
+        if definition is not None and task.attempts < task.max_attempts:
+            Task.objects.filter(pk=task.pk).update(
+                status=Task.PENDING, run_at=now + backoff(task.attempts),
+                locked_by='', locked_at=None, last_error=error,
+            )
+        else:
+            Task.objects.filter(pk=task.pk).update(status=Task.FAILED, finished_at=now, last_error=error)
+        return False
+    Task.objects.filter(pk=task.pk).update(status=Task.DONE, finished_at=timezone.now())
+    return True
+
+
+def requeue_stale():
+    """Возвращает в очередь задачи воркеров, которые упали, не дописав результат"""
+    deadline = timezone.now() - timedelta(seconds=settings.TASKS_LOCK_TIMEOUT)
+    stale = Task.objects.filter(status=Task.RUNNING, locked_at__lt=deadline)
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Task.FAILED, finished_at=timezone.now(), last_error='Worker lost',
+    )
+    requeued = stale.update(status=Task.PENDING, locked_by='', locked_at=None)
+    return requeued + failed
+
+
+def purge_finished():
+    """Удаляет выполненные задачи старше TASKS_DONE_RETENTION.
+
+    Удаление идёт пачками по PURGE_BATCH, чтобы не держать таблицу
+    заблокированной, пока остальные воркеры забирают задачи.
+    """
+    deadline = timezone.now() - timedelta(seconds=settings.TASKS_DONE_RETENTION)
+    finished = Task.objects.filter(status=Task.DONE, finished_at__lt=deadline).order_by()
+    purged = 0
+    while True:
+        pks = list(finished.values_list('pk', flat=True)[:PURGE_BATCH])
+        if not pks:
+            return purged
+        purged += Task.objects.filter(pk__in=pks).delete()[0]
+
+
+def work_off(worker_id, limit=None):
+    """Выполняет задачи по одной в текущем потоке, пока очередь не опустеет"""
+    done = 0
+    while limit is None or done < limit:
+        task = claim_next(worker_id)
+        if task is None:
+            break
+        run_task(task)
+        done += 1
+    return done
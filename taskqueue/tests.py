@@ -0,0 +1,195 @@
+import io
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from main.models import CustomUser, News
+from materials.models import Material
+from .management.commands.run_tasks import Command as RunTasksCommand
+from .models import Task
+from .queue import after_upload, backoff, claim_next, purge_finished, requeue_stale, run_task, task, work_off
+
+calls = []
+
+
+@task(name='tests.record', priority=1)
+def record(value):
+    calls.append(value)
+
+
+@task(name='tests.flaky', max_attempts=2)
+def flaky():
+    raise RuntimeError('boom')
+
+
+@task(name='tests.limited', concurrency=1)
+def limited():
+    pass
+
+
+@override_settings(TASKS_RETRY_BACKOFF=10, TASKS_RETRY_BACKOFF_MAX=60, TASKS_LOCK_TIMEOUT=600)
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_higher_priority_runs_first(self):
+        record.enqueue(value='low', priority=0)
+        record.enqueue(value='default')
+        record.enqueue(value='high', priority=5)
+        self.assertEqual(work_off('test'), 3)
+        self.assertEqual(calls, ['high', 'default', 'low'])
+        self.assertEqual(set(Task.objects.values_list('status', flat=True)), {Task.DONE})
+
+    def test_delayed_task_waits(self):
+        record.enqueue(value='later', delay=timedelta(minutes=5))
+        self.assertEqual(work_off('test'), 0)
+
+    def test_retry_with_backoff_then_fail(self):
+        queued = flaky.enqueue()
+        run_task(claim_next('test'))
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (Task.PENDING, 1))
+        self.assertIn('RuntimeError: boom', queued.last_error)
+        self.assertGreater(queued.run_at, timezone.now() + timedelta(seconds=5))
+
+        Task.objects.filter(pk=queued.pk).update(run_at=timezone.now())
+        run_task(claim_next('test'))
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (Task.FAILED, 2))
+
+    def test_backoff_is_capped(self):
+        self.assertEqual([backoff(n).total_seconds() for n in range(1, 6)], [10, 20, 40, 60, 60])
+
+    def test_concurrency_limit(self):
+        limited.enqueue()
+        limited.enqueue()
+        first = claim_next('worker-1')
+        self.assertEqual(first.name, 'tests.limited')
+        self.assertIsNone(claim_next('worker-2'))
+        run_task(first)
+        self.assertIsNotNone(claim_next('worker-2'))
+
+    def test_task_is_claimed_once(self):
+        record.enqueue(value='once')
+        self.assertIsNotNone(claim_next('worker-1'))
+        self.assertIsNone(claim_next('worker-2'))
+
+    def test_stale_task_is_requeued(self):
+        record.enqueue(value='lost')
+        claimed = claim_next('dead-worker')
+        Task.objects.filter(pk=claimed.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale(), 1)
+        self.assertEqual(work_off('test'), 1)
+        self.assertEqual(calls, ['lost'])
+
+    def test_unknown_task_fails(self):
+        Task.objects.create(name='tests.missing')
+        work_off('test')
+        self.assertEqual(Task.objects.get().status, Task.FAILED)
+
+    def test_worker_requeues_periodically(self):
+        command = RunTasksCommand(stdout=io.StringIO())
+        command.next_requeue = 0
+        command.requeue_if_due()
+        record.enqueue(value='lost')
+        claimed = claim_next('dead-worker')
+        Task.objects.filter(pk=claimed.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        # До следующей проверки задача остаётся захваченной
+        command.requeue_if_due()
+        self.assertEqual(Task.objects.get().status, Task.RUNNING)
+        command.next_requeue = 0
+        command.requeue_if_due()
+        self.assertEqual(Task.objects.get().status, Task.PENDING)
+
+    @override_settings(TASKS_DONE_RETENTION=24 * 60 * 60)
+    def test_old_finished_tasks_are_purged(self):
+        long_ago = timezone.now() - timedelta(days=2)
+        for _ in range(5):
+            Task.objects.create(name='tests.record', status=Task.DONE, finished_at=long_ago)
+        recent = Task.objects.create(name='tests.record', status=Task.DONE, finished_at=timezone.now())
+        failed = Task.objects.create(name='tests.record', status=Task.FAILED, finished_at=long_ago)
+        pending = record.enqueue(value='later')
+
+        with mock.patch('taskqueue.queue.PURGE_BATCH', 2):
+            self.assertEqual(purge_finished(), 5)
+        self.assertEqual(set(Task.objects.values_list('pk', flat=True)), {recent.pk, failed.pk, pending.pk})
+
+        # Воркер удаляет сам - раз в PURGE_INTERVAL
+        Task.objects.create(name='tests.record', status=Task.DONE, finished_at=long_ago)
+        command = RunTasksCommand(stdout=io.StringIO())
+        command.next_requeue = command.next_purge = 0
+        command.maintain()
+        self.assertEqual(Task.objects.filter(status=Task.DONE).count(), 1)
+        self.assertIn('Удалено выполненных задач: 1', command.stdout.getvalue())
+
+    def test_burst_worker(self):
+        record.enqueue(value='burst')
+        call_command('run_tasks', burst=True, concurrency=1, stdout=io.StringIO())
+        self.assertEqual(calls, ['burst'])
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class UploadHookTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.teacher = CustomUser.objects.create_user(
+            username='teacher1', password='pass', student_id='t0001',
+            faculty='ВМК', course=0, role='teacher',
+        )
+
+    def test_after_upload_is_one_insert(self):
+        news = News.objects.create(title='Расписание', content='...', author=self.teacher,
+                                   file=SimpleUploadedFile('plan.txt', b'plan'))
+        with self.assertNumQueries(1):
+            after_upload(news)
+        self.assertTrue(Task.objects.filter(kwargs={'model': 'main.News', 'pk': news.pk, 'field': 'file'}).exists())
+
+    def queued(self):
+        return sorted(Task.objects.filter(status=Task.PENDING).values_list('name', 'kwargs__model', 'kwargs__field'))
+
+    def test_admin_uploads_queue_post_processing(self):
+        admin = CustomUser.objects.create_superuser(
+            username='root', password='pass', student_id='a0001', faculty='ВМК', course=0,
+        )
+        self.client.force_login(admin)
+        self.client.post(reverse('admin:materials_material_add'), {
+            'name': 'Лекция 1', 'file': SimpleUploadedFile('lecture.txt', b'text'), 'faculty': 'ВМК',
+            'course': 1, 'subject': 'Алгебра', 'type': 'notes', 'uploaded_by': admin.pk,
+        })
+        self.assertEqual(self.queued(), [('search.tasks.extract_upload_text', 'materials.Material', 'file')])
+
+        # Сохранение без нового файла ничего не ставит
+        Task.objects.all().delete()
+        material = Material.objects.get()
+        material.name = 'Лекция 1 (исправлено)'
+        material.save()
+        self.assertEqual(self.queued(), [])
+
+        self.teacher.photo = SimpleUploadedFile('me.png', b'png')
+        self.teacher.save()
+        self.assertEqual(self.queued(), [('main.tasks.make_thumbnails', 'main.CustomUser', 'photo')])
+
+    def test_add_news_queues_post_processing(self):
+        self.client.force_login(self.teacher)
+        self.client.post(reverse('add_news'), {
+            'title': 'Расписание', 'content': 'Новое расписание сессии',
+            'category': 'news', 'is_published': 'on', 'file': SimpleUploadedFile('plan.txt', b'plan'),
+        })
+        self.assertEqual(
+            set(Task.objects.filter(status=Task.PENDING).values_list('name', flat=True)),
+            {'main.tasks.make_thumbnails', 'search.tasks.extract_upload_text'},
+        )
@@ -2,6 +2,7 @@
 import os
 import sys
 import django
+from datetime import time
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'msu_portal.settings')
@@ -102,12 +103,12 @@ def create_test_schedule():
 
     # 4. Расписание
     schedule_data = [
-        {'day': 'Понедельник', 'number': 1, 'time': '9:00-10:30', "faculty": "ВМК", 'classroom': '505', "teacher_id": teacher.student_id, "subject": subject},
-        {'day': 'Понедельник', 'number': 2, 'time': '10:45-12:15', "faculty": "ВМК", 'classroom': '312', "teacher_id": teacher.student_id, "subject": subject},
-        {'day': 'Вторник', 'number': 1, 'time': '9:00-10:30', "faculty": "ВМК", 'classroom': '411', "teacher_id": teacher.student_id, "subject": subject},
-        {'day': 'Среда', 'number': 1, 'time': '9:00-10:30', "faculty": "ВМК", 'classroom': '505', "teacher_id": teacher2.student_id, "subject": subject2},
-        {'day': 'Вторник', 'number': 4, 'time': '14:40-16:10', "faculty": "ВМК", 'classroom': '411', "teacher_id": teacher2.student_id, "subject": subject2},
-        {'day': 'Четверг', 'number': 1, 'time': '9:00-10:30', "faculty": "ВМК", 'classroom': '505', "teacher_id": teacher2.student_id, "subject": subject2},
+        {'day': 0, 'number': 1, 'time': (time(9, 0), time(10, 30)), "faculty": "ВМК", 'classroom': '505', "teacher_id": teacher.student_id, "subject": subject},
+        {'day': 0, 'number': 2, 'time': (time(10, 45), time(12, 15)), "faculty": "ВМК", 'classroom': '312', "teacher_id": teacher.student_id, "subject": subject},
+        {'day': 1, 'number': 1, 'time': (time(9, 0), time(10, 30)), "faculty": "ВМК", 'classroom': '411', "teacher_id": teacher.student_id, "subject": subject},
+        {'day': 2, 'number': 1, 'time': (time(9, 0), time(10, 30)), "faculty": "ВМК", 'classroom': '505', "teacher_id": teacher2.student_id, "subject": subject2},
+        {'day': 1, 'number': 4, 'time': (time(14, 40), time(16, 10)), "faculty": "ВМК", 'classroom': '411', "teacher_id": teacher2.student_id, "subject": subject2},
+        {'day': 3, 'number': 1, 'time': (time(9, 0), time(10, 30)), "faculty": "ВМК", 'classroom': '505', "teacher_id": teacher2.student_id, "subject": subject2},
     ]
 
     for data in schedule_data:
@@ -118,13 +119,14 @@ def create_test_schedule():
             lesson_number=data['number'],
             teacher_id=data['teacher_id'],
             defaults={
-                'time': data['time'],
+                'start_time': data['time'][0],
+                'end_time': data['time'][1],
                 'subject': data['subject'],
                 'classroom': data['classroom']
             }
         )
         status = "создана" if created else "уже существует"
-        print(f"✅ Пара {data['number']} ({data['day']}) {status}")
+        print(f"✅ Пара {data['number']} ({schedule.get_day_display()}) {status}")
 
     print("🎉 Тестовое расписание создано!")
     print("👤 Преподаватель: teacher1 / teacher123")